@@ -0,0 +1,129 @@
+"""Load test the local conversion service against a fresh process per conversion.
+
+Starts daemon.py's server on a free localhost port, then POSTs synthetic
+payloads to /convert from several keep-alive clients. "distinct" sends a
+different schedule every time (every request generates), "repeat" cycles a
+few schedules (served from the warm calendar cache). The service's own
+/stats report is printed at the end.
+
+Usage: python bench_daemon.py [--requests 2000] [--clients 8] [--sections 12] [--cold-runs 5]
+"""
+import argparse
+import http.client
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.insert(0, SRC)
+from daemon import ConversionService, make_server  # noqa: E402
+from result_cache import ResultCache  # noqa: E402
+from synthetic import make_result  # noqa: E402
+
+COLD_CONVERT = (
+    "import io, json, sys; from events import build_events; from ics_writer import write_ics; "
+    "from parse_schedule import sorted_courses; result = json.load(open(sys.argv[1])); "
+    "write_ics([ev for t in result['Terms'] for ev in build_events(sorted_courses(t['PlannedCourses']), term=t['Code'])], "
+    "io.BytesIO())"
+)
+
+
+def percentile(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, len(samples) * q // 100)]
+
+
+def load(port, bodies, requests, clients):
+    """POST bodies round-robin from `clients` keep-alive connections; return wall time and latencies."""
+    local = threading.local()
+    latencies = []
+    lock = threading.Lock()
+
+    def post(i):
+        conn = getattr(local, 'conn', None)
+        if conn is None:
+            conn = local.conn = http.client.HTTPConnection('127.0.0.1', port)
+        start = time.perf_counter()
+        conn.request('POST', '/convert', body=bodies[i % len(bodies)], headers={'Content-Type': 'application/json'})
+        resp = conn.getresponse()
+        data = resp.read()
+        elapsed = time.perf_counter() - start
+        assert resp.status == 200 and data.startswith(b'BEGIN:VCALENDAR'), resp.status
+        with lock:
+            latencies.append(elapsed)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(post, range(requests)))
+    return time.perf_counter() - start, latencies
+
+
+def cold(body, runs):
+    """Seconds per conversion when each one is a fresh interpreter, as bulk scripts used to run."""
+    with tempfile.NamedTemporaryFile('wb', suffix='.json', delete=False) as f:
+        f.write(body)
+    try:
+        start = time.perf_counter()
+        for _ in range(runs):
+            subprocess.run([sys.executable, '-c', COLD_CONVERT, f.name], cwd=SRC, check=True)
+        return (time.perf_counter() - start) / runs
+    finally:
+        os.remove(f.name)
+
+
+def row(name, wall, latencies):
+    return {
+        'scenario': name,
+        'requests': len(latencies),
+        'rps': round(len(latencies) / wall, 1),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--sections', type=int, default=12)
+    parser.add_argument('--cold-runs', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        service = ConversionService(workers=args.workers, result_cache=ResultCache(workdir))
+        service.warm_up()
+        server = make_server(service, port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        port = server.server_address[1]
+        try:
+            distinct = [json.dumps(make_result(args.sections, seed=i)).encode('utf-8') for i in range(args.requests)]
+            rows = [
+                row('distinct', *load(port, distinct, args.requests, args.clients)),
+                row('repeat', *load(port, distinct[:8], args.requests, args.clients)),
+            ]
+            conn = http.client.HTTPConnection('127.0.0.1', port)
+            conn.request('GET', '/stats')
+            stats = json.loads(conn.getresponse().read())
+        finally:
+            server.shutdown()
+            server.server_close()
+            service.close()
+
+    per_process = cold(distinct[0], args.cold_runs) if args.cold_runs else None
+    for r in rows:
+        print(f"{r['scenario']:<9} {r['requests']} requests, {args.clients} clients: {r['rps']:>8.1f} req/s  "
+              f"p50 {r['p50_ms']} ms  p99 {r['p99_ms']} ms")
+    if per_process:
+        print(f"{'process':<9} fresh interpreter per conversion: {1 / per_process:>8.1f} req/s  "
+              f"({per_process * 1000:.1f} ms each, one at a time)")
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""Compare the BeautifulSoup extraction path with the marker scan + raw_decode path.
+
+Usage: python bench_extract.py [--sections N ...] [--padding-kb KB] [--tricky]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+import parse_schedule  # noqa: E402
+from synthetic import make_page, make_result  # noqa: E402
+
+
+def measure(fn, page):
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        data = fn(page)
+        ok = sum(len(t["PlannedCourses"]) for t in data["Terms"])
+    except Exception as e:
+        ok = f"failed ({type(e).__name__})"
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sections', type=int, nargs='+', default=[50, 500, 5000])
+    parser.add_argument('--padding-kb', type=int, default=2048)
+    parser.add_argument('--tricky', action='store_true', help='put "};" inside a JSON string')
+    args = parser.parse_args()
+
+    print(f"{'sections':>8} {'page MB':>8} {'path':<8} {'time s':>8} {'peak MB':>8}  courses")
+    for sections in args.sections:
+        page = make_page(make_result(sections, tricky=args.tricky), args.padding_kb)
+        for label, fn in (('soup', parse_schedule._soup_result), ('scan', parse_schedule._scan_result),
+                          ('bytes', lambda p: parse_schedule._scan_result(p.encode()))):
+            elapsed, peak, ok = measure(fn, page)
+            print(f"{sections:>8} {len(page) / 1e6:>8.2f} {label:<8} {elapsed:>8.3f} {peak / 1e6:>8.1f}  {ok}")
+
+
+if __name__ == '__main__':
+    main()
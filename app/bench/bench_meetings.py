@@ -0,0 +1,110 @@
+"""Compare dict-per-meeting normalization with the slotted Meeting model.
+
+Usage: python bench_meetings.py [--sections N ...]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+import meetings  # noqa: E402
+from events import build_events  # noqa: E402
+from parse_schedule import sorted_courses  # noqa: E402
+from synthetic import make_result  # noqa: E402
+
+
+def legacy_sorted_courses(raw):
+    """The pre-Meeting normalizer: one dict per meeting with course fields splatted in."""
+    output = []
+    for entry in raw:
+        sec = entry.get("Section", {})
+        base = {
+            "CourseName": sec.get("CourseName"),
+            "SectionNumber": sec.get("Number"),
+            "Credits": sec.get("MinimumCredits"),
+            "Instructors": sec.get("Faculty", []),
+        }
+        for meeting in sec.get("PlannedMeetings", []):
+            if not meeting.get("StartTime") or not meeting.get("EndTime"):
+                continue
+            output.append({
+                **base,
+                "InstructionalMethod": meeting["InstructionalMethod"],
+                "StartTime": meeting["StartTime"],
+                "EndTime": meeting["EndTime"],
+                "FormattedTime": meeting.get("FormattedTime"),
+                "DaysOfWeek": meeting["DaysOfWeek"],
+                "Location": meeting["MeetingLocation"].strip(),
+                "StartDate": meeting["StartDateString"],
+                "EndDate": meeting["EndDateString"],
+            })
+    return output
+
+
+def legacy_parse(rows):
+    """The strptime work the old generate_ics did for every row."""
+    cutoff = {}
+    for ev in rows:
+        if ev['InstructionalMethod'] != 'EXAM':
+            end_dt = datetime.strptime(ev['EndDate'], "%m/%d/%Y")
+            key = (ev['CourseName'], ev['SectionNumber'])
+            if key not in cutoff or end_dt > cutoff[key]:
+                cutoff[key] = end_dt
+    out = []
+    for ev in rows:
+        start = datetime.strptime(f"{ev['StartDate']} {ev['StartTime']}", "%m/%d/%Y %I:%M %p")
+        end = datetime.strptime(f"{ev['StartDate']} {ev['EndTime']}", "%m/%d/%Y %I:%M %p")
+        key = (ev['CourseName'], ev['SectionNumber'])
+        if ev['InstructionalMethod'] != 'EXAM' and key in cutoff:
+            until = cutoff[key] - timedelta(weeks=2)
+        else:
+            until = datetime.strptime(ev['EndDate'], "%m/%d/%Y")
+        out.append((start, end, until))
+    return out
+
+
+def retained(fn, raw):
+    """Time fn(raw) and measure how much memory its result keeps alive."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(raw)
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, size
+
+
+def timed(fn, arg):
+    start = time.perf_counter()
+    fn(arg)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sections', type=int, nargs='+', default=[1000, 10000, 50000])
+    args = parser.parse_args()
+
+    print(f"{'sections':>8} {'meetings':>8} {'model':<8} {'normalize s':>11} {'retained MB':>11} {'parse s':>8}")
+    for sections in args.sections:
+        raw = make_result(sections)["Terms"][0]["PlannedCourses"]
+
+        rows, t_norm, size = retained(legacy_sorted_courses, raw)
+        t_parse = timed(legacy_parse, rows)
+        print(f"{sections:>8} {len(rows):>8} {'dict':<8} {t_norm:>11.3f} {size / 1e6:>11.2f} {t_parse:>8.3f}")
+        del rows
+
+        meetings.parse_date.cache_clear()
+        meetings.parse_time.cache_clear()
+        rows, t_norm, size = retained(sorted_courses, raw)
+        t_parse = timed(lambda ms: [(m.start, m.end, m.last_day) for m in ms], rows)
+        t_build = timed(build_events, rows)
+        print(f"{sections:>8} {len(rows):>8} {'slotted':<8} {t_norm:>11.3f} {size / 1e6:>11.2f} {t_parse:>8.3f}"
+              f"  (build_events {t_build:.3f}s)")
+
+
+if __name__ == '__main__':
+    main()
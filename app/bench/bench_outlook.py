@@ -0,0 +1,101 @@
+"""Compare per-event Outlook inserts with pooled $batch inserts against a local fake Graph.
+
+Usage: python bench_outlook.py [--events N] [--latency SECONDS] [--throttle-every N]
+"""
+import argparse
+import os
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+import outlook_calendar  # noqa: E402
+from datetime import datetime, timedelta  # noqa: E402
+from events import Event  # noqa: E402
+from fake_graph import FakeGraph  # noqa: E402
+
+
+def synthetic_events(count):
+    events = []
+    first = datetime(2025, 9, 8, 8, 30)
+    for i in range(count):
+        start = first + timedelta(days=i % 5, hours=i % 9)
+        events.append(Event(
+            uid=f"bench-{i}@schedule",
+            summary=f"LEC CIS*{1000 + i}*0101",
+            description="Instructor(s): Example\nCredits: 0.5",
+            location=f"ROZH {100 + i % 50}",
+            start=start,
+            end=start + timedelta(minutes=80),
+            byday=[['MO', 'TU', 'WE', 'TH', 'FR'][i % 5]],
+            until=datetime(2025, 11, 28, 23, 59, 59),
+        ))
+    return events
+
+
+def legacy_insert(token, calendar_id, events):
+    """The pre-batching path: one fresh requests.post per event."""
+    headers = {'Authorization': f'Bearer {token}', 'Content-Type': 'application/json'}
+    created = 0
+    for event in events:
+        res = requests.post(
+            f"{outlook_calendar.GRAPH_BASE}/me/calendars/{calendar_id}/events",
+            headers=headers,
+            json=outlook_calendar.event_to_outlook(event)
+        )
+        created += res.status_code == 201
+    return created
+
+
+def run(label, graph, fn):
+    graph.reset_counters()
+    start = time.perf_counter()
+    created = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<12} {elapsed:8.3f}s  done={created:<5} http={graph.http_requests:<5} connections={graph.connections}")
+    return created
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--throttle-every', type=int, default=0)
+    args = parser.parse_args()
+
+    events = synthetic_events(args.events)
+    with FakeGraph(latency=args.latency, throttle_every=args.throttle_every) as graph:
+        outlook_calendar.GRAPH_BASE = graph.url
+        token = 'fake-token'
+        calendar_id = outlook_calendar.get_or_create_outlook_calendar(token)
+
+        outlook_calendar._session = None  # count the pooled connection in the batched run
+        legacy = run('per-event', graph, lambda: legacy_insert(token, calendar_id, events))
+        bodies = [outlook_calendar.event_to_outlook(ev) for ev in events]
+        batched = run(
+            '$batch', graph,
+            lambda: outlook_calendar.insert_events_batched(token, calendar_id, bodies)['created']
+        )
+
+        # Incremental sync into a fresh calendar: full upload, no-op re-run, then one changed event
+        sync_id = outlook_calendar.get_or_create_outlook_calendar(token, 'UofG Schedule Sync')
+        sync = lambda: outlook_calendar.sync_events_to_outlook(token, sync_id, events)
+        run('sync-initial', graph, lambda: sync()['inserted'])
+        run('sync-rerun', graph, lambda: sync()['unchanged'])
+        rerun_requests = graph.http_requests
+        events[0].location = 'MCKN 029'
+        run('sync-change', graph, lambda: sync()['patched'])
+        synced = len(graph.events[sync_id])
+
+    # Throttled items in the legacy path are simply lost, the batched path must recover them
+    if batched != args.events:
+        sys.exit(f"❌ Batched import created {batched}/{args.events} events")
+    if synced != args.events or rerun_requests != 1:
+        sys.exit(f"❌ Sync left {synced}/{args.events} events and re-ran with {rerun_requests} request(s)")
+    print(f"✅ Batched import created all {batched} events (per-event path created {legacy}).")
+    print("✅ Unchanged re-sync cost a single list request.")
+
+
+if __name__ == '__main__':
+    main()
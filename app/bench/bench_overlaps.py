@@ -0,0 +1,111 @@
+"""Time overlap detection for one schedule and occupancy queries over many.
+
+"student" expands one synthetic schedule and finds its clashes, compared with
+checking every pair of occurrences in Python. "bulk" indexes N schedules by
+room and instructor, then times single-room queries and a double-booking scan.
+
+Usage: python bench_overlaps.py [--sections 8] [--schedules 2000] [--queries 200]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from itertools import combinations
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from events import build_events  # noqa: E402
+from overlaps import OccupancyIndex, expand, find_overlaps  # noqa: E402
+from parse_schedule import sorted_courses  # noqa: E402
+from synthetic import make_result  # noqa: E402
+
+
+def pairwise_overlaps(events):
+    """Reference: compare every pair of occurrences."""
+    occ = expand(events)
+    rows = list(zip(occ.start.tolist(), occ.end.tolist(), occ.event.tolist()))
+    pairs = set()
+    for (s1, e1, a), (s2, e2, b) in combinations(rows, 2):
+        if a != b and s1 < e2 and s2 < e1:
+            pairs.add((min(a, b), max(a, b)))
+    return pairs
+
+
+def bench_student(sections, runs=20):
+    result = make_result(sections)
+    events = build_events(sorted_courses(result['Terms'][0]['PlannedCourses']), term='F25')
+    start = time.perf_counter()
+    for _ in range(runs):
+        overlaps = find_overlaps(events)
+    sweep = (time.perf_counter() - start) / runs
+
+    start = time.perf_counter()
+    reference = pairwise_overlaps(events)
+    pairwise = time.perf_counter() - start
+    assert len(reference) == len(overlaps), "sweep and pairwise disagree"
+    return {
+        'events': len(events),
+        'occurrences': len(expand(events)),
+        'overlaps': len(overlaps),
+        'sweep_ms': round(sweep * 1000, 3),
+        'pairwise_ms': round(pairwise * 1000, 3),
+    }
+
+
+def bench_bulk(schedules, sections, queries):
+    index = OccupancyIndex()
+    start = time.perf_counter()
+    for seed in range(schedules):
+        index.add_result(make_result(sections, seed=seed))
+    added = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index.double_booked('room')
+    built = time.perf_counter() - start
+
+    rng = random.Random(0)
+    rooms, people = index.names('room'), index.names('instructor')
+    start = time.perf_counter()
+    for _ in range(queries):
+        index.occupants('room', rng.choice(rooms))
+        index.occupants('instructor', rng.choice(people))
+    query = (time.perf_counter() - start) / (queries * 2)
+
+    start = time.perf_counter()
+    rooms_clash = index.double_booked('room')
+    people_clash = index.double_booked('instructor')
+    scan = time.perf_counter() - start
+    return {
+        'schedules': schedules,
+        'sections': len(index.events),
+        'rooms': len(rooms),
+        'instructors': len(people),
+        'add_s': round(added, 3),
+        'build_and_scan_s': round(built, 3),
+        'query_ms': round(query * 1000, 3),
+        'double_booked_s': round(scan, 3),
+        'room_clashes': len(rooms_clash),
+        'instructor_clashes': len(people_clash),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sections', type=int, default=8)
+    parser.add_argument('--schedules', type=int, default=2000)
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+
+    row = bench_student(args.sections)
+    print(f"student  {row['events']} events, {row['occurrences']} occurrences, {row['overlaps']} overlaps: "
+          f"sweep {row['sweep_ms']} ms, pairwise {row['pairwise_ms']} ms")
+    row = bench_bulk(args.schedules, args.sections, args.queries)
+    print(f"bulk     {row['schedules']} schedules, {row['sections']} distinct meetings, {row['rooms']} rooms, "
+          f"{row['instructors']} instructors")
+    print(f"         add {row['add_s']} s, build + first scan {row['build_and_scan_s']} s, "
+          f"query {row['query_ms']} ms, double-booking scans {row['double_booked_s']} s "
+          f"({row['room_clashes']} room, {row['instructor_clashes']} instructor)")
+
+
+if __name__ == '__main__':
+    main()
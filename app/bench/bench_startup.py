@@ -0,0 +1,67 @@
+"""Measure GUI module import cost with `python -X importtime`.
+
+"eager" imports app.py together with the pipeline and provider modules it
+used to star-import at load time. "lazy" imports app.py alone, which is what
+opening the window costs now. Each is run in a fresh interpreter several times
+and the fastest run is kept.
+
+Usage: python bench_startup.py [--runs 5]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+SCENARIOS = {
+    'eager': 'import app, parse_schedule, events, providers, google_calendar, outlook_calendar',
+    'lazy': 'import app',
+}
+
+
+def import_time(statement):
+    """Return (total microseconds, {top-level module: cumulative us}) for one fresh interpreter."""
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        cwd=SRC, capture_output=True, text=True, check=True,
+    )
+    modules = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Top-level imports are the ones not indented under another module
+        if name.startswith(' ') and not name.startswith('  '):
+            modules[name.strip()] = int(cumulative)
+    return sum(modules.values()), modules
+
+
+def measure(runs=5):
+    """Return {scenario: {'total_ms', 'top'}} keeping the fastest of several runs."""
+    report = {}
+    for scenario, statement in SCENARIOS.items():
+        best = min((import_time(statement) for _ in range(runs)), key=lambda r: r[0])
+        top = sorted(best[1].items(), key=lambda kv: kv[1], reverse=True)[:8]
+        report[scenario] = {
+            'total_ms': round(best[0] / 1000, 1),
+            'top': {name: round(us / 1000, 1) for name, us in top},
+        }
+    return report
+
+
+def print_report(report):
+    for scenario, row in report.items():
+        top = ', '.join(f"{name} {ms}ms" for name, ms in list(row['top'].items())[:5])
+        print(f"{scenario:<6} startup imports {row['total_ms']:>8.1f} ms   ({top})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+    print_report(measure(args.runs))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""Compare buffered and streaming PrintSchedule fetches over a local HTTP server.
+
+The server sends a gzip-compressed synthetic page, with markup before and
+after the result object, at a fixed bandwidth. "buffered" downloads the whole
+page and scans it; "stream" reads chunks and hangs up once the result object
+is complete. Wire bytes are the compressed bytes the client actually read.
+
+Usage: python bench_stream.py [--sections 50 500] [--padding-kb 512] [--trailing-kb 2048] [--mbps 50] [--non-ascii]
+"""
+import argparse
+import gzip
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+import parse_schedule  # noqa: E402
+from synthetic import make_page, make_result  # noqa: E402
+
+PATH = '/Student/Planning/DegreePlans/PrintSchedule?termId=F25'
+WRITE_BYTES = 16 * 1024
+
+
+def serve(body, mbps):
+    """Start a server answering every GET with body (gzip) at roughly mbps megabits per second."""
+    delay = WRITE_BYTES * 8 / (mbps * 1e6) if mbps else 0
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Encoding', 'gzip')
+            self.send_header('Content-Length', str(len(body)))
+            # One request per connection, the streaming client hangs up mid-body anyway
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            try:
+                for start in range(0, len(body), WRITE_BYTES):
+                    self.wfile.write(body[start:start + WRITE_BYTES])
+                    time.sleep(delay)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def fetch(url, stream):
+    """Return (seconds, peak traced bytes, wire bytes, courses, result) for one fetch + extract."""
+    raw = []
+    sess = requests.Session()
+    # Keep the urllib3 response to count the compressed bytes read off the socket
+    sess.hooks['response'].append(lambda resp, *a, **k: raw.append(resp.raw))
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    data = parse_schedule._fetch_with_session(sess, url, stream=stream)
+    result = parse_schedule.extract_result(data)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    sess.close()
+    courses = sum(len(t['PlannedCourses']) for t in result['Terms'])
+    return elapsed, peak, raw[0].tell(), courses, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sections', type=int, nargs='+', default=[50, 500])
+    parser.add_argument('--padding-kb', type=int, default=512)
+    parser.add_argument('--trailing-kb', type=int, default=2048)
+    parser.add_argument('--mbps', type=float, default=50, help='server bandwidth, 0 for unlimited')
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--non-ascii', action='store_true', help='UTF-8 instructor names instead of ASCII only')
+    args = parser.parse_args()
+
+    print(f"{'sections':>8} {'page MB':>8} {'gzip MB':>8} {'mode':<9} {'time s':>8} {'wire MB':>8} {'peak MB':>8}  courses")
+    for sections in args.sections:
+        result = make_result(sections, non_ascii=args.non_ascii)
+        page = make_page(result, args.padding_kb, args.trailing_kb, ensure_ascii=not args.non_ascii).encode('utf-8')
+        body = gzip.compress(page)
+        server = serve(body, args.mbps)
+        url = f"http://127.0.0.1:{server.server_address[1]}{PATH}"
+        try:
+            for mode, stream in (('buffered', False), ('stream', True)):
+                elapsed, peak, wire, courses, extracted = min((fetch(url, stream) for _ in range(args.runs)),
+                                                              key=lambda r: r[0])
+                assert extracted == result, f"{mode} fetch returned a different result object"
+                print(f"{sections:>8} {len(page) / 1e6:>8.2f} {len(body) / 1e6:>8.2f} {mode:<9} {elapsed:>8.3f} "
+                      f"{wire / 1e6:>8.2f} {peak / 1e6:>8.1f}  {courses}")
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Import into fake providers that enforce a per-second write quota.
+
+Both importers run through the shared RequestScheduler. The run fails if any
+event is lost to throttling. Each provider is run twice: with the client-side
+token bucket off (only backoff and adaptive concurrency react to the quota)
+and with the bucket set to the server's quota.
+
+Usage: python bench_throttle.py [--events N] [--quota PER_SECOND] [--latency SECONDS]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+import google_calendar  # noqa: E402
+import outlook_calendar  # noqa: E402
+import scheduler  # noqa: E402
+import tracing  # noqa: E402
+from bench_outlook import synthetic_events  # noqa: E402
+from fake_google import FakeGoogle  # noqa: E402
+from fake_graph import FakeGraph  # noqa: E402
+
+
+def run(label, fake, module, rate, fn):
+    module.RATE_LIMIT, module.RATE_BURST = rate, rate
+    tracing.reset()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        created = fn()
+    elapsed = time.perf_counter() - start
+    counters = tracing.snapshot()['counters']
+    name = module.__name__.split('_')[0]
+    print(f"{label:<24} {elapsed:7.2f}s  created={created:<5} rejected={fake.rejected:<5} "
+          f"requests={counters.get(f'{name}.requests', 0):<4} retries={counters.get(f'{name}.retries', 0)}")
+    fake.rejected = 0
+    return created
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=400)
+    parser.add_argument('--quota', type=int, default=100, help='writes per second the fake servers accept')
+    parser.add_argument('--latency', type=float, default=0.02)
+    args = parser.parse_args()
+
+    # Keep retries snappy; the fakes ask for Retry-After: 1 at most
+    scheduler.BACKOFF_BASE = 0.25
+    tracing.enable()
+    events = synthetic_events(args.events)
+    lost = []
+    with FakeGoogle(latency=args.latency, quota=args.quota) as google, \
+            FakeGraph(latency=args.latency, quota=args.quota) as graph:
+        outlook_calendar.GRAPH_BASE = graph.url
+        google_calendar.CALENDAR_CACHE_PATH = os.path.join(tempfile.mkdtemp(), 'calendar_ids.json')
+        service = google.service()
+        for rate in (None, args.quota):
+            mode = 'bucket' if rate else 'no bucket'
+            calendar_id = google_calendar.get_or_create_calendar(service, f"Throttle {mode}")
+            created = run(f"google ({mode})", google, google_calendar, rate, lambda: google_calendar.import_events_to_calendar(
+                service, calendar_id, events)['created'])
+            if created != len(events):
+                lost.append(f"google ({mode}): {created}/{len(events)}")
+
+            calendar_id = outlook_calendar.get_or_create_outlook_calendar('bench-token', f"Throttle {mode}")
+            created = run(f"outlook ({mode})", graph, outlook_calendar, rate, lambda: outlook_calendar.import_events_to_outlook(
+                'bench-token', calendar_id, events)['created'])
+            if created != len(events):
+                lost.append(f"outlook ({mode}): {created}/{len(events)}")
+
+    if lost:
+        sys.exit(f"❌ Events lost to throttling: {', '.join(lost)}")
+    print(f"✅ Every import created all {len(events)} events under a {args.quota}/s quota.")
+
+
+if __name__ == '__main__':
+    main()
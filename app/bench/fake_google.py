@@ -0,0 +1,216 @@
+"""Local stand-in for the Google Calendar v3 endpoints used by google_calendar."""
+import json
+import threading
+import time
+import uuid
+import zlib
+from email.parser import FeedParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+import httplib2
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+
+REASONS = {200: 'OK', 204: 'No Content', 403: 'Forbidden', 404: 'Not Found', 409: 'Conflict'}
+
+
+class FakeGoogle:
+    """Threaded HTTP server speaking enough of Calendar v3 (including multipart batch).
+
+    latency: seconds slept before answering every HTTP request
+    throttle_every: answer every Nth distinct event with rateLimitExceeded the first time it is seen
+    quota: event writes allowed per second, writes over it get rateLimitExceeded
+    """
+
+    def __init__(self, latency=0.0, throttle_every=0, quota=0):
+        self.latency = latency
+        self.throttle_every = throttle_every
+        self.quota = quota
+        self.rejected = 0
+        self._window = (0, 0)
+        self.calendars = {}
+        self.events = {}
+        self.connections = 0
+        self.http_requests = 0
+        self._throttled = set()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._server.daemon_threads = True
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/"
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def reset_counters(self):
+        with self._lock:
+            self.connections = 0
+            self.http_requests = 0
+
+    def service(self):
+        """Build a real googleapiclient service whose root URL points at this server."""
+        doc = json.loads(get_static_doc('calendar', 'v3'))
+        doc['rootUrl'] = self.url
+        doc['baseUrl'] = self.url + doc['servicePath']
+        return build_from_document(doc, http=httplib2.Http())
+
+    # === REQUEST HANDLING ===
+    def _over_quota(self):
+        """Fixed one-second window counter, called with the lock held."""
+        if not self.quota:
+            return False
+        second = int(time.monotonic())
+        window, used = self._window
+        used = used + 1 if window == second else 1
+        self._window = (second, used)
+        if used > self.quota:
+            self.rejected += 1
+            return True
+        return False
+
+    def _write_event(self, calendar_id, body, upsert=False):
+        with self._lock:
+            key = body.get('summary')
+            if self.throttle_every and key not in self._throttled and zlib.crc32(key.encode()) % self.throttle_every == 0:
+                self._throttled.add(key)
+                return 403, {"error": {"errors": [{"reason": "rateLimitExceeded"}], "code": 403}}
+            if self._over_quota():
+                return 403, {"error": {"errors": [{"reason": "userRateLimitExceeded"}], "code": 403}}
+            events = self.events.setdefault(calendar_id, {})
+            if upsert and body.get('iCalUID'):
+                for event in events.values():
+                    if event.get('iCalUID') == body['iCalUID']:
+                        event.update(body)
+                        return 200, event
+            event = dict(body, id=uuid.uuid4().hex)
+            event.setdefault('iCalUID', f"{event['id']}@google.com")
+            events[event['id']] = event
+        return 200, event
+
+    def _route(self, method, path, body):
+        path = path.split('?')[0]
+        parts = [unquote(p) for p in path.split('/') if p]
+        if parts[:2] == ['calendar', 'v3']:
+            parts = parts[2:]
+
+        if parts == ['users', 'me', 'calendarList'] and method == 'GET':
+            return 200, {"items": list(self.calendars.values())}
+        if parts == ['calendars'] and method == 'POST':
+            cal = dict(body, id=f"{uuid.uuid4().hex}@group.calendar.google.com")
+            self.calendars[cal['id']] = cal
+            return 200, cal
+        if len(parts) == 2 and parts[0] == 'calendars' and method == 'GET':
+            cal = self.calendars.get(parts[1])
+            return (200, cal) if cal else (404, {"error": {"code": 404}})
+
+        if len(parts) >= 3 and parts[0] == 'calendars' and parts[2] == 'events':
+            calendar_id = parts[1]
+            if len(parts) == 3 and method == 'GET':
+                return 200, {"items": list(self.events.get(calendar_id, {}).values())}
+            if len(parts) == 3 and method == 'POST':
+                return self._write_event(calendar_id, body)
+            if parts[3:] == ['import'] and method == 'POST':
+                return self._write_event(calendar_id, body, upsert=True)
+            if len(parts) == 4:
+                with self._lock:
+                    event = self.events.get(calendar_id, {}).get(parts[3])
+                    if event is None:
+                        return 404, {"error": {"code": 404}}
+                    if method == 'DELETE':
+                        del self.events[calendar_id][parts[3]]
+                        return 204, None
+                    event.update(body)
+                    return 200, event
+
+        return 404, {"error": {"code": 404, "message": f"{method} {path}"}}
+
+    def _batch(self, content_type, payload):
+        parser = FeedParser()
+        parser.feed(f"Content-Type: {content_type}\r\n\r\n" + payload.decode('utf-8'))
+        boundary = uuid.uuid4().hex
+        out = []
+        for part in parser.close().get_payload():
+            request_line, rest = part.get_payload().split('\n', 1)
+            method, path, _ = request_line.split(' ', 2)
+            inner = FeedParser()
+            inner.feed(rest)
+            body = inner.close().get_payload()
+            status, data = self._route(method, path, json.loads(body) if body.strip() else None)
+            text = json.dumps(data) if data is not None else ''
+            content_id = part['Content-ID']
+            out.append(
+                f"--{boundary}\r\nContent-Type: application/http\r\n"
+                f"Content-ID: <response-{content_id[1:]}\r\n\r\n"
+                f"HTTP/1.1 {status} {REASONS.get(status, 'Error')}\r\n"
+                f"Content-Type: application/json; charset=UTF-8\r\n\r\n{text}\r\n"
+            )
+        out.append(f"--{boundary}--\r\n")
+        return f"multipart/mixed; boundary={boundary}", ''.join(out).encode('utf-8')
+
+    def _handler(self):
+        google = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Send headers and body in one segment so keep-alive clients don't hit delayed ACKs
+            wbufsize = -1
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with google._lock:
+                    google.connections += 1
+
+            def log_message(self, *args):
+                pass
+
+            def _dispatch(self, method):
+                with google._lock:
+                    google.http_requests += 1
+                length = int(self.headers.get('Content-Length') or 0)
+                raw = self.rfile.read(length) if length else b''
+                if google.latency:
+                    time.sleep(google.latency)
+
+                if self.path.startswith('/batch/'):
+                    content_type, data = google._batch(self.headers['Content-Type'], raw)
+                    status = 200
+                else:
+                    status, payload = google._route(method, self.path, json.loads(raw) if raw else None)
+                    content_type = 'application/json'
+                    data = json.dumps(payload).encode() if payload is not None else b''
+
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._dispatch('GET')
+
+            def do_POST(self):
+                self._dispatch('POST')
+
+            def do_PATCH(self):
+                self._dispatch('PATCH')
+
+            def do_DELETE(self):
+                self._dispatch('DELETE')
+
+        return Handler
@@ -0,0 +1,208 @@
+"""Local stand-in for the Microsoft Graph calendar endpoints used by outlook_calendar."""
+import json
+import threading
+import time
+import uuid
+import zlib
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+class FakeGraph:
+    """Threaded HTTP server that records events and counts TCP connections.
+
+    latency: seconds slept before answering every HTTP request
+    throttle_every: answer every Nth distinct event with a 429 the first time it is seen
+    quota: event writes allowed per second, writes over it get a 429 with Retry-After
+    fail_deletes: answer this many occurrence deletions with a 403 before accepting them
+
+    An /instances lookup of a series answers with one occurrence in the middle of the
+    requested window, and deleting it records (series id, start) in cancelled.
+    """
+
+    def __init__(self, latency=0.0, throttle_every=0, quota=0, fail_deletes=0):
+        self.latency = latency
+        self.throttle_every = throttle_every
+        self.quota = quota
+        self.fail_deletes = fail_deletes
+        self.rejected = 0
+        self._window = (0, 0)
+        self.calendars = {}
+        self.events = {}
+        self.cancelled = []
+        self._occurrences = {}
+        self.connections = 0
+        self.http_requests = 0
+        self.batch_items = 0
+        self._throttled = set()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/v1.0"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def reset_counters(self):
+        with self._lock:
+            self.connections = 0
+            self.http_requests = 0
+            self.batch_items = 0
+
+    # === REQUEST HANDLING ===
+    def _over_quota(self):
+        """Fixed one-second window counter, called with the lock held."""
+        if not self.quota:
+            return False
+        second = int(time.monotonic())
+        window, used = self._window
+        used = used + 1 if window == second else 1
+        self._window = (second, used)
+        if used > self.quota:
+            self.rejected += 1
+            return True
+        return False
+
+    def _create_event(self, calendar_id, body):
+        with self._lock:
+            key = body.get('subject')
+            if self.throttle_every and key not in self._throttled and zlib.crc32(key.encode()) % self.throttle_every == 0:
+                self._throttled.add(key)
+                return 429, {"Retry-After": "0"}, {"error": {"code": "TooManyRequests"}}
+            if self._over_quota():
+                return 429, {"Retry-After": "1"}, {"error": {"code": "ApplicationThrottled"}}
+            event = dict(body, id=uuid.uuid4().hex)
+            self.events.setdefault(calendar_id, []).append(event)
+        return 201, {}, event
+
+    def _occurrence(self, series_id, query):
+        """One occurrence of a series halfway through the queried window, unless it was deleted."""
+        with self._lock:
+            if not any(e['id'] == series_id and e.get('recurrence') for es in self.events.values() for e in es):
+                return 404, {}, {"error": {"code": "ErrorItemNotFound"}}
+            start = datetime.fromisoformat(query['startDateTime'][0])
+            end = datetime.fromisoformat(query['endDateTime'][0])
+            middle = (start + (end - start) / 2).astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S')
+            if (series_id, middle) in self.cancelled:
+                return 200, {}, {"value": []}
+            occurrence_id = f"{series_id}-{len(self._occurrences)}"
+            self._occurrences[occurrence_id] = (series_id, middle)
+        return 200, {}, {"value": [{"id": occurrence_id, "start": {"dateTime": middle, "timeZone": "UTC"}}]}
+
+    def _route(self, method, path, body):
+        query = parse_qs(path.split('?', 1)[1]) if '?' in path else {}
+        parts = [p for p in path.split('?')[0].split('/') if p]
+        if parts[:1] == ['v1.0']:
+            parts = parts[1:]
+
+        if parts == ['$batch'] and method == 'POST':
+            responses = []
+            with self._lock:
+                self.batch_items += len(body.get('requests', []))
+            for req in body.get('requests', []):
+                status, headers, payload = self._route(req['method'], req['url'], req.get('body'))
+                responses.append({"id": req['id'], "status": status, "headers": headers, "body": payload})
+            return 200, {}, {"responses": responses}
+
+        if parts == ['me', 'calendars']:
+            if method == 'GET':
+                return 200, {}, {"value": list(self.calendars.values())}
+            cal = {"id": uuid.uuid4().hex, "name": body['name']}
+            self.calendars[cal['id']] = cal
+            return 201, {}, cal
+
+        if len(parts) == 4 and parts[:2] == ['me', 'calendars'] and parts[3] == 'events':
+            if method == 'GET':
+                return 200, {}, {"value": self.events.get(parts[2], [])}
+            return self._create_event(parts[2], body)
+
+        if len(parts) == 4 and parts[:2] == ['me', 'events'] and parts[3] == 'instances' and method == 'GET':
+            return self._occurrence(parts[2], query)
+
+        if len(parts) == 3 and parts[:2] == ['me', 'events'] and method == 'DELETE' and parts[2] in self._occurrences:
+            with self._lock:
+                if self.fail_deletes:
+                    self.fail_deletes -= 1
+                    return 403, {}, {"error": {"code": "ErrorAccessDenied"}}
+                self.cancelled.append(self._occurrences.pop(parts[2]))
+            return 204, {}, None
+
+        if len(parts) == 3 and parts[:2] == ['me', 'events']:
+            with self._lock:
+                for events in self.events.values():
+                    for i, event in enumerate(events):
+                        if event['id'] != parts[2]:
+                            continue
+                        if method == 'DELETE':
+                            del events[i]
+                            return 204, {}, None
+                        event.update(body)
+                        return 200, {}, event
+
+        return 404, {}, {"error": {"code": "NotFound"}}
+
+    def _handler(self):
+        graph = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Send headers and body in one segment so keep-alive clients don't hit delayed ACKs
+            wbufsize = -1
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with graph._lock:
+                    graph.connections += 1
+
+            def log_message(self, *args):
+                pass
+
+            def _dispatch(self, method):
+                with graph._lock:
+                    graph.http_requests += 1
+                length = int(self.headers.get('Content-Length') or 0)
+                body = json.loads(self.rfile.read(length)) if length else None
+                if graph.latency:
+                    time.sleep(graph.latency)
+                status, headers, payload = graph._route(method, self.path, body)
+                data = json.dumps(payload).encode() if payload is not None else b''
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._dispatch('GET')
+
+            def do_POST(self):
+                self._dispatch('POST')
+
+            def do_PATCH(self):
+                self._dispatch('PATCH')
+
+            def do_DELETE(self):
+                self._dispatch('DELETE')
+
+        return Handler
@@ -0,0 +1,199 @@
+"""End-to-end benchmark of the schedule pipeline on synthetic schedules.
+
+Times extract_courses, sorted_courses, build_events, generate_ics,
+import_ics_to_calendar and import_ics_to_outlook at each scale, then both
+imports running side by side, plus the GUI's startup import time. The Google
+and Graph endpoints are local fake servers with configurable latency. Results
+are written as JSON so runs on different commits can be compared.
+
+Usage:
+    python run_bench.py [--scales 5 50 500 5000 50000] [--latency 0.02] [-o results.json]
+    python run_bench.py --compare old.json new.json
+    python run_bench.py --trace trace.json   # also record a Chrome trace of every stage
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+import google_calendar  # noqa: E402
+import outlook_calendar  # noqa: E402
+import tracing  # noqa: E402
+from events import build_events  # noqa: E402
+from fake_google import FakeGoogle  # noqa: E402
+from fake_graph import FakeGraph  # noqa: E402
+from bench_startup import measure as measure_startup, print_report as print_startup  # noqa: E402
+from parse_schedule import extract_courses, generate_ics, sorted_courses  # noqa: E402
+from providers import run_providers  # noqa: E402
+from synthetic import make_page, make_result  # noqa: E402
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def timed(stages, name, fn):
+    start = time.perf_counter()
+    # Importers print a line per failure and a summary, keep the report readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = fn()
+    stages[name] = round(time.perf_counter() - start, 6)
+    return result
+
+
+def bench_scale(sections, args, google, graph, workdir):
+    term = 'F25'
+    page = make_page(make_result(sections, seed=sections), args.padding_kb)
+    stages = {}
+
+    courses = timed(stages, 'extract_courses', lambda: extract_courses(page, term))
+    meetings = timed(stages, 'sorted_courses', lambda: sorted_courses(courses))
+    events = timed(stages, 'build_events', lambda: build_events(meetings, term=term))
+    ics_path = os.path.join(workdir, f"bench_{sections}.ics")
+    timed(stages, 'generate_ics', lambda: generate_ics(events, ics_path))
+
+    row = {
+        'sections': sections,
+        'page_bytes': len(page),
+        'meetings': len(meetings),
+        'events': len(events),
+        'ics_bytes': os.path.getsize(ics_path),
+        'stages': stages,
+        'providers': {},
+    }
+
+    if len(events) > args.max_import_events:
+        row['providers'] = {'skipped': f"more than {args.max_import_events} events"}
+        return row
+
+    service = google.service()
+    calendar_id = google_calendar.get_or_create_calendar(service, f"Bench {sections}")
+    google.reset_counters()
+    result = timed(stages, 'import_ics_to_calendar',
+                   lambda: google_calendar.import_ics_to_calendar(service, calendar_id, ics_path))
+    row['providers']['google'] = {
+        'created': result['created'], 'http_requests': google.http_requests, 'connections': google.connections,
+    }
+
+    outlook_calendar._session = None
+    calendar_id = outlook_calendar.get_or_create_outlook_calendar('bench-token', f"Bench {sections}")
+    graph.reset_counters()
+    result = timed(stages, 'import_ics_to_outlook',
+                   lambda: outlook_calendar.import_ics_to_outlook('bench-token', calendar_id, ics_path))
+    row['providers']['outlook'] = {
+        'created': result['created'], 'http_requests': graph.http_requests, 'connections': graph.connections,
+    }
+
+    # Both imports at once, into fresh calendars, as the GUI runs them
+    google_id = google_calendar.get_or_create_calendar(service, f"Bench {sections} concurrent")
+    outlook_id = outlook_calendar.get_or_create_outlook_calendar('bench-token', f"Bench {sections} concurrent")
+    jobs = {
+        'google': lambda progress: google_calendar.import_events_to_calendar(service, google_id, events, progress=progress),
+        'outlook': lambda progress: outlook_calendar.import_events_to_outlook('bench-token', outlook_id, events, progress=progress),
+    }
+    results = timed(stages, 'import_both_concurrent', lambda: run_providers(jobs))
+    row['providers']['concurrent'] = {name: r['result']['created'] if r['ok'] else r['error'] for name, r in results.items()}
+    return row
+
+
+def run(args):
+    report = {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'params': {'latency': args.latency, 'padding_kb': args.padding_kb,
+                   'max_import_events': args.max_import_events},
+        'results': [],
+    }
+    if args.trace:
+        tracing.reset()
+        tracing.enable()
+    with FakeGoogle(latency=args.latency) as google, FakeGraph(latency=args.latency) as graph, \
+            tempfile.TemporaryDirectory() as workdir:
+        outlook_calendar.GRAPH_BASE = graph.url
+        # The fakes enforce no quota, measure the pipeline rather than the client-side rate limit
+        google_calendar.RATE_LIMIT = outlook_calendar.RATE_LIMIT = None
+        google_calendar.CALENDAR_CACHE_PATH = os.path.join(workdir, 'calendar_ids.json')
+        for sections in args.scales:
+            row = bench_scale(sections, args, google, graph, workdir)
+            report['results'].append(row)
+            stages = '  '.join(f"{k}={v:.3f}s" for k, v in row['stages'].items())
+            print(f"{sections:>6} sections {row['events']:>7} events  {stages}")
+    # GUI startup: app.py imports with the old eager set vs the lazy one
+    report['startup'] = measure_startup(runs=3)
+    print_startup(report['startup'])
+    if args.trace:
+        report['trace'] = {k: v for k, v in tracing.snapshot().items() if k != 'spans'}
+        tracing.export_chrome_trace(args.trace)
+        tracing.disable()
+        print(f"Chrome trace written to {args.trace}")
+    return report
+
+
+def compare(old_path, new_path):
+    with open(old_path, encoding='utf-8') as f:
+        old = json.load(f)
+    with open(new_path, encoding='utf-8') as f:
+        new = json.load(f)
+    print(f"{old['commit']} → {new['commit']}")
+    old_rows = {r['sections']: r for r in old['results']}
+    for row in new['results']:
+        before = old_rows.get(row['sections'])
+        if not before:
+            continue
+        for stage, seconds in row['stages'].items():
+            prev = before['stages'].get(stage)
+            if prev:
+                flag = '  ⚠ slower' if seconds > prev * 1.10 else ''
+                print(f"{row['sections']:>6} {stage:<24} {prev:>9.4f}s → {seconds:>9.4f}s  x{prev / seconds:>6.2f}{flag}")
+    for scenario, row in new.get('startup', {}).items():
+        prev = old.get('startup', {}).get(scenario)
+        if prev:
+            print(f"startup {scenario:<22} {prev['total_ms']:>8.1f}ms → {row['total_ms']:>8.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', type=int, nargs='+', default=[5, 50, 500, 5000],
+                        help='number of sections per synthetic schedule')
+    parser.add_argument('--latency', type=float, default=0.02, help='fake provider latency per HTTP request (s)')
+    parser.add_argument('--padding-kb', type=int, default=256, help='unrelated markup around the payload')
+    parser.add_argument('--max-import-events', type=int, default=5000,
+                        help='skip provider imports above this many events')
+    parser.add_argument('--trace', metavar='PATH', help='enable tracing and write a Chrome trace to PATH')
+    parser.add_argument('-o', '--output', help='result file (default: results/<commit>-<time>.json)')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='compare two result files')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    report = run(args)
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{report['commit']}-{report['timestamp'].replace(':', '')}.json")
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""Synthetic PrintSchedule `result` payloads and pages at configurable scale."""
+import json
+import random
+
+METHODS = ['LEC', 'LAB', 'SEM', 'TUT']
+DAYS = ['M', 'T', 'W', 'Th', 'F', 'MW', 'TTh', 'MWF']
+BUILDINGS = ['ROZH', 'MCKN', 'THRN', 'ALEX', 'MACS', 'SSC', 'RICH']
+TIMES = [('8:30 AM', '9:20 AM'), ('10:00 AM', '11:20 AM'), ('11:30 AM', '12:20 PM'),
+         ('1:00 PM', '2:20 PM'), ('2:30 PM', '4:20 PM'), ('7:00 PM', '9:50 PM')]
+TERMS = {
+    'F25': ('9/4/2025', '12/12/2025'),
+    'W26': ('1/5/2026', '4/24/2026'),
+    'S26': ('5/4/2026', '8/21/2026'),
+}
+
+
+def make_section(rng, index, term='F25'):
+    start_date, end_date = TERMS[term]
+    meetings = []
+    for method in rng.sample(METHODS, rng.randint(1, 3)):
+        start, end = rng.choice(TIMES)
+        meetings.append({
+            "InstructionalMethod": method,
+            "StartTime": start,
+            "EndTime": end,
+            "FormattedTime": f"{start} - {end}",
+            "DaysOfWeek": rng.choice(DAYS),
+            "MeetingLocation": f"{rng.choice(BUILDINGS)}, Room {rng.randint(100, 399)} ",
+            "StartDateString": start_date,
+            "EndDateString": end_date,
+        })
+    meetings.append({
+        "InstructionalMethod": "EXAM",
+        "StartTime": "8:30 AM",
+        "EndTime": "10:30 AM",
+        "FormattedTime": "8:30 AM - 10:30 AM",
+        "DaysOfWeek": "",
+        "MeetingLocation": "TBA",
+        "StartDateString": end_date,
+        "EndDateString": end_date,
+    })
+    return {
+        "Section": {
+            "Id": f"{term}-{index}",
+            "CourseName": f"{rng.choice(['CIS', 'MATH', 'STAT', 'HIST', 'BIOL'])}*{1000 + index % 4000}",
+            "Number": f"{index % 90 + 1:04d}",
+            "MinimumCredits": 0.5,
+            "Faculty": [f"Instructor {rng.randint(1, 400)}" for _ in range(rng.randint(1, 3))],
+            "PlannedMeetings": meetings,
+        }
+    }
+
+
+FACULTY = ['Zoë Brontë', 'José Núñez', 'Łukasz Wójcik', '李明', 'Ngọc Trần']
+
+
+def make_result(sections, terms=('F25',), seed=0, tricky=False, non_ascii=False):
+    """Build a `result` payload with `sections` planned courses spread over `terms`.
+
+    non_ascii names the instructors with accented and CJK characters, as the real page can."""
+    rng = random.Random(seed)
+    result = {"Terms": []}
+    for t, term in enumerate(terms):
+        planned = [make_section(rng, i, term) for i in range(t, sections, len(terms))]
+        result["Terms"].append({"Code": term, "Description": f"Term {term}", "PlannedCourses": planned})
+    if tricky and result["Terms"][0]["PlannedCourses"]:
+        # A string containing "};" cuts the old non-greedy regex short
+        result["Terms"][0]["PlannedCourses"][0]["Section"]["Notes"] = "see handout {week 1};"
+    if non_ascii:
+        for term in result["Terms"]:
+            for course in term["PlannedCourses"]:
+                course["Section"]["Faculty"] = [rng.choice(FACULTY) for _ in course["Section"]["Faculty"]]
+    return result
+
+
+def _rows(kb):
+    rows = []
+    size = 0
+    i = 0
+    while size < kb * 1024:
+        row = f'<tr class="row-{i}"><td><a href="/Student/Courses/{i}">Course {i}</a></td><td>{"&nbsp;" * 8}</td></tr>\n'
+        rows.append(row)
+        size += len(row)
+        i += 1
+    return "".join(rows)
+
+
+def make_page(result, padding_kb=512, trailing_kb=0, ensure_ascii=True, end=";\nwindow.print();\n"):
+    """Wrap a payload in a PrintSchedule-like page with `padding_kb` of unrelated markup before it
+    and `trailing_kb` after it.
+
+    ensure_ascii=False writes non-ASCII characters as UTF-8 rather than \\u escapes; end is
+    what follows the object inside its script tag."""
+    return (
+        "<!DOCTYPE html><html><head><title>Print Schedule</title>"
+        "<script>var config = {\"theme\": {\"dark\": false}};</script></head><body><table>\n"
+        + _rows(padding_kb)
+        + "</table><script>\nvar result = " + json.dumps(result, ensure_ascii=ensure_ascii) + end + "</script>"
+        + (f"<table>\n{_rows(trailing_kb)}</table>" if trailing_kb else "")
+        + "</body></html>"
+    )
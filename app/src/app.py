@@ -1,17 +1,36 @@
 import customtkinter as ctk
+import importlib
 import threading
-from parse_schedule import *
-from google_calendar import *
-from outlook_calendar import *
+from typing import Callable, Optional
+from progress import STAGES, Cancelled, ProgressChannel
+import tracing
+
+# How often the main loop drains the worker's progress channel (ms)
+POLL_INTERVAL = 100
+
+# Imported on first use (or by the warm-up thread) so the window opens without
+# paying for requests, pytz, googleapiclient and msal up front
+WARM_UP_MODULES = ('parse_schedule', 'events', 'overlaps', 'providers', 'google_calendar', 'outlook_calendar')
+
+# Overlapping meeting pairs listed in the status before the rest are summarized
+MAX_OVERLAPS_SHOWN = 3
+
+def _find_overlaps(events) -> list:
+    try:
+        from overlaps import find_overlaps
+    except ImportError:
+        # NumPy is optional, the run just goes without the overlap check
+        return []
+    return find_overlaps(events)
 
 class App(ctk.CTk):
-    def __init__(self):
+    def __init__(self, warm_up: bool = True):
         super().__init__()
         ctk.set_appearance_mode("System")
         ctk.set_default_color_theme("blue")
 
         self.title("Schedule Importer")
-        self.geometry("400x260")
+        self.geometry("420x400")
 
         # Variables
         self.term_var = ctk.StringVar()
@@ -19,8 +38,8 @@ class App(ctk.CTk):
         self.import_to_ocal = ctk.BooleanVar(value=False)
 
         # Layout
-        ctk.CTkLabel(self, text="Enter Term Code:").pack(pady=(20, 5))
-        self.term_entry = ctk.CTkEntry(self, textvariable=self.term_var, placeholder_text="i.e. W24")
+        ctk.CTkLabel(self, text="Enter Term Code(s):").pack(pady=(20, 5))
+        self.term_entry = ctk.CTkEntry(self, textvariable=self.term_var, placeholder_text="i.e. W24, F24")
         self.term_entry.pack(pady=5)
 
         # Google Calendar radio button
@@ -31,46 +50,183 @@ class App(ctk.CTk):
         self.ocal_checkbox = ctk.CTkCheckBox(self, text="Import to Outlook Calendar", variable=self.import_to_ocal)
         self.ocal_checkbox.pack(pady=5)
 
-        # Run button
-        self.button = ctk.CTkButton(self, text="Run Parser", command=self.start_task)
-        self.button.pack(pady=10)
+        # Run and Cancel buttons
+        buttons = ctk.CTkFrame(self, fg_color="transparent")
+        buttons.pack(pady=10)
+        self.button = ctk.CTkButton(buttons, text="Run Parser", command=self.start_task)
+        self.button.pack(side="left", padx=5)
+        self.cancel_button = ctk.CTkButton(buttons, text="Cancel", command=self.cancel_task, state="disabled")
+        self.cancel_button.pack(side="left", padx=5)
+
+        # Stage, overall progress and per-provider counts
+        self.stage_label = ctk.CTkLabel(self, text="")
+        self.stage_label.pack(pady=(5, 0))
+        self.progress_bar = ctk.CTkProgressBar(self, width=300)
+        self.progress_bar.set(0)
+        self.progress_bar.pack(pady=5)
+        self.provider_label = ctk.CTkLabel(self, text="")
+        self.provider_label.pack()
 
         self.status_label = ctk.CTkLabel(self, text="")
         self.status_label.pack(pady=5)
+        self.channel = None
+        self.provider_progress = {}
 
-    def run_schedule(self, term: str, import_to_gcal: bool, import_to_ocal: bool):
+        # Start importing the pipeline once the window is on screen
+        if warm_up:
+            self.after(200, lambda: threading.Thread(target=self.warm_up, daemon=True).start())
+
+    def warm_up(self):
+        """Import the heavy modules in the background while the user types a term."""
+        for name in WARM_UP_MODULES:
+            try:
+                importlib.import_module(name)
+            except ImportError:
+                # Surfaced properly when the stage that needs it runs
+                pass
+
+    def run_schedule(self, term: str, import_to_gcal: bool, import_to_ocal: bool, output_path: str = "../res/Schedule.ics",
+                     channel: ProgressChannel = None, screen: Optional[Callable[[], tuple[int, int]]] = None):
+        """Run the whole pipeline on a worker thread, reporting through channel. Returns the status text.
+
+        screen returns the display resolution for the login window, read on the main thread.
+        """
+        channel = channel or ProgressChannel()
+        # SCHEDULE_TRACE / SCHEDULE_CHROME_TRACE record where the run spent its time
+        tracing.configure_from_env()
         try:
-            html = fetch_page_info(term)
-            courses = extract_courses(html, term)
-            parsed = sorted_courses(courses)
-            output_path = "../res/Schedule.ics"
-            generate_ics(parsed, output_path)
-
-            if import_to_gcal:
-                service = authenticate_google()
-                calendar_id = get_or_create_calendar(service)
-                import_ics_to_calendar(service, calendar_id, output_path)
-
-            if import_to_ocal:
-                service = authenticate_outlook()
-                calendar_id = get_or_create_outlook_calendar(service)
-                import_ics_to_outlook(service, calendar_id, output_path)
-                
-            return f"✔ Parsed {len(parsed)} meetings → {output_path}"
+            from events import build_events
+            from parse_schedule import fetch_terms, sorted_courses
+            from providers import google_job, outlook_job, run_providers
+            from result_cache import ResultCache, content_key, export_ics
+
+            # Several comma-separated terms share one login and one page parse
+            terms = [t.strip() for t in term.split(",") if t.strip()]
+            channel.stage('Signing in', "Please log in when prompted.")
+            with tracing.span('schedule.fetch_terms', terms=len(terms)):
+                planned = fetch_terms(terms, cancel=channel.cancel_event, screen=screen)
+
+            channel.check()
+            channel.stage('Parsing', f"{len(planned)} term(s)")
+            events = []
+            meetings_by_term = {code: sorted_courses(courses) for code, courses in planned.items()}
+            parsed = [m for meetings in meetings_by_term.values() for m in meetings]
+            for code, meetings in meetings_by_term.items():
+                events += build_events(meetings, term=code)
+
+            # Clashes don't block the export, they're listed so the plan can be fixed
+            overlaps = _find_overlaps(events)
+
+            # Unchanged registrar data maps to the same key, so its ICS and imports can be reused
+            cache = ResultCache()
+            key = content_key(meetings_by_term)
+
+            # The ICS file is an optional export, providers sync from the events directly
+            cached_ics = False
+            if output_path:
+                channel.check()
+                channel.stage('Writing ICS', f"{len(events)} events")
+                cached_ics = export_ics(cache, key, terms, events, output_path)
+
+            # Both providers sign in and sync at the same time, one failing doesn't stop the other
+            def unchanged(name):
+                # Checked once the job knows the signed-in account and calendar
+                return lambda account, calendar_id: cache.imported(key, name, account, calendar_id)
+
+            jobs = {}
+            selected = {'Google': (import_to_gcal, google_job), 'Outlook': (import_to_ocal, outlook_job)}
+            for name, (wanted, job) in selected.items():
+                if wanted:
+                    jobs[name] = job(events, cancel=channel.cancel_event, unchanged=unchanged(name))
+            if jobs:
+                channel.check()
+                channel.stage('Importing', f"{len(events)} events")
+            results = run_providers(jobs, progress=channel.provider)
+
+            status = f"✔ Parsed {len(parsed)} meetings → {output_path or 'calendar'}"
+            if cached_ics:
+                status += " (unchanged)"
+            for o in overlaps[:MAX_OVERLAPS_SHOWN]:
+                status += f"\n⚠ {o.first.summary} overlaps {o.second.summary} from {o.start:%b %d %H:%M}"
+            if len(overlaps) > MAX_OVERLAPS_SHOWN:
+                status += f"\n⚠ ...and {len(overlaps) - MAX_OVERLAPS_SHOWN} more overlapping pair(s)"
+            for name, outcome in results.items():
+                if not outcome['ok']:
+                    status += f"\n❌ {name}: {outcome['error']}"
+                    continue
+                r = outcome['result']
+                if r.get('skipped'):
+                    status += f"\n⏭ {name}: unchanged since the last import"
+                    continue
+                if not r['failed']:
+                    cache.record_import(key, terms, name, r['account'], r['calendar_id'])
+                status += (f"\n{'❌' if r['failed'] else '✅'} {name}: {r['inserted']} added, {r['patched']} updated, "
+                           f"{r['deleted']} removed, {len(r['failed'])} failed in {outcome['seconds']:.1f}s")
+            return status
+        except Cancelled:
+            return "⏹ Cancelled"
         except Exception as e:
             return f"❌ Error: {str(e)}"
+        finally:
+            tracing.export_from_env()
 
     def start_task(self):
+        # Read the Tk variables and the screen size here, on the main thread
+        term = self.term_var.get().strip().upper() or "W24"
+        import_to_gcal, import_to_ocal = self.import_to_gcal.get(), self.import_to_ocal.get()
+        size = (self.winfo_screenwidth(), self.winfo_screenheight())
+        screen = lambda: size
+
         self.button.configure(state="disabled", text="Running...")
-        self.status_label.configure(text="Running... Please log in when prompted.")
+        self.cancel_button.configure(state="normal", text="Cancel")
+        self.status_label.configure(text="")
+        self.provider_label.configure(text="")
+        self.progress_bar.set(0)
+        self.provider_progress = {}
+
+        channel = self.channel = ProgressChannel()
 
         def worker():
-            term = self.term_var.get().strip().upper() or "W24"
-            result = self.run_schedule(term, self.import_to_gcal.get(), self.import_to_ocal.get())
-            self.status_label.configure(text=result)
-            self.button.configure(state="normal", text="Run Parser")
+            # The worker only talks to the GUI through the channel
+            channel.finish(self.run_schedule(term, import_to_gcal, import_to_ocal, channel=channel, screen=screen))
 
         threading.Thread(target=worker, daemon=True).start()
+        self.after(POLL_INTERVAL, self.poll_progress, channel)
+
+    def cancel_task(self):
+        if self.channel is not None:
+            self.channel.cancel()
+            self.cancel_button.configure(state="disabled", text="Cancelling...")
+
+    def poll_progress(self, channel: ProgressChannel):
+        """Apply queued progress messages on the main thread, then check again shortly."""
+        for message in channel.drain():
+            kind = message[0]
+            if kind == 'stage':
+                _, name, detail = message
+                self.stage_label.configure(text=f"{name}... {detail}".strip())
+                # A stage starts where the previous one ends on the bar
+                names = list(STAGES)
+                index = names.index(name)
+                self.progress_bar.set(STAGES[names[index - 1]] if index else 0)
+            elif kind == 'provider':
+                _, name, done, total = message
+                self.provider_progress[name] = (done, total)
+                self.provider_label.configure(text="   ".join(
+                    f"{n}: {d}/{t}" for n, (d, t) in self.provider_progress.items()))
+                start = STAGES['Writing ICS']
+                share = sum(d / t if t else 1 for d, t in self.provider_progress.values()) / len(self.provider_progress)
+                self.progress_bar.set(start + (1 - start) * share)
+            elif kind == 'done':
+                self.status_label.configure(text=message[1])
+                self.stage_label.configure(text="")
+                if not channel.cancelled and not message[1].startswith("❌"):
+                    self.progress_bar.set(1)
+                self.button.configure(state="normal", text="Run Parser")
+                self.cancel_button.configure(state="disabled", text="Cancel")
+                self.channel = None
+                return
+        self.after(POLL_INTERVAL, self.poll_progress, channel)
 
 # Launch GUI
 if __name__ == "__main__":
@@ -0,0 +1,139 @@
+"""Convert many exported `result` payloads to ICS files across a process pool.
+
+Usage:
+    python bulk_convert.py payloads/ -o out/            # directory of *.json payloads
+    python bulk_convert.py payloads.ndjson -o out/      # one payload per line ('-' reads stdin)
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from events import build_events
+from parse_schedule import generate_ics, sorted_courses
+
+def iter_sources(path: str):
+    """Yield (name, kind, data) for every payload under path.
+
+    Directory entries are passed as file paths so workers read them
+    themselves, NDJSON lines are passed as text.
+    """
+    if os.path.isdir(path):
+        for entry in sorted(os.listdir(path)):
+            if entry.endswith('.json'):
+                yield os.path.splitext(entry)[0], 'file', os.path.join(path, entry)
+        return
+
+    stream = sys.stdin if path == '-' else open(path, 'r', encoding='utf-8')
+    try:
+        for lineno, line in enumerate(stream, 1):
+            if line.strip():
+                yield f"line-{lineno:06d}", 'text', line
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+def _convert_one(name, kind, data, output_dir, terms):
+    start = time.perf_counter()
+    record = {'source': name, 'output': None, 'terms': [], 'meetings': 0, 'events': 0, 'error': None}
+    try:
+        if kind == 'file':
+            with open(data, 'r', encoding='utf-8') as f:
+                payload = json.load(f)
+        else:
+            payload = json.loads(data)
+
+        events = []
+        for term in payload.get('Terms', []):
+            if terms and term.get('Code') not in terms:
+                continue
+            meetings = sorted_courses(term.get('PlannedCourses', []))
+            events += build_events(meetings, term=term.get('Code'))
+            record['terms'].append(term.get('Code'))
+            record['meetings'] += len(meetings)
+
+        record['output'] = os.path.join(output_dir, f"{name}.ics")
+        generate_ics(events, record['output'])
+        record['events'] = len(events)
+    except Exception as e:
+        # One bad payload must not take the rest of the run down with it
+        record['error'] = f"{type(e).__name__}: {e}"
+    record['seconds'] = round(time.perf_counter() - start, 6)
+    return record
+
+def _convert_chunk(chunk, output_dir, terms):
+    return [_convert_one(name, kind, data, output_dir, terms) for name, kind, data in chunk]
+
+def _chunks(iterable, size):
+    it = iter(iterable)
+    while chunk := list(islice(it, size)):
+        yield chunk
+
+def convert_bulk(sources, output_dir, workers=None, chunksize=16, terms=None, max_pending=None):
+    """Convert payloads in parallel and yield one record per payload, in input order.
+
+    Only max_pending chunks are in flight at once, so memory stays bounded no
+    matter how many payloads the source yields.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or workers * 4
+    terms = set(terms) if terms else None
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for chunk in _chunks(sources, chunksize):
+            pending.append(pool.submit(_convert_chunk, chunk, output_dir, terms))
+            if len(pending) >= max_pending:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+def write_manifest(records, manifest_path):
+    """Stream records into a JSON manifest and return the summary written after them."""
+    summary = {'payloads': 0, 'converted': 0, 'failed': 0, 'meetings': 0, 'events': 0}
+    start = time.perf_counter()
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        f.write('{"items": [\n')
+        for record in records:
+            if summary['payloads']:
+                f.write(',\n')
+            f.write(json.dumps(record))
+            summary['payloads'] += 1
+            summary['failed' if record['error'] else 'converted'] += 1
+            summary['meetings'] += record['meetings']
+            summary['events'] += record['events']
+        summary['seconds'] = round(time.perf_counter() - start, 3)
+        f.write('\n],\n"summary": ' + json.dumps(summary) + '}\n')
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert exported schedule payloads to ICS in bulk")
+    parser.add_argument("input", help="directory of *.json payloads, an NDJSON file, or '-' for stdin")
+    parser.add_argument("-o", "--output", default="../res/bulk", help="output directory")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--chunksize", type=int, default=16, help="payloads per task sent to a worker")
+    parser.add_argument("--terms", nargs="*", help="only convert these term codes")
+    args = parser.parse_args()
+
+    os.makedirs(args.output, exist_ok=True)
+    records = convert_bulk(
+        iter_sources(args.input), args.output,
+        workers=args.workers, chunksize=args.chunksize, terms=args.terms
+    )
+    manifest = os.path.join(args.output, "manifest.json")
+    summary = write_manifest(records, manifest)
+
+    print(
+        f"✅ Converted {summary['converted']}/{summary['payloads']} payloads "
+        f"({summary['events']} events) in {summary['seconds']:.2f} seconds → {manifest}"
+    )
+    if summary['failed']:
+        print(f"❌ {summary['failed']} payload(s) failed, see the manifest for details")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,465 @@
+"""Local HTTP service that keeps the converter and provider clients warm between requests.
+
+A fresh process per conversion pays for interpreter startup, heavy imports,
+a new Google service and MSAL app, and cold date-parse caches every time.
+The service pays once and answers over localhost. Conversions are CPU bound,
+so they run in long-lived worker processes (each with its own warm caches)
+rather than threads sharing the GIL.
+
+Usage: python daemon.py [--port 8765] [--workers N]
+
+Only local, non-browser callers are served: requests carrying an Origin, or a
+Host other than 127.0.0.1/localhost, get a 403. /sync and DELETE /jobs also
+need the per-run token printed at startup (Authorization: Bearer <token>),
+and /sync a JSON Content-Type, since they act with the stored provider tokens.
+
+    POST   /convert[?terms=F25,W26]             result payload (JSON) or PrintSchedule page -> text/calendar
+    POST   /sync?providers=google,outlook[&terms=]  same body, synced in the background -> 202 {"job": id}
+    GET    /jobs/<id>                           sync status, per-provider progress and results
+    DELETE /jobs/<id>                           cancel a queued or running sync
+    GET    /stats                               throughput, latency percentiles and cache counters
+    GET    /health
+"""
+import argparse
+import hashlib
+import hmac
+import importlib
+import io
+import json
+import os
+import secrets
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from events import build_events
+from ics_writer import write_ics
+from meetings import parse_date, parse_time
+from parse_schedule import extract_result, sorted_courses
+from providers import google_job, outlook_job, run_providers
+from result_cache import ResultCache, content_key
+import tracing
+
+HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+MAX_BODY_BYTES = 16 * 1024 * 1024
+
+# Generated calendars kept in memory, keyed by schedule content
+MAX_CACHED_CALENDARS = 256
+# Finished sync jobs kept for GET /jobs/<id>
+MAX_FINISHED_JOBS = 100
+
+# Latency percentiles come from the most recent samples per route
+LATENCY_SAMPLES = 2048
+# Requests per second are also reported over this many trailing seconds
+THROUGHPUT_WINDOW = 60
+
+# Host headers accepted, anything else may be a DNS-rebound page
+ALLOWED_HOSTS = ('127.0.0.1', 'localhost')
+
+# Provider modules are imported at start-up instead of on the first sync
+WARM_UP_MODULES = ('google_calendar', 'outlook_calendar', 'overlaps')
+
+PROVIDERS = {'google': ('Google', google_job), 'outlook': ('Outlook', outlook_job)}
+
+class RequestError(Exception):
+    """A client error, answered with status and a JSON message."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+    def __reduce__(self):
+        # Raised inside conversion workers, so it must survive pickling
+        return RequestError, (self.status, str(self))
+
+class Stats:
+    """Per-route request counts, errors, throughput and latency percentiles."""
+
+    def __init__(self):
+        self.started = time.time()
+        self.in_flight = 0
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def begin(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def record(self, route: str, seconds: float, ok: bool):
+        now = time.time()
+        with self._lock:
+            self.in_flight -= 1
+            stats = self._routes.get(route)
+            if stats is None:
+                stats = self._routes[route] = {'count': 0, 'errors': 0, 'latency': deque(maxlen=LATENCY_SAMPLES),
+                                               'recent': deque()}
+            stats['count'] += 1
+            stats['errors'] += not ok
+            stats['latency'].append(seconds)
+            stats['recent'].append(now)
+            while stats['recent'] and stats['recent'][0] < now - THROUGHPUT_WINDOW:
+                stats['recent'].popleft()
+
+    def snapshot(self) -> dict:
+        now = time.time()
+        uptime = now - self.started
+        with self._lock:
+            routes = {route: (s['count'], s['errors'], sorted(s['latency']),
+                              sum(1 for t in s['recent'] if t >= now - THROUGHPUT_WINDOW))
+                      for route, s in self._routes.items()}
+            in_flight = self.in_flight
+
+        report = {}
+        for route, (count, errors, latency, recent) in routes.items():
+            report[route] = {
+                'count': count,
+                'errors': errors,
+                'rps': round(count / uptime, 2),
+                f"rps_{THROUGHPUT_WINDOW}s": round(recent / min(uptime, THROUGHPUT_WINDOW), 2),
+                **{f"p{q}_ms": round(latency[min(len(latency) - 1, len(latency) * q // 100)] * 1000, 3)
+                   for q in (50, 90, 99)},
+                'max_ms': round(latency[-1] * 1000, 3),
+            }
+        return {'uptime_s': round(uptime, 1), 'in_flight': in_flight, 'routes': report}
+
+# === CONVERSION ===
+def parse_payload(body: bytes, terms: list[str] = None) -> dict:
+    """Return {term: meetings} for the requested terms, or every term in the payload."""
+    stripped = body.lstrip()
+    try:
+        result = json.loads(stripped) if stripped[:1] == b'{' else extract_result(body)
+    except (ValueError, RuntimeError) as e:
+        raise RequestError(400, f"Could not read a schedule payload: {e}")
+
+    planned = {t.get('Code'): t.get('PlannedCourses', []) for t in result.get('Terms', [])}
+    terms = terms or list(planned)
+    missing = [t for t in terms if t not in planned]
+    if missing:
+        raise RequestError(422, f"No schedule found for term(s): {', '.join(missing)}")
+    return {t: sorted_courses(planned[t]) for t in terms}
+
+def _parse_cache_info() -> dict:
+    return {'date': parse_date.cache_info()._asdict(), 'time': parse_time.cache_info()._asdict()}
+
+def _init_worker():
+    # Spans recorded in a worker process would never be exported
+    tracing.disable()
+
+def _worker_pid(_=None) -> int:
+    return os.getpid()
+
+def _convert(body: bytes, terms: list[str] = None) -> tuple[str, bytes, int, dict]:
+    """Run in a worker process: returns (content key, ICS bytes, worker pid, its parse cache info)."""
+    meetings_by_term = parse_payload(body, terms)
+    events = [ev for term, meetings in meetings_by_term.items() for ev in build_events(meetings, term=term)]
+    buf = io.BytesIO()
+    write_ics(events, buf)
+    return content_key(meetings_by_term), buf.getvalue(), os.getpid(), _parse_cache_info()
+
+class ConversionService:
+    """Conversions on a process pool, provider syncs on their own single worker thread.
+
+    Repeat bodies are answered from memory without a round trip to the pool.
+    Syncs run one at a time so two requests never race on the same calendar;
+    each sync already runs Google and Outlook side by side.
+    """
+
+    def __init__(self, workers: int = None, result_cache: ResultCache = None):
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+        self.sync_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sync')
+        self.result_cache = result_cache or ResultCache()
+        self.stats = Stats()
+        self.jobs = OrderedDict()
+        # Required by the routes that sync with the user's provider tokens
+        self.token = secrets.token_urlsafe(32)
+        # content key -> ICS bytes, and request digest -> content key
+        self._calendars = OrderedDict()
+        self._digests = OrderedDict()
+        self._worker_caches = {}
+        self._lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def warm_up(self):
+        for name in WARM_UP_MODULES:
+            try:
+                importlib.import_module(name)
+            except ImportError:
+                # Reported by the request that needs it
+                pass
+        # Start the worker processes now, before the first request waits on them
+        list(self.pool.map(_worker_pid, range(self.workers)))
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+        self.sync_pool.shutdown(wait=False, cancel_futures=True)
+
+    def convert(self, body: bytes, terms: list[str] = None) -> tuple[str, bytes, bool]:
+        """Return (content key, ICS bytes, whether it came from the in-memory cache)."""
+        digest = hashlib.sha256(','.join(terms or []).encode('utf-8') + b'\0' + body).hexdigest()
+        with self._lock:
+            key = self._digests.get(digest)
+            data = self._calendars.get(key) if key else None
+            if data is not None:
+                self._digests.move_to_end(digest)
+                self._calendars.move_to_end(key)
+                self.cache_hits += 1
+                return key, data, True
+
+        key, data, pid, caches = self.pool.submit(_convert, body, terms).result()
+        with self._lock:
+            self._worker_caches[pid] = caches
+            # Another body with the same meetings generated the same calendar
+            hit = key in self._calendars
+            self.cache_hits += hit
+            self.cache_misses += not hit
+            self._calendars[key] = data
+            self._digests[digest] = key
+            self._calendars.move_to_end(key)
+            while len(self._calendars) > MAX_CACHED_CALENDARS:
+                self._calendars.popitem(last=False)
+            while len(self._digests) > MAX_CACHED_CALENDARS:
+                self._digests.popitem(last=False)
+        return key, data, hit
+
+    # === SYNC JOBS ===
+    def submit_sync(self, body: bytes, providers: list[str], terms: list[str] = None) -> dict:
+        unknown = [p for p in providers if p not in PROVIDERS]
+        if not providers or unknown:
+            raise RequestError(400, f"providers must be some of: {', '.join(PROVIDERS)}")
+        meetings_by_term = parse_payload(body, terms)
+
+        job = {'id': uuid.uuid4().hex, 'status': 'queued', 'providers': providers, 'terms': list(meetings_by_term),
+               'progress': {}, 'results': {}, 'error': None, 'submitted': time.time()}
+        cancel = threading.Event()
+        with self._lock:
+            self.jobs[job['id']] = (job, cancel)
+            self._trim_jobs()
+        self.sync_pool.submit(self._run_sync, job, cancel, meetings_by_term)
+        return self.job(job['id'])
+
+    def _trim_jobs(self):
+        finished = [job_id for job_id, (job, _) in self.jobs.items() if job['status'] not in ('queued', 'running')]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job_id]
+
+    def _set(self, job, *path, **fields):
+        """Update a job (or one of its nested dicts) under the lock, GET /jobs reads it concurrently."""
+        with self._lock:
+            target = job
+            for key in path:
+                target = target[key]
+            target.update(fields)
+
+    def _run_sync(self, job, cancel, meetings_by_term):
+        if cancel.is_set():
+            self._set(job, status='cancelled')
+            return
+        self._set(job, status='running')
+        try:
+            terms = list(meetings_by_term)
+            events = [ev for term, meetings in meetings_by_term.items() for ev in build_events(meetings, term=term)]
+            key = content_key(meetings_by_term)
+
+            # Same import record as the GUI, so either one skips what the other already synced
+            def unchanged(name):
+                return lambda account, calendar_id: self.result_cache.imported(key, name, account, calendar_id)
+
+            jobs = {}
+            for provider in job['providers']:
+                name, make_job = PROVIDERS[provider]
+                jobs[name] = make_job(events, cancel=cancel, unchanged=unchanged(name))
+
+            def progress(name, done, total):
+                self._set(job, 'progress', **{name.lower(): {'done': done, 'total': total}})
+
+            for name, outcome in run_providers(jobs, progress=progress).items():
+                self._set(job, 'results', **{name.lower(): outcome})
+                result = outcome['result']
+                if outcome['ok'] and not result['failed'] and not result.get('skipped'):
+                    self.result_cache.record_import(key, terms, name, result['account'], result['calendar_id'])
+            if cancel.is_set():
+                status = 'cancelled'
+            else:
+                status = 'done' if all(r['ok'] for r in job['results'].values()) else 'failed'
+            self._set(job, status=status, finished=time.time())
+        except Exception as e:
+            self._set(job, status='failed', error=str(e), finished=time.time())
+
+    def job(self, job_id: str) -> dict:
+        with self._lock:
+            if job_id not in self.jobs:
+                raise RequestError(404, f"No job {job_id}")
+            job = self.jobs[job_id][0]
+            return {**job, 'progress': dict(job['progress']), 'results': dict(job['results'])}
+
+    def cancel(self, job_id: str) -> dict:
+        with self._lock:
+            if job_id not in self.jobs:
+                raise RequestError(404, f"No job {job_id}")
+            job, cancel = self.jobs[job_id]
+        cancel.set()
+        return self.job(job_id)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            jobs = [job['status'] for job, _ in self.jobs.values()]
+            cached = len(self._calendars)
+            # Each worker process (and this one, for sync payloads) keeps its own caches
+            caches = list(self._worker_caches.values()) + [_parse_cache_info()]
+        return {
+            **self.stats.snapshot(),
+            'workers': self.workers,
+            'calendar_cache': {'entries': cached, 'hits': self.cache_hits, 'misses': self.cache_misses},
+            'jobs': {status: jobs.count(status) for status in sorted(set(jobs))},
+            'parse_caches': {
+                name: {field: sum(c[name][field] for c in caches) for field in ('hits', 'misses', 'currsize')}
+                for name in ('date', 'time')
+            },
+        }
+
+# === HTTP ===
+def _handler(service: ConversionService):
+    class Handler(BaseHTTPRequestHandler):
+        # Keep-alive, so load tests and repeat callers reuse one connection
+        protocol_version = 'HTTP/1.1'
+        # Headers and body go out in separate writes, Nagle would hold the body for the client's delayed ACK
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, body: bytes, content_type, headers=None):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _json(self, status, data, headers=None):
+            self._send(status, json.dumps(data, default=str).encode('utf-8'), 'application/json', headers)
+
+        def _body(self) -> bytes:
+            try:
+                length = int(self.headers.get('Content-Length') or 0)
+            except ValueError:
+                raise RequestError(400, "Content-Length must be an integer")
+            if length < 0:
+                raise RequestError(400, "Content-Length must not be negative")
+            if length > MAX_BODY_BYTES:
+                raise RequestError(413, f"Body over {MAX_BODY_BYTES} bytes")
+            self.body_read = True
+            return self.rfile.read(length)
+
+        def _error(self, status, message):
+            # An unread body would be parsed as the next keep-alive request, so hang up instead
+            unread = not self.body_read and self.headers.get('Content-Length', '0').strip() not in ('', '0')
+            self._json(status, {'error': message}, {'Connection': 'close'} if unread else None)
+
+        def _check_caller(self):
+            """Refuse browsers: a page can reach localhost, but sends an Origin (or a foreign Host)."""
+            if self.headers.get('Origin') is not None:
+                raise RequestError(403, "Cross-origin requests are not accepted")
+            host = (self.headers.get('Host') or '').rsplit(':', 1)[0]
+            if host not in ALLOWED_HOSTS:
+                raise RequestError(403, f"Host must be one of: {', '.join(ALLOWED_HOSTS)}")
+
+        def _authorize(self):
+            expected = f"Bearer {service.token}"
+            if not hmac.compare_digest(self.headers.get('Authorization', ''), expected):
+                raise RequestError(401, "Missing or wrong token, use the one printed at startup")
+
+        def _route(self, method):
+            url = urlsplit(self.path)
+            query = parse_qs(url.query)
+            parts = [p for p in url.path.split('/') if p]
+            # Job ids are folded into one route so /stats doesn't grow per job
+            route = f"{method} /{'/'.join(parts[:1] + ['{id}'] * (len(parts) > 1))}"
+            terms = [t.strip().upper() for t in ','.join(query.get('terms', [])).split(',') if t.strip()] or None
+
+            service.stats.begin()
+            start = time.perf_counter()
+            ok = False
+            self.body_read = False
+            try:
+                self._check_caller()
+                if method == 'POST' and parts == ['convert']:
+                    body = self._body()
+                    key, data, hit = service.convert(body, terms)
+                    if self.headers.get('If-None-Match') == f'"{key}"':
+                        self._send(304, b'', 'text/calendar', {'ETag': f'"{key}"'})
+                    else:
+                        self._send(200, data, 'text/calendar; charset=utf-8',
+                                   {'ETag': f'"{key}"', 'X-Cache': 'hit' if hit else 'miss'})
+                elif method == 'POST' and parts == ['sync']:
+                    self._authorize()
+                    # A JSON body can't be sent cross-site without a preflight, which is never answered
+                    if self.headers.get_content_type() != 'application/json':
+                        raise RequestError(415, "Content-Type must be application/json")
+                    providers = [p.strip().lower() for p in ','.join(query.get('providers', [])).split(',') if p.strip()]
+                    self._json(202, service.submit_sync(self._body(), providers, terms))
+                elif method == 'GET' and len(parts) == 2 and parts[0] == 'jobs':
+                    self._json(200, service.job(parts[1]))
+                elif method == 'DELETE' and len(parts) == 2 and parts[0] == 'jobs':
+                    self._authorize()
+                    self._json(202, service.cancel(parts[1]))
+                elif method == 'GET' and parts == ['stats']:
+                    self._json(200, service.snapshot())
+                elif method == 'GET' and parts == ['health']:
+                    self._json(200, {'ok': True})
+                else:
+                    raise RequestError(404, f"No route for {method} {url.path}")
+                ok = True
+            except RequestError as e:
+                self._error(e.status, str(e))
+            except Exception as e:
+                self._error(500, f"{type(e).__name__}: {e}")
+            finally:
+                service.stats.record(route, time.perf_counter() - start, ok)
+
+        def do_GET(self):
+            self._route('GET')
+
+        def do_POST(self):
+            self._route('POST')
+
+        def do_DELETE(self):
+            self._route('DELETE')
+
+    return Handler
+
+def make_server(service: ConversionService, host: str = HOST, port: int = DEFAULT_PORT) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), _handler(service))
+    server.daemon_threads = True
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve schedule conversion and provider sync over localhost")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=None, help="conversion processes (default: CPU count)")
+    args = parser.parse_args()
+
+    tracing.configure_from_env()
+    service = ConversionService(workers=args.workers)
+    service.warm_up()
+    server = make_server(service, HOST, args.port)
+    print(f"✅ Listening on http://{HOST}:{server.server_address[1]} ({service.workers} workers)")
+    print(f"🔐 Token for /sync and DELETE /jobs: {service.token}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+        tracing.export_from_env()
+
+if __name__ == "__main__":
+    main()
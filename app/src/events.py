@@ -0,0 +1,182 @@
+import hashlib
+import json
+import uuid
+import pytz
+from dataclasses import dataclass, field
+from datetime import datetime, time, timedelta
+from typing import Optional
+from meetings import Meeting
+from term_calendar import calendar_for_meetings
+import tracing
+
+TIMEZONE = 'America/Toronto'
+TZ = pytz.timezone(TIMEZONE)
+END_OF_DAY = time(23, 59, 59)
+
+# Namespace for deterministic event UIDs, never change it or every synced event gets replaced
+UID_NAMESPACE = uuid.UUID('5b0e4c1e-6f1d-4f0e-9d55-0c1a7e6c2f3b')
+
+WEEKDAYS = ['MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU']
+
+DAY_NAMES = {
+    'MO': 'monday', 'TU': 'tuesday', 'WE': 'wednesday',
+    'TH': 'thursday', 'FR': 'friday', 'SA': 'saturday', 'SU': 'sunday'
+}
+
+def localize(dt: datetime) -> datetime:
+    """Attach the schedule's timezone to a naive wall-clock datetime."""
+    return TZ.localize(dt)
+
+@dataclass
+class Event:
+    """A weekly class meeting in America/Toronto wall-clock time (naive datetimes)."""
+    uid: str
+    summary: str
+    description: str
+    location: str
+    start: datetime
+    end: datetime
+    byday: list[str] = field(default_factory=list)
+    until: Optional[datetime] = None
+    exdates: list[datetime] = field(default_factory=list)
+
+    def rrule(self, utc: bool = False) -> str:
+        """Return the RRULE value, with UNTIL in UTC when the provider requires it."""
+        rule = f"FREQ=WEEKLY;BYDAY={','.join(self.byday)}"
+        if self.until:
+            if utc:
+                until = localize(self.until).astimezone(pytz.utc)
+                rule += f";UNTIL={until.strftime('%Y%m%dT%H%M%SZ')}"
+            else:
+                rule += f";UNTIL={self.until.strftime('%Y%m%dT%H%M%S')}"
+        return rule
+
+    def exdate(self) -> str:
+        """Return the comma-separated wall-clock EXDATE value, or '' when nothing is excluded."""
+        return ','.join(d.strftime('%Y%m%dT%H%M%S') for d in self.exdates)
+
+    def last_occurrence(self) -> datetime:
+        """Start of the final occurrence left once EXDATEs are removed (the start itself if none)."""
+        if not self.byday or not self.until:
+            return self.start
+        weekdays = {WEEKDAYS.index(code) for code in self.byday}
+        excluded = set(self.exdates)
+        day = datetime.combine(self.until.date(), self.start.time())
+        while day > self.start:
+            if day.weekday() in weekdays and day not in excluded:
+                return day
+            day -= timedelta(days=1)
+        return self.start
+
+def _byday(dow: str) -> list[str]:
+    # Build BYDAY rule
+    days = []
+    if 'Th' in dow:
+        days.append('TH')
+        dow = dow.replace('Th', '')
+    for ch, code in {'M': 'MO', 'T': 'TU', 'W': 'WE', 'F': 'FR'}.items():
+        if ch in dow:
+            days.append(code)
+    return days
+
+def event_uid(course: str, section: str, method: str, days: str, occurrence: int = 0, term: str = None) -> str:
+    """Return a stable UID for a meeting so re-runs update events instead of duplicating them."""
+    key = f"{course}|{section}|{method}|{days}"
+    if term:
+        # Section numbers repeat across terms, keep multi-term calendars apart
+        key = f"{term}|{key}"
+    if occurrence:
+        # Same section, method and days more than once (e.g. two labs), keep them apart
+        key += f"|{occurrence}"
+    return f"{uuid.uuid5(UID_NAMESPACE, key).hex}@schedule"
+
+def fingerprint(body: dict) -> str:
+    """Hash a provider event body so sync can tell whether an existing event needs a patch."""
+    data = json.dumps(body, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()[:16]
+
+def build_events(meetings: list[Meeting], term: str = None) -> list[Event]:
+    """Turn sorted_courses output into events shared by the ICS writer and the importers."""
+    with tracing.span('events.build', meetings=len(meetings)) as sp:
+        events = _build_events(meetings, term)
+        sp.set(events=len(events))
+    return events
+
+def _build_events(meetings: list[Meeting], term: str = None) -> list[Event]:
+    # Breaks and the exam window are worked out once for the term, not per meeting
+    calendar = calendar_for_meetings(meetings, term)
+
+    events = []
+    seen = {}
+    for m in meetings:
+        # Skip online/no-time rows
+        if not m.start_time or not m.end_time:
+            continue
+
+        # Recur through EndDate, breaks (and the exam window for classes) become EXDATEs
+        sec = m.section
+        until_dt = datetime.combine(m.last_day, END_OF_DAY)
+        byday = _byday(m.days)
+        start = m.start
+        exdates = []
+        if byday and calendar:
+            days = calendar.exdates(start.date(), m.last_day, byday, exam=m.method == 'EXAM')
+            exdates = [datetime.combine(day, start.time()) for day in days]
+
+        uid_key = (sec.course_name, sec.number, m.method, m.days)
+        occurrence = seen.get(uid_key, 0)
+        seen[uid_key] = occurrence + 1
+        events.append(Event(
+            uid=event_uid(*uid_key, occurrence=occurrence, term=term),
+            summary=f"{m.method} {sec.course_name}*{sec.number}",
+            description=(
+                f"Instructor(s): {' | '.join(sec.instructors)}\n"
+                f"Credits: {sec.credits}"
+            ),
+            location=m.location,
+            start=start,
+            end=m.end,
+            byday=byday,
+            until=until_dt if byday else None,
+            exdates=exdates,
+        ))
+    return events
+
+def _naive_local(dt: datetime) -> datetime:
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(TZ).replace(tzinfo=None)
+    return dt
+
+def read_ics(ics_file_path: str) -> list[Event]:
+    """Load events from a previously written .ics file (used by the standalone importers)."""
+    from icalendar import Calendar
+
+    with open(ics_file_path, 'r', encoding='UTF-8') as f:
+        cal = Calendar.from_ical(f.read())
+
+    events = []
+    for component in cal.walk('VEVENT'):
+        rrule = component.get('rrule') or {}
+        until = rrule.get('UNTIL', [None])[0]
+        if until is not None and not isinstance(until, datetime):
+            until = datetime.combine(until, datetime.max.time()).replace(microsecond=0)
+        exdate = component.get('exdate') or []
+        exdates = [_naive_local(d.dt) for prop in (exdate if isinstance(exdate, list) else [exdate]) for d in prop.dts]
+        events.append(Event(
+            uid=str(component.get('uid', '')),
+            summary=str(component.get('summary', '')),
+            description=str(component.get('description', '')),
+            location=str(component.get('location', '')),
+            start=_naive_local(component.decoded('dtstart')),
+            end=_naive_local(component.decoded('dtend')),
+            byday=[str(day) for day in rrule.get('BYDAY', [])],
+            until=_naive_local(until) if until is not None else None,
+            exdates=exdates,
+        ))
+    return events
+
+def event_window(events: list[Event]) -> tuple[datetime, datetime]:
+    """Return the wall-clock span covered by events, used to keep sync deletes inside one term."""
+    start = min(ev.start for ev in events)
+    end = max(ev.until or ev.end for ev in events)
+    return start, end
@@ -1,18 +1,78 @@
+import hashlib
+import json
 import os
-import re
-import pytz
-from datetime import datetime
-from icalendar import Calendar
+import threading
+import time
+import httplib2
 from google.auth.transport.requests import Request
+from google_auth_httplib2 import AuthorizedHttp
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+from googleapiclient.errors import HttpError
+from events import TIMEZONE, event_window, fingerprint, localize, read_ics
+from scheduler import RequestScheduler
+import tracing
 
 # Google Calendar API scope
 SCOPES = ['https://www.googleapis.com/auth/calendar']
 
+# Calendar API accepts at most 50 calls per batch request
+BATCH_LIMIT = 50
+MAX_ATTEMPTS = 3
+# Batch requests sent at once, each on its own connection (lowered while Google throttles)
+MAX_IN_FLIGHT = 4
+# Calendar API per-user quota, counted per call inside a batch (None disables the limit)
+RATE_LIMIT = 10
+RATE_BURST = 500
+
+# Discovery document fallback and calendar IDs found per account, so runs skip the lookups
+DISCOVERY_URL = 'https://www.googleapis.com/discovery/v1/apis/calendar/v3/rest'
+DISCOVERY_CACHE_PATH = '../res/calendar_v3_discovery.json'
+CALENDAR_CACHE_PATH = '../res/calendar_ids.json'
+
+_discovery_doc = None
+_service = None
+
+# Private extended properties that mark events this tool manages
+SOURCE_KEY = 'uofgScheduleSource'
+SOURCE_VALUE = 'uofg-schedule-importer'
+HASH_KEY = 'uofgScheduleHash'
+
+def _discovery_document() -> str:
+    """Return the Calendar v3 discovery document without a network round trip when possible.
+
+    Prefers the copy bundled with googleapiclient, then our on-disk copy, and
+    only fetches (and saves) it when neither exists.
+    """
+    global _discovery_doc
+    if _discovery_doc is not None:
+        return _discovery_doc
+
+    doc = get_static_doc('calendar', 'v3')
+    if doc is None and os.path.exists(DISCOVERY_CACHE_PATH):
+        with open(DISCOVERY_CACHE_PATH, 'r', encoding='utf-8') as f:
+            doc = f.read()
+    if doc is None:
+        response, content = httplib2.Http().request(DISCOVERY_URL)
+        if response.status != 200:
+            raise HttpError(response, content, uri=DISCOVERY_URL)
+        doc = content.decode('utf-8')
+        with open(DISCOVERY_CACHE_PATH, 'w', encoding='utf-8') as f:
+            f.write(doc)
+    _discovery_doc = doc
+    return doc
+
 def authenticate_google():
-    """Authenticate the user and return an authorized Google Calendar service."""
+    """Authenticate the user and return an authorized Google Calendar service.
+
+    The service is built once per process and reused while its credentials are still valid.
+    """
+    global _service
+    if _service is not None and _service._http.credentials.valid:
+        return _service
+
     creds = None
     CREDENTIALS_PATH = '../res/credentials.json'
     TOKEN_PATH = '../res/token.json'
@@ -37,74 +97,301 @@ def authenticate_google():
         # Save the credentials for the next run
         with open(TOKEN_PATH, 'w') as token:
             token.write(creds.to_json())
-    return build('calendar', 'v3', credentials=creds)
+    _service = build_from_document(_discovery_document(), credentials=creds)
+    return _service
+
+# === CALENDAR LOOKUP ===
+def _account_key(service) -> str:
+    """Identify the signed-in account without an API call (the refresh token is per account and client)."""
+    creds = getattr(service._http, 'credentials', None)
+    token = getattr(creds, 'refresh_token', None)
+    return hashlib.sha1(token.encode('utf-8')).hexdigest()[:16] if token else 'default'
+
+def _load_calendar_ids() -> dict:
+    try:
+        with open(CALENDAR_CACHE_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_calendar_ids(cache: dict):
+    os.makedirs(os.path.dirname(CALENDAR_CACHE_PATH) or '.', exist_ok=True)
+    with open(CALENDAR_CACHE_PATH, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, indent=2)
+
+def iter_calendar_list(service):
+    """Yield the user's calendars page by page, following nextPageToken."""
+    page_token = None
+    while True:
+        response = service.calendarList().list(
+            pageToken=page_token,
+            maxResults=250,
+            fields='items(id,summary),nextPageToken',
+        ).execute()
+        yield from response.get('items', [])
+        page_token = response.get('nextPageToken')
+        if not page_token:
+            return
 
 def get_or_create_calendar(service, calendar_name='UofG Schedule'):
-    """Return calendar ID by name, or create it if it doesn't exist."""
-    calendars = service.calendarList().list().execute().get('items', [])
-    for cal in calendars:
-        if cal.get('summary') == calendar_name:
-            return cal['id']
-
-    new_calendar = {
-        'summary': calendar_name,
-        'timeZone': 'America/Toronto'
-    }
-    created_calendar = service.calendars().insert(body=new_calendar).execute()
-    return created_calendar['id']
+    """Return calendar ID by name, or create it if it doesn't exist.
 
-def import_ics_to_calendar(service, calendar_id, ics_file_path):
-    """Parse .ics file and insert events into the target calendar."""
-    with open(ics_file_path, 'r', encoding='UTF-8') as f:
-        cal = Calendar.from_ical(f.read())
-
-    tz = pytz.timezone('America/Toronto')
-    created = 0
-
-    for component in cal.walk():
-        if component.name != "VEVENT":
-            continue
-
-        summary = str(component.get('summary', ''))
-        description = str(component.get('description', ''))
-        location = str(component.get('location', ''))
-        dtstart = component.get('dtstart').dt
-        dtend = component.get('dtend').dt
-
-        # Make sure datetimes are timezone-aware
-        if isinstance(dtstart, datetime) and dtstart.tzinfo is None:
-            dtstart = tz.localize(dtstart)
-        if isinstance(dtend, datetime) and dtend.tzinfo is None:
-            dtend = tz.localize(dtend)
-
-        event = {
-            'summary': summary,
-            'description': description,
-            'location': location,
-            'start': {
-                'dateTime': dtstart.isoformat(),
-                'timeZone': 'America/Toronto',
-            },
-            'end': {
-                'dateTime': dtend.isoformat(),
-                'timeZone': 'America/Toronto',
-            }
+    A cached ID is confirmed with a single calendars().get. On a miss the
+    calendar list is streamed page by page and stops at the first match.
+    """
+    account = _account_key(service)
+    cache = _load_calendar_ids()
+    cached_id = cache.get(account, {}).get(calendar_name)
+    if cached_id:
+        try:
+            calendar = service.calendars().get(calendarId=cached_id, fields='id,summary').execute()
+            if calendar.get('summary') == calendar_name:
+                return cached_id
+        except HttpError:
+            # Deleted, or no longer shared with this account
+            pass
+
+    calendar_id = next(
+        (cal['id'] for cal in iter_calendar_list(service) if cal.get('summary') == calendar_name),
+        None
+    )
+    if calendar_id is None:
+        new_calendar = {
+            'summary': calendar_name,
+            'timeZone': 'America/Toronto'
         }
+        calendar_id = service.calendars().insert(body=new_calendar).execute()['id']
 
-        rrule = component.get('rrule')
-        if rrule:
-            rrule_str = "RRULE:" + rrule.to_ical().decode()
-            # Ensure UNTIL ends with Z (UTC requirement)
-            rrule_str = re.sub(r'(UNTIL=\d+T\d+)(?!Z)', r'\1Z', rrule_str)
-            event['recurrence'] = [rrule_str]
+    cache.setdefault(account, {})[calendar_name] = calendar_id
+    _save_calendar_ids(cache)
+    return calendar_id
 
-        try:
-            service.events().insert(calendarId=calendar_id, body=event).execute()
-            created += 1
-        except Exception as e:
-            print(f"❌ Error inserting '{summary}': {e}")
+def event_to_google(ev):
+    """Build a Google Calendar event body from a shared Event."""
+    event = {
+        'summary': ev.summary,
+        'description': ev.description,
+        'location': ev.location,
+        'start': {
+            'dateTime': localize(ev.start).isoformat(),
+            'timeZone': TIMEZONE,
+        },
+        'end': {
+            'dateTime': localize(ev.end).isoformat(),
+            'timeZone': TIMEZONE,
+        }
+    }
+    if ev.byday:
+        # Google requires UNTIL in UTC
+        event['recurrence'] = [f"RRULE:{ev.rrule(utc=True)}"]
+        if ev.exdates:
+            event['recurrence'].append(f"EXDATE;TZID={TIMEZONE}:{ev.exdate()}")
+    return event
+
+def _is_retryable(exception):
+    """Return True if a failed sub-request is worth sending again."""
+    if not isinstance(exception, HttpError):
+        # Transport errors (timeouts, dropped connections) are transient
+        return True
+    status = exception.resp.status
+    if status == 403:
+        # 403 is only transient when Google is rate limiting us
+        return b'ratelimitexceeded' in (exception.content or b'').lower()
+    return status == 429 or status >= 500
+
+def _is_throttled(exception):
+    if not isinstance(exception, HttpError):
+        return False
+    status = exception.resp.status
+    # Covers rateLimitExceeded and userRateLimitExceeded
+    return status == 429 or (status == 403 and b'ratelimitexceeded' in (exception.content or b'').lower())
+
+def _retry_after(exception):
+    value = exception.resp.get('retry-after') if isinstance(exception, HttpError) else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+def _thread_http(service, local):
+    """Return this worker thread's own Http, httplib2 connections can't be shared across threads."""
+    http = getattr(local, 'http', None)
+    if http is None:
+        base = service._http
+        http = AuthorizedHttp(base.credentials, http=httplib2.Http()) if isinstance(base, AuthorizedHttp) else httplib2.Http()
+        local.http = http
+    return http
 
-    print(f"✅ Successfully created {created} events.")
+def execute_batched(service, calls, batch_size=BATCH_LIMIT, max_attempts=MAX_ATTEMPTS,
+                    max_in_flight=MAX_IN_FLIGHT, progress=None, cancel=None):
+    """Run (label, request factory) calls as batch HTTP requests, retrying only the calls that failed."""
+    batch_size = max(1, min(batch_size, BATCH_LIMIT))
+    errors = {}
+    succeeded = set()
+    lock = threading.Lock()
+    local = threading.local()
+
+    def send(chunk, attempt):
+        chunk_errors = {}
+
+        def callback(request_id, response, exception):
+            idx = int(request_id)
+            if exception is not None:
+                chunk_errors[idx] = exception
+                return
+            with lock:
+                succeeded.add(idx)
+                errors.pop(idx, None)
+                done = len(succeeded)
+            if progress:
+                progress(done, len(calls))
+
+        batch = service.new_batch_http_request(callback=callback)
+        for idx in chunk:
+            batch.add(calls[idx][1](), request_id=str(idx))
+        with tracing.span('google.batch', items=len(chunk), attempt=attempt):
+            sent_at = time.perf_counter()
+            try:
+                batch.execute(http=_thread_http(service, local))
+            except Exception as e:
+                # The whole envelope failed, so every item in it is still pending
+                for idx in chunk:
+                    if idx not in succeeded:
+                        chunk_errors[idx] = e
+            tracing.observe('google.request', time.perf_counter() - sent_at)
+
+        with lock:
+            errors.update(chunk_errors)
+        retry_after = [r for r in map(_retry_after, chunk_errors.values()) if r is not None]
+        return (
+            sorted(idx for idx, e in chunk_errors.items() if _is_retryable(e)),
+            max(retry_after, default=None),
+            any(_is_throttled(e) for e in chunk_errors.values()),
+        )
+
+    chunks = [list(range(start, min(start + batch_size, len(calls)))) for start in range(0, len(calls), batch_size)]
+    scheduler = RequestScheduler('google', max_in_flight, rate=RATE_LIMIT, burst=RATE_BURST, max_attempts=max_attempts)
+    stats = scheduler.run(chunks, send, cancel=cancel)
+
+    tracing.count('google.succeeded', len(succeeded))
+    tracing.count('google.failed', len(errors))
+    return {
+        'succeeded': len(succeeded),
+        'failed': [(calls[idx][0], errors[idx]) for idx in sorted(errors)],
+        'requests': stats['requests'],
+    }
+
+def insert_events_batched(service, calendar_id, events, batch_size=BATCH_LIMIT, max_attempts=MAX_ATTEMPTS,
+                          max_in_flight=MAX_IN_FLIGHT, progress=None, cancel=None):
+    """Insert events using batch HTTP requests, retrying only the items that failed."""
+    calls = [
+        (body.get('summary', ''),
+         lambda body=body: service.events().insert(calendarId=calendar_id, body=body))
+        for body in events
+    ]
+    result = execute_batched(service, calls, batch_size=batch_size, max_attempts=max_attempts,
+                             max_in_flight=max_in_flight, progress=progress, cancel=cancel)
+    return {
+        'created': result['succeeded'],
+        'failed': result['failed'],
+        'requests': result['requests'],
+        'saved': max(0, len(events) - result['requests']),
+    }
+
+def import_events_to_calendar(service, calendar_id, events, batch_size=BATCH_LIMIT, max_in_flight=MAX_IN_FLIGHT,
+                              progress=None, cancel=None):
+    """Insert shared Events into the target calendar."""
+    bodies = [event_to_google(ev) for ev in events]
+    result = insert_events_batched(service, calendar_id, bodies, batch_size=batch_size,
+                                   max_in_flight=max_in_flight, progress=progress, cancel=cancel)
+
+    for summary, e in result['failed']:
+        print(f"❌ Error inserting '{summary}': {e}")
+
+    print(
+        f"✅ Successfully created {result['created']} events in {result['requests']} "
+        f"request(s), saving {result['saved']} round trips."
+    )
+    return result
+
+def list_managed_events(service, calendar_id, time_min=None, time_max=None):
+    """Yield events this tool created in the calendar, following nextPageToken."""
+    page_token = None
+    while True:
+        response = service.events().list(
+            calendarId=calendar_id,
+            privateExtendedProperty=f"{SOURCE_KEY}={SOURCE_VALUE}",
+            timeMin=time_min,
+            timeMax=time_max,
+            maxResults=2500,
+            pageToken=page_token,
+        ).execute()
+        yield from response.get('items', [])
+        page_token = response.get('nextPageToken')
+        if not page_token:
+            return
+
+def sync_events_to_calendar(service, calendar_id, events, batch_size=BATCH_LIMIT, max_in_flight=MAX_IN_FLIGHT,
+                            progress=None, cancel=None):
+    """Sync events by iCalUID, only deleting managed events inside the span of the given events."""
+    desired = {}
+    for ev in events:
+        body = event_to_google(ev)
+        body['iCalUID'] = ev.uid
+        body['extendedProperties'] = {'private': {
+            SOURCE_KEY: SOURCE_VALUE,
+            HASH_KEY: fingerprint(body),
+        }}
+        desired[ev.uid] = body
+
+    time_min, time_max = None, None
+    if events:
+        start, end = event_window(events)
+        time_min, time_max = localize(start).isoformat(), localize(end).isoformat()
+    with tracing.span('google.list') as sp:
+        existing = {item['iCalUID']: item for item in list_managed_events(service, calendar_id, time_min, time_max)}
+        sp.set(events=len(existing))
+
+    calls = []
+    counts = {'inserted': 0, 'patched': 0, 'deleted': 0, 'unchanged': 0}
+    for uid, body in desired.items():
+        current = existing.get(uid)
+        if current is None:
+            # import_ upserts by iCalUID, so a UID left behind by a deleted event can't cause a 409
+            calls.append((body['summary'], lambda body=body: service.events().import_(calendarId=calendar_id, body=body)))
+            counts['inserted'] += 1
+        elif current.get('extendedProperties', {}).get('private', {}).get(HASH_KEY) != body['extendedProperties']['private'][HASH_KEY]:
+            patch = {k: v for k, v in body.items() if k != 'iCalUID'}
+            calls.append((body['summary'], lambda event_id=current['id'], patch=patch: service.events().patch(
+                calendarId=calendar_id, eventId=event_id, body=patch)))
+            counts['patched'] += 1
+        else:
+            counts['unchanged'] += 1
+
+    for uid, current in existing.items():
+        if uid not in desired:
+            calls.append((current.get('summary', ''), lambda event_id=current['id']: service.events().delete(
+                calendarId=calendar_id, eventId=event_id)))
+            counts['deleted'] += 1
+
+    result = execute_batched(service, calls, batch_size=batch_size, max_in_flight=max_in_flight,
+                             progress=progress, cancel=cancel)
+    # One list call plus whatever batches were needed
+    result['requests'] += 1
+    result.update(counts)
+
+    for summary, e in result['failed']:
+        print(f"❌ Error syncing '{summary}': {e}")
+
+    print(
+        f"✅ Synced Google Calendar: {result['inserted']} inserted, {result['patched']} updated, "
+        f"{result['deleted']} deleted, {result['unchanged']} unchanged in {result['requests']} request(s)."
+    )
+    return result
+
+def import_ics_to_calendar(service, calendar_id, ics_file_path, batch_size=BATCH_LIMIT):
+    """Parse .ics file and insert events into the target calendar."""
+    return import_events_to_calendar(service, calendar_id, read_ics(ics_file_path), batch_size=batch_size)
 
 def main():
     ics_path = "../res/Schedule.ics"
@@ -0,0 +1,76 @@
+import io
+from datetime import datetime, timezone
+from typing import Iterable, Iterator
+
+CRLF = "\r\n"
+MAX_OCTETS = 75  # RFC 5545 3.1: lines SHOULD NOT be longer than 75 octets, excluding the CRLF
+
+PRODID = "-//Danial Changez//Guelph Student Schedule Exporter v1.0//EN"
+
+_TEXT_ESCAPES = str.maketrans({"\\": "\\\\", ";": "\\;", ",": "\\,", "\n": "\\n"})
+
+def escape_text(value) -> str:
+    """Escape a TEXT property value (RFC 5545 3.3.11)."""
+    return str(value).replace("\r\n", "\n").translate(_TEXT_ESCAPES)
+
+def fold(line: str) -> str:
+    """Return line terminated by CRLF, folded so no physical line exceeds 75 octets."""
+    if len(line) <= MAX_OCTETS and line.isascii():
+        return line + CRLF
+
+    data = line.encode("utf-8")
+    parts = []
+    start, limit = 0, MAX_OCTETS
+    while start < len(data):
+        end = min(start + limit, len(data))
+        # Never split inside a multi-byte UTF-8 sequence
+        while end < len(data) and (data[end] & 0xC0) == 0x80:
+            end -= 1
+        parts.append(data[start:end].decode("utf-8"))
+        # Continuation lines start with a space, which counts toward the limit
+        start, limit = end, MAX_OCTETS - 1
+    return (CRLF + " ").join(parts) + CRLF
+
+def _fmt(dt: datetime) -> str:
+    return dt.strftime("%Y%m%dT%H%M%S")
+
+def iter_ics(events: Iterable, dtstamp: datetime = None) -> Iterator[str]:
+    """Yield the calendar as folded, CRLF-terminated lines, one event at a time."""
+    # One DTSTAMP for the whole run
+    stamp = (dtstamp or datetime.now(timezone.utc)).strftime("%Y%m%dT%H%M%SZ")
+
+    yield "BEGIN:VCALENDAR" + CRLF
+    yield "VERSION:2.0" + CRLF
+    yield "CALSCALE:GREGORIAN" + CRLF
+    yield fold(f"PRODID:{PRODID}")
+
+    for ev in events:
+        yield "BEGIN:VEVENT" + CRLF
+        yield fold(f"UID:{ev.uid}")
+        yield f"DTSTAMP:{stamp}" + CRLF
+        yield f"DTSTART:{_fmt(ev.start)}" + CRLF
+        yield f"DTEND:{_fmt(ev.end)}" + CRLF
+        # One-off meetings (no weekdays) get no RRULE
+        if ev.byday:
+            yield fold(f"RRULE:{ev.rrule()}")
+            if ev.exdates:
+                yield fold(f"EXDATE:{ev.exdate()}")
+        yield fold(f"SUMMARY:{escape_text(ev.summary)}")
+        yield fold(f"DESCRIPTION:{escape_text(ev.description)}")
+        yield fold(f"LOCATION:{escape_text(ev.location)}")
+        yield "END:VEVENT" + CRLF
+
+    yield "END:VCALENDAR" + CRLF
+
+def write_ics(events: Iterable, fp, dtstamp: datetime = None) -> int:
+    """Stream the calendar into a text or binary file-like object. Returns the events written.
+
+    Text streams should be opened with newline='' so CRLF isn't translated.
+    """
+    binary = not isinstance(fp, io.TextIOBase)
+    count = 0
+    for line in iter_ics(events, dtstamp):
+        if line == "END:VEVENT" + CRLF:
+            count += 1
+        fp.write(line.encode("utf-8") if binary else line)
+    return count
@@ -0,0 +1,51 @@
+from dataclasses import dataclass
+from datetime import date, datetime, time
+from functools import lru_cache
+
+# Registrar dates and times repeat constantly ("9/8/2025", "10:20 AM"), parse each string once
+PARSE_CACHE_SIZE = 4096
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_date(value: str) -> date:
+    return datetime.strptime(value, "%m/%d/%Y").date()
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_time(value: str) -> time:
+    return datetime.strptime(value, "%I:%M %p").time()
+
+@dataclass
+class Section:
+    """Course-level fields shared by every meeting of a section."""
+    __slots__ = ('course_name', 'number', 'credits', 'instructors')
+    course_name: str
+    number: str
+    credits: float
+    instructors: list[str]
+
+@dataclass
+class Meeting:
+    """One scheduled meeting of a section, as listed on PrintSchedule."""
+    __slots__ = ('section', 'method', 'start_time', 'end_time', 'formatted_time',
+                 'days', 'location', 'start_date', 'end_date')
+    section: Section
+    method: str
+    start_time: str
+    end_time: str
+    formatted_time: str
+    days: str
+    location: str
+    start_date: str
+    end_date: str
+
+    @property
+    def start(self) -> datetime:
+        return datetime.combine(parse_date(self.start_date), parse_time(self.start_time))
+
+    @property
+    def end(self) -> datetime:
+        # Meetings end on the day they start, the recurrence carries them forward
+        return datetime.combine(parse_date(self.start_date), parse_time(self.end_time))
+
+    @property
+    def last_day(self) -> date:
+        return parse_date(self.end_date)
@@ -1,46 +1,99 @@
 import os
 import json
-import re
 import msal
-import pytz
 import requests
-from datetime import datetime
-from icalendar import Calendar
+import threading
+import time
+from datetime import datetime, timedelta
+from urllib.parse import urlencode
+from events import DAY_NAMES, TIMEZONE, event_window, fingerprint, localize, read_ics
+from progress import Cancelled
+from scheduler import RequestScheduler
+from session_cache import load_token_cache, save_token_cache
+import tracing
 
 # === CONFIG ===
 CLIENT_ID = '3751d727-01d8-4cf3-8b3b-895f9e107b66'  # Replace with actual Azure App ID (Removed for security purposes for now)
 AUTHORITY = 'https://login.microsoftonline.com/2dc6a781-c713-4a93-8cb0-258bef89a7b3'
 SCOPES = ['Calendars.ReadWrite']
-TOKEN_PATH = '../res/outlook_token.json'
+TOKEN_CACHE_PATH = '../res/outlook_token_cache.bin'  # MSAL cache, encrypted when cryptography is installed
 ICS_PATH = '../res/Schedule.ics'
 GRAPH_BASE = 'https://graph.microsoft.com/v1.0'
+BATCH_LIMIT = 20  # Graph JSON batching accepts at most 20 requests per envelope
+MAX_ATTEMPTS = 3
+# Envelopes sent at once; Exchange allows 4 concurrent requests per mailbox
+MAX_IN_FLIGHT = 4
+# Graph allows 10,000 requests per 10 minutes per mailbox, each $batch item counts (None disables the limit)
+RATE_LIMIT = 16
+RATE_BURST = 2000
+
+# Extended properties that mark events this tool manages (GUID is our own property set)
+UID_PROPERTY = 'String {8f0d6a52-3b7e-4a51-9a57-6a2f1c0e4d11} Name UofGScheduleUid'
+HASH_PROPERTY = 'String {8f0d6a52-3b7e-4a51-9a57-6a2f1c0e4d11} Name UofGScheduleHash'
+# Hash held by a series whose excluded dates have not all been deleted yet
+PENDING_HASH = 'pending'
+
+_session = None
+_app = None
+# MSAL home account ID of the last sign-in
+_account = None
+
+# === HTTP SESSION ===
+def get_session():
+    """Return the shared keep-alive session so Graph calls reuse pooled connections."""
+    global _session
+    if _session is None:
+        _session = requests.Session()
+    return _session
 
 # === AUTHENTICATION ===
-def authenticate_outlook():
-    app = msal.PublicClientApplication(CLIENT_ID, authority=AUTHORITY)
-    accounts = app.get_accounts()
-    token_data = app.acquire_token_silent(SCOPES, account=accounts[0] if accounts else None)
+def _msal_app():
+    """Return the shared MSAL app, so a long-running process keeps its in-memory tokens."""
+    global _app
+    if _app is None:
+        # The persisted cache lets acquire_token_silent reuse or refresh tokens from earlier runs
+        cache = load_token_cache(TOKEN_CACHE_PATH)
+        _app = msal.PublicClientApplication(CLIENT_ID, authority=AUTHORITY, token_cache=cache)
+    return _app
+
+def _account_key() -> str:
+    """Identify the account authenticate_outlook signed in to (its MSAL home account ID)."""
+    return _account or 'default'
 
-    if not token_data:
+def authenticate_outlook(cancel=None):
+    global _account
+    app = _msal_app()
+    accounts = app.get_accounts()
+    token_data = app.acquire_token_silent(SCOPES, account=accounts[0]) if accounts else None
+    if token_data:
+        _account = accounts[0].get('home_account_id')
+    else:
         flow = app.initiate_device_flow(scopes=SCOPES)
         if 'user_code' not in flow:
             raise Exception(f"❌ Device flow error: {flow}")
         print(f"🔐 Visit {flow['verification_uri']} and enter code: {flow['user_code']}")
-        token_data = app.acquire_token_by_device_flow(flow)
+        # Polls for up to the code's lifetime (about 15 minutes) unless cancel is set
+        token_data = app.acquire_token_by_device_flow(
+            flow, exit_condition=lambda flow: cancel is not None and cancel.is_set())
+        if cancel is not None and cancel.is_set():
+            raise Cancelled("Cancelled while waiting for the Microsoft sign-in")
+        # The home account ID is "<object id>.<tenant id>"
+        claims = token_data.get('id_token_claims', {})
+        _account = f"{claims['oid']}.{claims['tid']}" if 'oid' in claims and 'tid' in claims else None
 
     if 'access_token' not in token_data:
         raise Exception("❌ Authentication failed.")
 
-    # Save token data for debugging and reuse
-    with open(TOKEN_PATH, 'w', encoding='utf-8') as f:
-        json.dump(token_data, f, indent=2)
+    # Only written when MSAL added or refreshed a token
+    save_token_cache(app.token_cache, TOKEN_CACHE_PATH)
 
     return token_data['access_token']
 
 # === CALENDAR MANAGEMENT ===
-def get_or_create_outlook_calendar(token, calendar_name='UofG Schedule'):
+def get_or_create_outlook_calendar(token, calendar_name='UofG Schedule', session=None):
+    session = session or get_session()
     headers = {'Authorization': f'Bearer {token}'}
-    response = requests.get(f"{GRAPH_BASE}/me/calendars", headers=headers)
+    response = session.get(f"{GRAPH_BASE}/me/calendars", headers=headers)
     response.raise_for_status()
     calendars = response.json().get('value', [])
 
@@ -52,93 +105,348 @@ def get_or_create_outlook_calendar(token, calendar_name='UofG Schedule'):
     new_cal = {
         "name": calendar_name
     }
-    response = requests.post(f"{GRAPH_BASE}/me/calendars", headers=headers, json=new_cal)
+    response = session.post(f"{GRAPH_BASE}/me/calendars", headers=headers, json=new_cal)
     response.raise_for_status()
     return response.json()['id']
 
-# === PARSE ICS TO OUTLOOK EVENTS ===
-def convert_rrule(rrule_string, dtstart):
-    result = {
-        "pattern": {
-            "type": "weekly",
-            "interval": 1,
-            "daysOfWeek": [],
-        },
-        "range": {
-            "type": "endDate",
-            "startDate": dtstart.date().isoformat(),
-            "endDate": "",  # filled below
+# === SHARED EVENTS TO OUTLOOK ===
+def event_to_outlook(ev):
+    event = {
+        "subject": ev.summary,
+        "body": {"contentType": "text", "content": ev.description},
+        "location": {"displayName": ev.location},
+        "start": {"dateTime": localize(ev.start).isoformat(), "timeZone": TIMEZONE},
+        "end": {"dateTime": localize(ev.end).isoformat(), "timeZone": TIMEZONE},
+    }
+
+    if ev.byday:
+        event["recurrence"] = {
+            "pattern": {
+                "type": "weekly",
+                "interval": 1,
+                "daysOfWeek": [DAY_NAMES[d] for d in ev.byday if d in DAY_NAMES],
+            },
+            "range": {
+                "type": "endDate" if ev.until else "noEnd",
+                "startDate": ev.start.date().isoformat(),
+            }
         }
+        if ev.until:
+            # End at the last occurrence, Graph has no EXDATE (see delete_excluded_instances)
+            event["recurrence"]["range"]["endDate"] = ev.last_occurrence().date().isoformat()
+
+    return event
+
+# === BATCHED INSERTS ===
+def _retry_after(headers):
+    value = (headers or {}).get("Retry-After")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+def _is_throttled(status):
+    # Graph answers 429, or 503 with Retry-After, when a mailbox is being throttled
+    return status in (429, 503)
+
+def _send_envelope(session, headers, calls, chunk, attempt):
+    """POST one $batch envelope.
+
+    Returns ({idx: error}, {succeeded idx: response body}, idx to retry, Retry-After or None, throttled).
+    """
+    envelope = {"requests": []}
+    for idx in chunk:
+        item = {"id": str(idx), "method": calls[idx]["method"], "url": calls[idx]["url"]}
+        if calls[idx].get("headers"):
+            item["headers"] = dict(calls[idx]["headers"])
+        if calls[idx].get("body") is not None:
+            item["headers"] = {**item.get("headers", {}), "Content-Type": "application/json"}
+            item["body"] = calls[idx]["body"]
+        envelope["requests"].append(item)
+
+    errors, ok, retry, wait, throttled = {}, {}, [], None, False
+    with tracing.span('outlook.batch', items=len(chunk), attempt=attempt) as sp:
+        sent_at = time.perf_counter()
+        try:
+            res = session.post(f"{GRAPH_BASE}/$batch", headers=headers, json=envelope)
+        except requests.RequestException as e:
+            res = None
+            for idx in chunk:
+                errors[idx] = str(e)
+            retry += chunk
+        tracing.observe('outlook.request', time.perf_counter() - sent_at)
+        if res is not None:
+            sp.set(status=res.status_code)
+    if res is None:
+        return errors, ok, retry, wait, throttled
+
+    if res.status_code != 200:
+        # The envelope itself was rejected, nothing inside it ran
+        for idx in chunk:
+            errors[idx] = f"{res.status_code} - {res.text}"
+        if res.status_code == 429 or res.status_code >= 500:
+            retry += chunk
+            wait = _retry_after(res.headers)
+        return errors, ok, retry, wait, _is_throttled(res.status_code)
+
+    for item in res.json().get("responses", []):
+        idx = int(item["id"])
+        status = item.get("status", 0)
+        if 200 <= status < 300:
+            ok[idx] = item.get("body")
+            continue
+        errors[idx] = f"{status} - {json.dumps(item.get('body'))}"
+        if status == 429 or status >= 500:
+            retry.append(idx)
+            throttled = throttled or _is_throttled(status)
+            retry_after = _retry_after(item.get("headers"))
+            if retry_after is not None:
+                wait = max(wait or 0, retry_after)
+    return errors, ok, retry, wait, throttled
+
+def send_batched(token, calls, batch_size=BATCH_LIMIT, max_attempts=MAX_ATTEMPTS, session=None,
+                 max_in_flight=MAX_IN_FLIGHT, progress=None, cancel=None, keep_responses=False):
+    """Send Graph request dicts through $batch envelopes, retrying only the items that failed."""
+    session = session or get_session()
+    headers = {
+        'Authorization': f'Bearer {token}',
+        'Content-Type': 'application/json'
+    }
+    batch_size = max(1, min(batch_size, BATCH_LIMIT))
+    errors = {}
+    responses = {}
+    succeeded = 0
+    lock = threading.Lock()
+
+    def send(chunk, attempt):
+        nonlocal succeeded
+        chunk_errors, ok, retry, wait, throttled = _send_envelope(session, headers, calls, chunk, attempt)
+        with lock:
+            for idx in ok:
+                errors.pop(idx, None)
+            errors.update(chunk_errors)
+            if keep_responses:
+                responses.update(ok)
+            succeeded += len(ok)
+            done = succeeded
+        if ok and progress:
+            progress(done, len(calls))
+        return sorted(retry), wait, throttled
+
+    chunks = [list(range(start, min(start + batch_size, len(calls)))) for start in range(0, len(calls), batch_size)]
+    scheduler = RequestScheduler('outlook', max_in_flight, rate=RATE_LIMIT, burst=RATE_BURST, max_attempts=max_attempts)
+    stats = scheduler.run(chunks, send, cancel=cancel)
+
+    tracing.count('outlook.succeeded', succeeded)
+    tracing.count('outlook.failed', len(errors))
+    result = {
+        'succeeded': succeeded,
+        'failed': [(calls[idx]["label"], errors[idx]) for idx in sorted(errors)],
+        'requests': stats['requests'],
+    }
+    if keep_responses:
+        result['responses'] = responses
+    return result
+
+def _excluded_starts(ev) -> list[datetime]:
+    """EXDATEs that fall inside the Graph series (it already ends at the last occurrence)."""
+    last = ev.last_occurrence()
+    return [day for day in ev.exdates if day < last] if ev.byday else []
+
+def delete_excluded_instances(token, series, batch_size=BATCH_LIMIT, session=None,
+                              max_in_flight=MAX_IN_FLIGHT, cancel=None):
+    """Delete the occurrences of each (series id, Event) that fall on the event's EXDATEs."""
+    lookups = []
+    # Request index -> position in series, so a failure marks its whole series unfinished
+    owner = {}
+    for pos, (event_id, ev) in enumerate(series):
+        for day in _excluded_starts(ev):
+            owner[len(lookups)] = pos
+            start = localize(day)
+            query = urlencode({
+                "startDateTime": (start - timedelta(minutes=1)).isoformat(),
+                "endDateTime": (start + timedelta(minutes=1)).isoformat(),
+                "$select": "id,start",
+            })
+            lookups.append({"label": f"{ev.summary} on {day:%Y-%m-%d}", "method": "GET",
+                            "url": f"/me/events/{event_id}/instances?{query}"})
+    if not lookups:
+        return {'deleted': 0, 'failed': [], 'requests': 0, 'completed': [event_id for event_id, _ in series]}
+
+    found = send_batched(token, lookups, batch_size=batch_size, session=session,
+                         max_in_flight=max_in_flight, cancel=cancel, keep_responses=True)
+    deletes, delete_owner = [], {}
+    for idx, body in sorted(found['responses'].items()):
+        for occurrence in (body or {}).get("value", []):
+            delete_owner[len(deletes)] = owner[idx]
+            deletes.append({"label": lookups[idx]["label"], "method": "DELETE",
+                            "url": f"/me/events/{occurrence['id']}"})
+    result = send_batched(token, deletes, batch_size=batch_size, session=session,
+                          max_in_flight=max_in_flight, cancel=cancel, keep_responses=True)
+    unfinished = {pos for idx, pos in owner.items() if idx not in found['responses']}
+    unfinished |= {pos for idx, pos in delete_owner.items() if idx not in result['responses']}
+    return {
+        'deleted': result['succeeded'],
+        'failed': found['failed'] + result['failed'],
+        'requests': found['requests'] + result['requests'],
+        'completed': [event_id for pos, (event_id, _) in enumerate(series) if pos not in unfinished],
     }
 
-    day_map = {
-        'MO': 'monday', 'TU': 'tuesday', 'WE': 'wednesday',
-        'TH': 'thursday', 'FR': 'friday', 'SA': 'saturday', 'SU': 'sunday'
+def insert_events_batched(token, calendar_id, events, batch_size=BATCH_LIMIT, max_attempts=MAX_ATTEMPTS, session=None,
+                          max_in_flight=MAX_IN_FLIGHT, progress=None, cancel=None):
+    """Create events through Graph $batch envelopes, retrying only the items that failed."""
+    url = f"/me/calendars/{calendar_id}/events"
+    calls = [
+        {"label": body.get("subject", ""), "method": "POST", "url": url, "body": body}
+        for body in events
+    ]
+    result = send_batched(token, calls, batch_size=batch_size, max_attempts=max_attempts, session=session,
+                          max_in_flight=max_in_flight, progress=progress, cancel=cancel, keep_responses=True)
+    return {
+        'created': result['succeeded'],
+        'failed': result['failed'],
+        'requests': result['requests'],
+        'saved': max(0, len(events) - result['requests']),
+        'ids': {idx: body['id'] for idx, body in result['responses'].items()},
     }
 
-    match = re.search(r'BYDAY=([A-Z,]+)', rrule_string)
-    if match:
-        result["pattern"]["daysOfWeek"] = [day_map[d] for d in match.group(1).split(',') if d in day_map]
+def import_events_to_outlook(token, calendar_id, events, batch_size=BATCH_LIMIT, max_in_flight=MAX_IN_FLIGHT,
+                             progress=None, cancel=None):
+    bodies = [event_to_outlook(ev) for ev in events]
+    result = insert_events_batched(token, calendar_id, bodies, batch_size=batch_size,
+                                   max_in_flight=max_in_flight, progress=progress, cancel=cancel)
+    excluded = delete_excluded_instances(token, [(event_id, events[idx]) for idx, event_id in result['ids'].items()],
+                                         batch_size=batch_size, max_in_flight=max_in_flight, cancel=cancel)
+    result['failed'] += excluded['failed']
+    result['requests'] += excluded['requests']
+    result['excluded'] = excluded['deleted']
 
-    match = re.search(r'UNTIL=(\d{8})', rrule_string)
-    if match:
-        until = datetime.strptime(match.group(1), "%Y%m%d").date()
-        result["range"]["endDate"] = until.isoformat()
+    for summary, error in result['failed']:
+        print(f"❌ Error inserting '{summary}': {error}")
 
+    print(
+        f"✅ Successfully created {result['created']} events in Outlook Calendar '{calendar_id}' "
+        f"using {result['requests']} request(s), saving {result['saved']} round trips; "
+        f"{result['excluded']} excluded date(s) removed."
+    )
     return result
 
-def import_ics_to_outlook(token, calendar_id, ics_file_path):
+# === INCREMENTAL SYNC ===
+def _extended_value(event, prop_id):
+    for prop in event.get("singleValueExtendedProperties", []):
+        if prop.get("id", "").lower() == prop_id.lower():
+            return prop.get("value")
+    return None
+
+def list_managed_events(token, calendar_id, session=None):
+    """Yield events this tool created in the calendar, following @odata.nextLink."""
+    session = session or get_session()
     headers = {
         'Authorization': f'Bearer {token}',
-        'Content-Type': 'application/json'
+        # Return start times in schedule time so they compare with the sync window
+        'Prefer': f'outlook.timezone="{TIMEZONE}"',
+    }
+    url = f"{GRAPH_BASE}/me/calendars/{calendar_id}/events"
+    params = {
+        "$select": "id,subject,start",
+        "$filter": f"singleValueExtendedProperties/Any(ep: ep/id eq '{UID_PROPERTY}' and ep/value ne null)",
+        "$expand": f"singleValueExtendedProperties($filter=id eq '{UID_PROPERTY}' or id eq '{HASH_PROPERTY}')",
+        "$top": 1000,
     }
-    tz = pytz.timezone("America/Toronto")
-    created = 0
+    while url:
+        response = session.get(url, headers=headers, params=params)
+        response.raise_for_status()
+        data = response.json()
+        yield from data.get("value", [])
+        # nextLink already carries the query string
+        url, params = data.get("@odata.nextLink"), None
 
-    with open(ics_file_path, 'r', encoding='UTF-8') as f:
-        cal = Calendar.from_ical(f.read())
+def sync_events_to_outlook(token, calendar_id, events, batch_size=BATCH_LIMIT, session=None,
+                           max_in_flight=MAX_IN_FLIGHT, progress=None, cancel=None):
+    """Sync events by their UID property, only deleting managed events inside the span of the given events."""
+    desired = {}
+    by_uid = {ev.uid: ev for ev in events}
+    for ev in events:
+        body = event_to_outlook(ev)
+        body["singleValueExtendedProperties"] = [
+            {"id": UID_PROPERTY, "value": ev.uid},
+            {"id": HASH_PROPERTY, "value": fingerprint(body)},
+        ]
+        desired[ev.uid] = body
 
-    for component in cal.walk():
-        if component.name != "VEVENT":
+    window = event_window(events) if events else None
+    existing = {}
+    with tracing.span('outlook.list') as sp:
+        for item in list_managed_events(token, calendar_id, session=session):
+            start = datetime.fromisoformat(item["start"]["dateTime"][:19])
+            if window and not window[0] <= start <= window[1]:
+                continue
+            existing[_extended_value(item, UID_PROPERTY)] = item
+        sp.set(events=len(existing))
+
+    calls = []
+    # Call index -> event, for new or changed series whose excluded dates must be deleted
+    recurring = {}
+    counts = {'inserted': 0, 'patched': 0, 'deleted': 0, 'unchanged': 0}
+    for uid, body in desired.items():
+        current = existing.get(uid)
+        if current is not None and _extended_value(current, HASH_PROPERTY) == body["singleValueExtendedProperties"][1]["value"]:
+            counts['unchanged'] += 1
             continue
+        if _excluded_starts(by_uid[uid]):
+            # The real hash is only written once the excluded dates are gone, so a run
+            # that fails or is cancelled before then patches the series again next time
+            recurring[len(calls)] = by_uid[uid]
+            body = dict(body, singleValueExtendedProperties=[
+                {"id": UID_PROPERTY, "value": uid}, {"id": HASH_PROPERTY, "value": PENDING_HASH}])
+        if current is None:
+            calls.append({"label": body["subject"], "method": "POST",
+                          "url": f"/me/calendars/{calendar_id}/events", "body": body})
+            counts['inserted'] += 1
+        else:
+            calls.append({"label": body["subject"], "method": "PATCH",
+                          "url": f"/me/events/{current['id']}", "body": body})
+            counts['patched'] += 1
 
-        summary = str(component.get("summary", ""))
-        description = str(component.get("description", ""))
-        location = str(component.get("location", ""))
-        dtstart = component.get("dtstart").dt
-        dtend = component.get("dtend").dt
-
-        if isinstance(dtstart, datetime) and dtstart.tzinfo is None:
-            dtstart = tz.localize(dtstart)
-        if isinstance(dtend, datetime) and dtend.tzinfo is None:
-            dtend = tz.localize(dtend)
-
-        event = {
-            "subject": summary,
-            "body": {"contentType": "text", "content": description},
-            "location": {"displayName": location},
-            "start": {"dateTime": dtstart.isoformat(), "timeZone": "America/Toronto"},
-            "end": {"dateTime": dtend.isoformat(), "timeZone": "America/Toronto"},
-        }
+    for uid, current in existing.items():
+        if uid not in desired:
+            calls.append({"label": current.get("subject", ""), "method": "DELETE",
+                          "url": f"/me/events/{current['id']}"})
+            counts['deleted'] += 1
 
-        rrule = component.get("rrule")
-        if rrule:
-            rrule_str = "RRULE:" + rrule.to_ical().decode()
-            rrule_str = re.sub(r'(UNTIL=\d+T\d+)(?!Z)', r'\1Z', rrule_str)
-            event["recurrence"] = convert_rrule(rrule_str, dtstart)
+    result = send_batched(token, calls, batch_size=batch_size, session=session,
+                          max_in_flight=max_in_flight, progress=progress, cancel=cancel, keep_responses=True)
+    # Both POST and PATCH answer with the series master
+    responses = result.pop('responses')
+    series = [(responses[idx]['id'], ev) for idx, ev in recurring.items() if idx in responses]
+    excluded = delete_excluded_instances(token, series, batch_size=batch_size, session=session,
+                                         max_in_flight=max_in_flight, cancel=cancel)
+    by_id = dict(series)
+    confirms = [
+        {"label": by_id[event_id].summary, "method": "PATCH", "url": f"/me/events/{event_id}",
+         "body": {"singleValueExtendedProperties": desired[by_id[event_id].uid]["singleValueExtendedProperties"]}}
+        for event_id in excluded['completed']
+    ]
+    confirmed = send_batched(token, confirms, batch_size=batch_size, session=session,
+                             max_in_flight=max_in_flight, cancel=cancel)
+    # One list call plus whatever batches were needed
+    result['requests'] += 1 + excluded['requests'] + confirmed['requests']
+    result['failed'] += excluded['failed'] + confirmed['failed']
+    result['excluded'] = excluded['deleted']
+    result.update(counts)
 
-        res = requests.post(
-            f"{GRAPH_BASE}/me/calendars/{calendar_id}/events",
-            headers=headers,
-            json=event
-        )
+    for summary, error in result['failed']:
+        print(f"❌ Error syncing '{summary}': {error}")
 
-        if res.status_code == 201:
-            created += 1
-        else:
-            print(f"❌ Error inserting '{summary}': {res.status_code} - {res.text}")
+    print(
+        f"✅ Synced Outlook Calendar '{calendar_id}': {result['inserted']} inserted, {result['patched']} updated, "
+        f"{result['deleted']} deleted, {result['unchanged']} unchanged, {result['excluded']} excluded date(s) removed "
+        f"in {result['requests']} request(s)."
+    )
+    return result
 
-    print(f"✅ Successfully created {created} events in Outlook Calendar '{calendar_id}'.")
+def import_ics_to_outlook(token, calendar_id, ics_file_path, batch_size=BATCH_LIMIT):
+    return import_events_to_outlook(token, calendar_id, read_ics(ics_file_path), batch_size=batch_size)
 
 # === MAIN ===
 def main():
@@ -0,0 +1,285 @@
+"""Expand weekly events into concrete occurrences and find overlapping meetings.
+
+Occurrences are held as NumPy arrays of wall-clock minutes, so one student's
+clashes and room/instructor occupancy over thousands of schedules are both a
+sort plus a searchsorted sweep instead of pairwise Python comparisons.
+
+Usage:
+    python overlaps.py payload.json                                # clashes in one schedule
+    python overlaps.py payloads/ --room "ROZH, Room 101" --at "2025-09-08 10:00"
+    python overlaps.py payloads.ndjson --instructor "Instructor 12"
+    python overlaps.py payloads/ --double-booked room
+"""
+import argparse
+import json
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+import numpy as np
+from events import Event, build_events
+from meetings import Meeting
+import tracing
+
+EPOCH = datetime(1970, 1, 1)
+DAY = 24 * 60
+WEEK = 7 * DAY
+WEEKDAYS = ['MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU']
+
+# Rooms that don't identify a place, never counted as occupied
+UNPLACED = {'', 'TBA'}
+
+# Resource ids are packed above the minute value so every resource sorts into its own band
+RESOURCE_SHIFT = 32
+
+def _minutes(dt: datetime) -> int:
+    return (dt - EPOCH) // timedelta(minutes=1)
+
+def _datetime(minutes) -> datetime:
+    return EPOCH + timedelta(minutes=int(minutes))
+
+def _ragged(counts: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """For counts [2, 3] return owners [0, 0, 1, 1, 1] and offsets [0, 1, 0, 1, 2]."""
+    owners = np.repeat(np.arange(len(counts)), counts)
+    starts = np.cumsum(counts) - counts
+    return owners, np.arange(int(counts.sum())) - starts[owners]
+
+def _overlap_pairs(starts: np.ndarray, ends: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Sweep sorted intervals and return index pairs (i, j), i < j, that intersect.
+
+    starts must be ascending. Every interval starting before i ends is an
+    overlap, so one searchsorted finds them all. Touching intervals don't count.
+    """
+    stop = np.searchsorted(starts, ends, side='left')
+    counts = np.maximum(stop - np.arange(1, len(starts) + 1), 0)
+    first, offsets = _ragged(counts)
+    return first, first + 1 + offsets
+
+@dataclass
+class Occurrences:
+    """Every occurrence of a list of events, as parallel arrays of wall-clock minutes."""
+    events: list[Event]
+    start: np.ndarray
+    end: np.ndarray
+    event: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+def expand(events: list[Event]) -> Occurrences:
+    """Expand each event's weekly rule up to its UNTIL; events without BYDAY occur once."""
+    with tracing.span('overlaps.expand', events=len(events)) as sp:
+        # One (event, first, last, duration) row per weekday, the weeks themselves are expanded in NumPy
+        table = []
+        for i, ev in enumerate(events):
+            start = _minutes(ev.start)
+            duration = _minutes(ev.end) - start
+            if not ev.byday:
+                table.append((i, start, start, duration))
+                continue
+            until = _minutes(ev.until or ev.end)
+            for code in ev.byday:
+                shift = (WEEKDAYS.index(code) - ev.start.weekday()) % 7
+                table.append((i, start + shift * DAY, until, duration))
+
+        owner, first, last, length = np.array(table, dtype=np.int64).reshape(-1, 4).T
+        counts = np.maximum((last - first) // WEEK + 1, 0)
+        rows, weeks = _ragged(counts)
+        starts = first[rows] + weeks * WEEK
+        owners = owner[rows]
+
+        # Drop EXDATEs, matched on (event, start minute) packed into one key
+        excluded = [(i << RESOURCE_SHIFT) | _minutes(d) for i, ev in enumerate(events) for d in ev.exdates]
+        if excluded:
+            keep = ~np.isin((owners << RESOURCE_SHIFT) | starts, excluded)
+            starts, owners, rows = starts[keep], owners[keep], rows[keep]
+        ends = starts + length[rows]
+        sp.set(occurrences=len(starts))
+    return Occurrences(events, starts, ends, owners)
+
+@dataclass
+class Overlap:
+    """Two events that meet at the same time at least once."""
+    first: Event
+    second: Event
+    start: datetime
+    occurrences: int
+    resource: Optional[str] = None
+
+def _pair_overlaps(events, starts, ends, owners, clock=None, resources=None) -> list[Overlap]:
+    """Group intersecting occurrence pairs by event pair, earliest clash first.
+
+    clock gives each occurrence's wall-clock minute when starts are packed keys.
+    """
+    clock = starts if clock is None else clock
+    i, j = _overlap_pairs(starts, ends)
+    a, b = np.minimum(owners[i], owners[j]), np.maximum(owners[i], owners[j])
+    keep = a != b
+    i, a, b = i[keep], a[keep], b[keep]
+    if not len(i):
+        return []
+    keys = a.astype(np.int64) * len(events) + b
+    # i ascends, so each pair's first index is its earliest clash
+    _, index, counts = np.unique(keys, return_index=True, return_counts=True)
+    overlaps = [
+        Overlap(events[a[k]], events[b[k]], _datetime(clock[i[k]]), int(n),
+                resources[i[k]] if resources is not None else None)
+        for k, n in zip(index, counts)
+    ]
+    overlaps.sort(key=lambda o: o.start)
+    return overlaps
+
+def find_overlaps(events: list[Event]) -> list[Overlap]:
+    """Return every pair of events in one schedule that clash, with the first clash and how often."""
+    occ = expand(events)
+    with tracing.span('overlaps.find', occurrences=len(occ)) as sp:
+        order = np.argsort(occ.start, kind='stable')
+        overlaps = _pair_overlaps(events, occ.start[order], occ.end[order], occ.event[order])
+        sp.set(overlaps=len(overlaps))
+    return overlaps
+
+def timed_events(meetings: list[Meeting], term: str = None) -> list[tuple[Meeting, Event]]:
+    """Pair each timed meeting with its event, build_events drops the untimed ones."""
+    timed = [m for m in meetings if m.start_time and m.end_time]
+    return list(zip(timed, build_events(timed, term=term)))
+
+class OccupancyIndex:
+    """Room and instructor occupancy over many schedules.
+
+    Sections shared by many students are stored once (keyed by event UID).
+    Each kind is one array sorted by (resource, start), so a query is a
+    searchsorted into the resource's band and a double-booking scan is the
+    same sweep used for a single schedule.
+    """
+    KINDS = ('room', 'instructor')
+
+    def __init__(self):
+        self.events = []
+        self._uids = {}
+        self._names = {kind: {} for kind in self.KINDS}
+        self._rows = {kind: [] for kind in self.KINDS}
+        self._tables = None
+
+    def _resource(self, kind: str, name: str) -> int:
+        return self._names[kind].setdefault(name, len(self._names[kind]))
+
+    def add(self, meetings: list[Meeting], term: str = None):
+        """Add one student's normalized meetings (sorted_courses output)."""
+        for m, ev in timed_events(meetings, term):
+            if ev.uid in self._uids:
+                continue
+            index = self._uids[ev.uid] = len(self.events)
+            self.events.append(ev)
+            if m.location.upper() not in UNPLACED:
+                self._rows['room'].append((index, self._resource('room', m.location)))
+            for name in m.section.instructors:
+                self._rows['instructor'].append((index, self._resource('instructor', name)))
+        self._tables = None
+
+    def add_result(self, result: dict, terms=None):
+        """Add every term (or only terms) of a PrintSchedule `result` payload."""
+        from parse_schedule import sorted_courses
+        for term in result.get('Terms', []):
+            if terms and term.get('Code') not in terms:
+                continue
+            self.add(sorted_courses(term.get('PlannedCourses', [])), term=term.get('Code'))
+
+    def _build(self):
+        if self._tables is not None:
+            return self._tables
+        with tracing.span('occupancy.build', events=len(self.events)) as sp:
+            occ = expand(self.events)
+            # Group occurrences by event so each (event, resource) row can take its block
+            order = np.argsort(occ.event, kind='stable')
+            starts, ends = occ.start[order], occ.end[order]
+            per_event = np.bincount(occ.event, minlength=len(self.events))
+            block = np.cumsum(per_event) - per_event
+
+            self._tables = {}
+            for kind in self.KINDS:
+                rows = np.array(self._rows[kind], dtype=np.int64).reshape(-1, 2)
+                owners, offsets = _ragged(per_event[rows[:, 0]])
+                picked = block[rows[owners, 0]] + offsets
+                band = rows[owners, 1] << RESOURCE_SHIFT
+                key_start, key_end = band + starts[picked], band + ends[picked]
+                by_start = np.argsort(key_start, kind='stable')
+                self._tables[kind] = (key_start[by_start], key_end[by_start], rows[owners, 0][by_start])
+            sp.set(occurrences=len(occ))
+        return self._tables
+
+    def occupants(self, kind: str, name: str, start: datetime = None, end: datetime = None) -> list[tuple[Event, datetime, datetime]]:
+        """Return (event, start, end) for every booking of a room or instructor overlapping [start, end)."""
+        resource = self._names[kind].get(name)
+        if resource is None:
+            return []
+        key_start, key_end, owners = self._build()[kind]
+        band = resource << RESOURCE_SHIFT
+        lo = np.searchsorted(key_start, band)
+        hi = np.searchsorted(key_start, band + (_minutes(end) if end else (1 << RESOURCE_SHIFT)))
+        hits = np.nonzero(key_end[lo:hi] > band + (_minutes(start) if start else 0))[0] + lo
+        return [(self.events[owners[k]], _datetime(key_start[k] - band), _datetime(key_end[k] - band)) for k in hits]
+
+    def double_booked(self, kind: str) -> list[Overlap]:
+        """Return distinct sections booked into the same room (or with the same instructor) at once."""
+        key_start, key_end, owners = self._build()[kind]
+        names = np.array(list(self._names[kind]), dtype=object)
+        clock = key_start & ((1 << RESOURCE_SHIFT) - 1)
+        return _pair_overlaps(self.events, key_start, key_end, owners, clock, names[key_start >> RESOURCE_SHIFT])
+
+    def names(self, kind: str) -> list[str]:
+        return list(self._names[kind])
+
+def main():
+    parser = argparse.ArgumentParser(description="Find overlapping meetings and room/instructor occupancy")
+    parser.add_argument("input", help="a payload .json, a directory of them, an NDJSON file, or '-' for stdin")
+    parser.add_argument("--terms", nargs="*", help="only these term codes")
+    parser.add_argument("--room", help="list bookings of this room")
+    parser.add_argument("--instructor", help="list bookings of this instructor")
+    parser.add_argument("--at", help="only bookings running at this time, e.g. '2025-09-08 10:00'")
+    parser.add_argument("--double-booked", choices=OccupancyIndex.KINDS, help="list clashing bookings")
+    args = parser.parse_args()
+
+    from bulk_convert import iter_sources
+    terms = set(args.terms) if args.terms else None
+    # A single .json file is one payload, anything else is read like bulk_convert input
+    sources = [(args.input, 'file', args.input)] if args.input.endswith('.json') else iter_sources(args.input)
+    payloads = []
+    for name, kind, data in sources:
+        if kind == 'file':
+            with open(data, 'r', encoding='utf-8') as f:
+                payloads.append((name, json.load(f)))
+        else:
+            payloads.append((name, json.loads(data)))
+
+    if not (args.room or args.instructor or args.double_booked):
+        from parse_schedule import sorted_courses
+        for name, result in payloads:
+            events = []
+            for term in result.get('Terms', []):
+                if not terms or term.get('Code') in terms:
+                    events += build_events(sorted_courses(term.get('PlannedCourses', [])), term=term.get('Code'))
+            overlaps = find_overlaps(events)
+            print(f"{'❌' if overlaps else '✅'} {name}: {len(overlaps)} overlapping pair(s)")
+            for o in overlaps:
+                print(f"   {o.first.summary} / {o.second.summary}: {o.occurrences}x from {o.start:%Y-%m-%d %H:%M}")
+        return
+
+    index = OccupancyIndex()
+    for _, result in payloads:
+        index.add_result(result, terms)
+
+    if args.double_booked:
+        overlaps = index.double_booked(args.double_booked)
+        print(f"{len(overlaps)} double booking(s) by {args.double_booked}")
+        for o in overlaps:
+            print(f"   {o.resource}: {o.first.summary} / {o.second.summary}, {o.occurrences}x from {o.start:%Y-%m-%d %H:%M}")
+        return
+
+    kind, name = ('room', args.room) if args.room else ('instructor', args.instructor)
+    at = datetime.strptime(args.at, "%Y-%m-%d %H:%M") if args.at else None
+    bookings = index.occupants(kind, name, at, at + timedelta(minutes=1) if at else None)
+    print(f"{len(bookings)} booking(s) for {kind} {name}")
+    for ev, start, end in bookings:
+        print(f"   {start:%a %Y-%m-%d %H:%M}-{end:%H:%M}  {ev.summary}  {ev.location}")
+
+if __name__ == "__main__":
+    main()
@@ -1,70 +1,309 @@
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service as ChromeService
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-from bs4 import BeautifulSoup
+import argparse
+import os
 import requests
 import re
 import json
-from datetime import datetime, timedelta, timezone
-import uuid
 import time
-import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, Union
+from events import Event, build_events
+from ics_writer import write_ics
+from meetings import Meeting, Section
+from progress import Cancelled
+from session_cache import chromedriver_path, clear_cookies, load_cookies, save_cookies
+import tracing
+
+PRINT_SCHEDULE_URL = "https://colleague-ss.uoguelph.ca/Student/Planning/DegreePlans/PrintSchedule?termId={term}"
+
+RESULT_MARKER = re.compile(r"\bvar\s+result\s*=\s*")
+RESULT_MARKER_BYTES = re.compile(rb"\bvar\s+result\s*=\s*")
+# Where the object can end: "}" then optional whitespace and the ";" (or the script closing without one)
+RESULT_END_BYTES = re.compile(rb"\}\s*(?:;|</script)")
+_DECODER = json.JSONDecoder()
+
+# Read PrintSchedule in chunks and hang up once the result object is complete
+STREAM_FETCH = True
+STREAM_CHUNK_BYTES = 64 * 1024
+# Bytes kept from before the marker, enough for a "var result =" split across chunks
+MARKER_TAIL_BYTES = 256
+
+class ResultScanner:
+    """Find `var result = {...};` in a page arriving in chunks and keep only the object's bytes.
+
+    Markup before the marker is dropped as it arrives. The object can only end
+    at a "}" followed by a ";" (or the end of the script), so each one that
+    arrives is tried with raw_decode, which also rejects one inside a JSON
+    string. The payload is re-encoded from the decoded text, raw_decode's end
+    offset counts characters, not bytes.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.scanning = False
+        self.pos = 0
+        self.bytes_seen = 0
+        self.payload = None
+
+    def feed(self, chunk: bytes) -> bool:
+        """Add the next chunk. Returns True once payload holds a complete result object."""
+        self.bytes_seen += len(chunk)
+        self.buffer += chunk
+        while self.payload is None:
+            if not self.scanning and not self._find_start():
+                return False
+            if not self._find_end():
+                return False
+        return True
+
+    def close(self):
+        """Call at the end of the response; a result object that never closed is an error, not a missing page."""
+        if self.payload is None and self.scanning:
+            # The page may end without a ";" or "</script>" after the object
+            if not self._decode(len(self.buffer)):
+                raise RuntimeError("Result object on the schedule page never closed")
+
+    def _find_start(self) -> bool:
+        buf = self.buffer
+        while True:
+            m = RESULT_MARKER_BYTES.search(buf)
+            if m is None:
+                del buf[:max(0, len(buf) - MARKER_TAIL_BYTES)]
+                return False
+            if m.end() == len(buf):
+                # More whitespace (or the brace) may still be on its way
+                del buf[:m.start()]
+                return False
+            if buf[m.end()] != ord('{'):
+                # `var result = null;` or similar, keep looking
+                del buf[:m.end()]
+                continue
+            del buf[:m.end()]
+            self.scanning, self.pos = True, 0
+            return True
+
+    def _find_end(self) -> bool:
+        buf = self.buffer
+        while True:
+            m = RESULT_END_BYTES.search(buf, self.pos)
+            if m is None:
+                # Rescan from a trailing "}" (and whitespace), its ";" may be in the next chunk
+                i = len(buf)
+                while i > self.pos and buf[i - 1] in b' \t\r\n':
+                    i -= 1
+                self.pos = i - 1 if i > self.pos and buf[i - 1] == ord('}') else i
+                return False
+            self.pos = m.start() + 1
+            if not self._decode(self.pos):
+                # The "}" was inside a string, the object continues
+                continue
+            del buf[:m.end()]
+            self.scanning = False
+            return True
+
+    def _decode(self, end: int) -> bool:
+        """Try the buffer up to end as the object; keeps it as payload if it is the schedule result."""
+        try:
+            text = self.buffer[:end].decode('utf-8', errors='replace')
+            data, stop = _DECODER.raw_decode(text)
+        except json.JSONDecodeError:
+            return False
+        if isinstance(data, dict) and "Terms" in data:
+            self.payload = text[:stop].encode('utf-8')
+        return True
+
+def _cookie_session(cookies: list[dict]) -> requests.Session:
+    # Create a requests session and replay the cookies into it
+    sess = requests.Session()
+    for ck in cookies:
+        sess.cookies.set(ck['name'], ck['value'], domain=ck.get('domain'), path=ck.get('path', '/'))
+    return sess
+
+def _fetch_with_session(sess: requests.Session, url: str, stream: bool = STREAM_FETCH) -> Optional[Union[str, bytes]]:
+    """Fetch over an authenticated session, or return None if the session was rejected.
+
+    Streaming returns just the result object's bytes and closes the connection
+    as soon as it is complete; otherwise the whole page text is returned.
+    """
+    with tracing.span('schedule.fetch', url=url, stream=stream) as sp:
+        start = time.perf_counter()
+        # requests asks for gzip/deflate, iter_content inflates each chunk as it arrives
+        resp = sess.get(url, stream=stream)
+        try:
+            sp.set(status=resp.status_code)
+            # An expired session redirects to the login page instead of PrintSchedule
+            if resp.status_code in (401, 403) or "/PrintSchedule" not in resp.url:
+                return None
+            resp.raise_for_status()
+
+            if stream:
+                scanner = ResultScanner()
+                for chunk in resp.iter_content(STREAM_CHUNK_BYTES):
+                    if scanner.feed(chunk):
+                        break
+                else:
+                    scanner.close()
+                sp.set(bytes=scanner.bytes_seen, payload_bytes=len(scanner.payload or b''))
+                return scanner.payload
+
+            sp.set(bytes=len(resp.content))
+            if not RESULT_MARKER.search(resp.text):
+                return None
+            return resp.text
+        finally:
+            # Drops the connection when the rest of the page is still unread
+            resp.close()
+            tracing.observe('schedule.request', time.perf_counter() - start)
+
+def screen_size() -> tuple[int, int]:
+    """Display resolution. Tk must only be touched from the main thread, so call it there."""
+    import tkinter as tk
 
-def fetch_page_info(term: str) -> str:
-    url = f"https://colleague-ss.uoguelph.ca/Student/Planning/DegreePlans/PrintSchedule?termId={term}"
-    
-    # Get display resolution
     root = tk.Tk()
-    screen_width = root.winfo_screenwidth()
-    screen_height = root.winfo_screenheight()
-    root.destroy
-    
-    # Calculate center of screen and a percentage of display resolution
-    percentage = 0.70
-    width = int(screen_width * percentage)
-    height = int(screen_height * percentage)
-    x = (screen_width - width) // 2
-    y = (screen_height - height) // 2
-    
+    try:
+        return root.winfo_screenwidth(), root.winfo_screenheight()
+    finally:
+        root.destroy()
+
+def _browser_login(url: str, cancel=None, screen: Optional[Callable[[], tuple[int, int]]] = None) -> list[dict]:
+    """Open Chrome for login/MFA and return the session cookies. Setting cancel closes the browser.
+
+    screen returns the display resolution and is only called here, so a cached login never
+    touches Tk; without it Chrome picks the window size.
+    """
+    from selenium import webdriver
+    from selenium.common.exceptions import SessionNotCreatedException
+    from selenium.webdriver.chrome.service import Service as ChromeService
+    from selenium.webdriver.support.ui import WebDriverWait
+
     # Configure chrome to open page as an app and reduce logging data
     options = webdriver.ChromeOptions()
     options.add_experimental_option("excludeSwitches", ["enable-automation"])
-    options.add_argument(f"--window-size={width},{height}")
-    options.add_argument(f"--window-position={x},{y}")
+    if screen:
+        # Center the window at a percentage of the display resolution
+        screen_width, screen_height = screen()
+        percentage = 0.70
+        width = int(screen_width * percentage)
+        height = int(screen_height * percentage)
+        x = (screen_width - width) // 2
+        y = (screen_height - height) // 2
+        options.add_argument(f"--window-size={width},{height}")
+        options.add_argument(f"--window-position={x},{y}")
     options.add_argument(f"--app={url}")
     options.add_argument("--log-level=3")
     
-    # Start Chrome WebDriver
-    driver = webdriver.Chrome(
-        service=ChromeService(ChromeDriverManager().install()), 
-        options=options
-    )
+    # Start Chrome WebDriver, re-resolving the driver if Chrome updated past the cached one
+    with tracing.span('browser.start'):
+        try:
+            driver = webdriver.Chrome(service=ChromeService(chromedriver_path()), options=options)
+        except SessionNotCreatedException:
+            driver = webdriver.Chrome(service=ChromeService(chromedriver_path(refresh=True)), options=options)
     
     try:
+        def logged_in(driver):
+            # Checked every half second, so Cancel doesn't wait out the 10 minutes
+            if cancel is not None and cancel.is_set():
+                raise Cancelled("Login cancelled")
+            return "/PrintSchedule" in driver.current_url
+
         # Open the schedule URL and wait (up to 10 minutes) for MFA/login
-        WebDriverWait(driver, 600).until(
-            EC.url_contains("/PrintSchedule")
-        )
+        with tracing.span('browser.login_wait'):
+            WebDriverWait(driver, 600).until(logged_in)
         
         # Store cookies
-        cookies = driver.get_cookies()
+        return driver.get_cookies()
     finally:
         # Close browser
         driver.quit()
-        
-    # Create a requests session and replay the Selenium cookies into it
-    sess = requests.Session()
-    for ck in cookies:
-        sess.cookies.set(ck['name'], ck['value'], domain=ck['domain'])
-        
-    # Fetch the same URL via requests and return HTML
-    resp = sess.get(url)
-    resp.raise_for_status()
-    return resp.text
 
-def extract_courses(html: str, term: str) -> list[dict]:
+def open_session(term: str, cancel=None, screen: Optional[Callable[[], tuple[int, int]]] = None) -> tuple[requests.Session, Union[str, bytes]]:
+    """Return an authenticated session and the PrintSchedule page text, or the result object's bytes when streaming.
+
+    The cached session is tried first, Chrome is only opened when it has been rejected.
+    """
+    url = PRINT_SCHEDULE_URL.format(term=term)
+
+    cookies = load_cookies()
+    if cookies:
+        sess = _cookie_session(cookies)
+        html = _fetch_with_session(sess, url)
+        if html is not None:
+            tracing.count('session.cache_hit')
+            return sess, html
+        clear_cookies()
+    tracing.count('session.browser_login')
+
+    cookies = _browser_login(url, cancel, screen)
+    sess = _cookie_session(cookies)
+    html = _fetch_with_session(sess, url)
+    if html is None:
+        raise RuntimeError("Schedule page rejected the login session")
+    save_cookies(cookies)
+    return sess, html
+
+def fetch_page_info(term: str) -> Union[str, bytes]:
+    _, html = open_session(term)
+    return html
+
+def fetch_terms(terms: list[str], max_workers: int = 4, cancel=None,
+                screen: Optional[Callable[[], tuple[int, int]]] = None) -> dict[str, list[dict]]:
+    """Return PlannedCourses for several terms using a single login.
+
+    The first page's result payload usually carries every term, so other
+    pages are only fetched (concurrently, over the same cookie session) for
+    terms it doesn't include. Setting cancel (a threading.Event) abandons a
+    pending browser login; screen sizes its window (see screen_size).
+    """
+    if not terms:
+        raise ValueError("Enter at least one term code, e.g. F25")
+    sess, html = open_session(terms[0], cancel, screen)
+    planned = extract_terms(html, terms)
+
+    missing = [t for t in terms if t not in planned]
+    if missing:
+        def fetch(term):
+            page = _fetch_with_session(sess, PRINT_SCHEDULE_URL.format(term=term))
+            if page is None:
+                raise RuntimeError(f"Schedule page for {term} rejected the session")
+            return extract_terms(page, [term])
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(missing))) as pool:
+            for found in pool.map(fetch, missing):
+                planned.update(found)
+
+    not_found = [t for t in terms if t not in planned]
+    if not_found:
+        raise RuntimeError(f"No schedule found for term(s): {', '.join(not_found)}")
+    # Keep the caller's term order
+    return {t: planned[t] for t in terms}
+
+def _scan_result(page) -> Optional[dict]:
+    """Find `var result = {...}` by scanning the raw page and decode it in place.
+
+    Works on str or bytes without building a DOM. raw_decode stops at the end
+    of the JSON object, so nested payloads are never cut short.
+    """
+    marker = RESULT_MARKER_BYTES if isinstance(page, (bytes, bytearray)) else RESULT_MARKER
+    for m in marker.finditer(page):
+        if isinstance(page, (bytes, bytearray)):
+            # Only decode from the marker onward, not the markup before it
+            text, start = page[m.end():].decode('utf-8', errors='replace'), 0
+        else:
+            text, start = page, m.end()
+        try:
+            data, _ = _DECODER.raw_decode(text, start)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(data, dict) and "Terms" in data:
+            return data
+    return None
+
+def _soup_result(html: str) -> dict:
+    """Slow fallback: locate the result script with BeautifulSoup."""
+    from bs4 import BeautifulSoup
+
+    if isinstance(html, (bytes, bytearray)):
+        html = html.decode('utf-8', errors='replace')
+
     # Load into BeautifulSoup for script tag extraction
     soup = BeautifulSoup(html, 'html.parser')
 
@@ -83,159 +322,115 @@ def extract_courses(html: str, term: str) -> list[dict]:
         raise RuntimeError("Could not extract JS object")
     
     # Parse via json
-    data = json.loads(m.group(1))
+    return json.loads(m.group(1))
 
-    # Navigate to Terms array and select correct terms for PlannedCourses
-    terms = data["Terms"]
-    planned = next(
-        t["PlannedCourses"] for t in terms 
-            if t["Code"] == term
-        )
-    return planned
+def extract_result(html) -> dict:
+    """Return the page's embedded `result` object, html may also be the object itself from a streamed fetch."""
+    with tracing.span('parse.extract', bytes=len(html)) as sp:
+        if html[:1] in (b'{', '{'):
+            return json.loads(html)
+        data = _scan_result(html)
+        if data is None:
+            sp.set(fallback='soup')
+            data = _soup_result(html)
+    return data
+
+def extract_terms(html, terms: list[str]) -> dict[str, list[dict]]:
+    """Return PlannedCourses for every requested term found in the page, parsing it once."""
+    wanted = set(terms)
+    return {
+        t["Code"]: t["PlannedCourses"]
+        for t in extract_result(html)["Terms"]
+        if t["Code"] in wanted
+    }
+
+def extract_courses(html, term: str) -> list[dict]:
+    planned = extract_terms(html, [term])
+    if term not in planned:
+        raise RuntimeError(f"No schedule found for term {term}")
+    return planned[term]
         
-def sorted_courses(raw: list[dict]) -> list[dict]:        
+def sorted_courses(raw: list[dict]) -> list[Meeting]:        
+    with tracing.span('parse.normalize', courses=len(raw)) as sp:
+        output = _sorted_courses(raw)
+        sp.set(meetings=len(output))
+    return output
+
+def _sorted_courses(raw: list[dict]) -> list[Meeting]:
     output = []
 
     for entry in raw:
         # Metadata under section
         sec = entry.get("Section", {})
         
-        # Shared course fields
-        base = {
-            "CourseName":     sec.get("CourseName"),
-            "SectionNumber":  sec.get("Number"),
-            "Credits":        sec.get("MinimumCredits"),
-            "Instructors":    sec.get("Faculty", [])
-        }
+        # Shared course fields, referenced (not copied) by every meeting
+        section = Section(
+            course_name=sec.get("CourseName"),
+            number=sec.get("Number"),
+            credits=sec.get("MinimumCredits"),
+            instructors=sec.get("Faculty", []),
+        )
         
         # Create a row per meeting
         for meeting in sec.get("PlannedMeetings", []):
             if not meeting.get("StartTime") or not meeting.get("EndTime"):
                 continue
-            output.append({
-                **base,
-                "InstructionalMethod": meeting["InstructionalMethod"],
-                "StartTime":           meeting["StartTime"],
-                "EndTime":             meeting["EndTime"],
-                "FormattedTime":       meeting["FormattedTime"],
-                "DaysOfWeek":          meeting["DaysOfWeek"],
-                "Location":            meeting["MeetingLocation"].strip(),
-                "StartDate":           meeting["StartDateString"],
-                "EndDate":             meeting["EndDateString"],
-            })
+            output.append(Meeting(
+                section=section,
+                method=meeting["InstructionalMethod"],
+                start_time=meeting["StartTime"],
+                end_time=meeting["EndTime"],
+                formatted_time=meeting.get("FormattedTime"),
+                days=meeting.get("DaysOfWeek", ""),
+                location=(meeting.get("MeetingLocation") or "").strip(),
+                start_date=meeting["StartDateString"],
+                end_date=meeting["EndDateString"],
+            ))
     return output
 
-from datetime import datetime, timedelta, timezone
-import uuid
+def generate_ics(events: list[Event], output_file):
+    """Stream events as an RFC 5545 calendar to a path or an open file-like object."""
+    with tracing.span('ics.write', events=len(events)):
+        if hasattr(output_file, "write"):
+            return write_ics(events, output_file)
+        # newline='' keeps the CRLF line endings intact on every platform
+        with open(output_file, "w", encoding="utf-8", newline="") as f:
+            return write_ics(events, f)
 
-def generate_ics(events: list[dict], output_file: str):
-    # Build cutoff_map from non-exam items: end_date − 2 weeks
-    cutoff_map = {}
-    for ev in events:
-        if ev['InstructionalMethod'] == 'EXAM':
-            continue
-        key = (ev['CourseName'], ev['SectionNumber'])
-        # Parse non-exam EndDate
-        end_dt = datetime.strptime(ev['EndDate'], "%m/%d/%Y")
-        # Keep latest end date per course-section
-        if key not in cutoff_map or end_dt > cutoff_map[key]:
-            cutoff_map[key] = end_dt
-
-    # Subtract two weeks and set to 23:59:59
-    for key, end_dt in cutoff_map.items():
-        cutoff_map[key] = (end_dt - timedelta(weeks=2)).replace(
-            hour=23, minute=59, second=59
-        )
+def export_terms(planned: dict[str, list[dict]], output_dir: str = "../res", combined: bool = True) -> list[str]:
+    """Write one combined Schedule.ics, or one Schedule_<term>.ics per term. Returns the paths written."""
+    events = {term: build_events(sorted_courses(courses), term=term) for term, courses in planned.items()}
+    if combined:
+        path = os.path.join(output_dir, "Schedule.ics")
+        generate_ics([ev for term_events in events.values() for ev in term_events], path)
+        return [path]
 
-    # 2) VCALENDAR header
-    cal = [
-        "BEGIN:VCALENDAR",
-        "VERSION:2.0",
-        "CALSCALE:GREGORIAN",
-        "PRODID:-//Danial Changez//Guelph Student Schedule Exporter v1.0//EN",
-    ]
-
-    # 3) Build each VEVENT
-    for ev in events:
-        # Skip online/no-time rows
-        if not ev['StartTime'] or not ev['EndTime']:
-            continue
-
-        # Parse the event’s start/end
-        start_dt = datetime.strptime(
-            f"{ev['StartDate']} {ev['StartTime']}", "%m/%d/%Y %I:%M %p"
-        )
-        end_dt = datetime.strptime(
-            f"{ev['StartDate']} {ev['EndTime']}", "%m/%d/%Y %I:%M %p"
-        )
-
-        # Build BYDAY rule
-        dow = ev['DaysOfWeek']
-        days = []
-        if 'Th' in dow:
-            days.append('TH')
-            dow = dow.replace('Th', '')
-        for ch, code in {'M':'MO','T':'TU','W':'WE','F':'FR'}.items():
-            if ch in dow:
-                days.append(code)
-        byday_str = ','.join(days)
-
-        # Choose UNTIL: two-week cutoff for non-exam, otherwise fallback to term end
-        key = (ev['CourseName'], ev['SectionNumber'])
-        if ev['InstructionalMethod'] != 'EXAM' and key in cutoff_map:
-            until_dt = cutoff_map[key]
-        else:
-            # Fallback to original EndDate at 23:59:59
-            until_dt = datetime.strptime(ev['EndDate'], "%m/%d/%Y")
-            until_dt = until_dt.replace(hour=23, minute=59, second=59)
-
-        # DESCRIPTION
-        desc = (
-            f"Instructor(s): {' | '.join(ev['Instructors'])}\\n"
-            f"Credits: {ev['Credits']}"
-        )
-
-        # Append the VEVENT
-        cal += [
-            "BEGIN:VEVENT",
-            f"UID:{uuid.uuid4().hex}@schedule",
-            f"DTSTAMP:{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}",
-            f"DTSTART:{start_dt.strftime('%Y%m%dT%H%M%S')}",
-            f"DTEND:{end_dt.strftime('%Y%m%dT%H%M%S')}",
-            f"RRULE:FREQ=WEEKLY;BYDAY={byday_str};UNTIL={until_dt.strftime('%Y%m%dT%H%M%S')}",
-            f"SUMMARY:{ev['InstructionalMethod']} {ev['CourseName']}*{ev['SectionNumber']}",
-            f"DESCRIPTION:{desc}",
-            f"LOCATION:{ev['Location']}",
-            "END:VEVENT",
-            "",
-        ]
-
-    # Close VCALENDAR
-    if cal and cal[-1] == "":
-        cal.pop()
-    cal.append("END:VCALENDAR")
-
-    # Write to file
-    with open(output_file, "w", encoding="utf-8") as f:
-        f.write("\n".join(cal))
+    paths = []
+    for term, term_events in events.items():
+        path = os.path.join(output_dir, f"Schedule_{term}.ics")
+        generate_ics(term_events, path)
+        paths.append(path)
+    return paths
 
 def main():
+    parser = argparse.ArgumentParser(description="Export UofG schedules to ICS")
+    parser.add_argument("terms", nargs="*", default=["W24"], help="term codes, e.g. W24 S24 F24")
+    parser.add_argument("--split", action="store_true", help="write one ICS per term")
+    args = parser.parse_args()
+
+    tracing.configure_from_env()
     start_time = time.perf_counter()
-    term = "W24"
-    
-    # Fetch the schedule page HTML (handles login/MFA)
-    html = fetch_page_info(term)
-    
-    # Extract the raw list of course dicts
-    courses = extract_courses(html, term)
-    sorted_results = sorted_courses(courses)
+    terms = [t.upper() for t in args.terms]
     
-    ics_path = "../res/Schedule.ics"
-    generate_ics(sorted_results, ics_path)
+    # Fetch every term with one login (handles login/MFA)
+    planned = fetch_terms(terms, screen=screen_size)
+    paths = export_terms(planned, combined=not args.split)
     
     end_time = time.perf_counter()
     execution_time = end_time - start_time
-    print(f"Wrote {len(courses)} courses to {ics_path} in {execution_time:.2f} seconds")
+    courses = sum(len(c) for c in planned.values())
+    print(f"Wrote {courses} courses to {', '.join(paths)} in {execution_time:.2f} seconds")
+    tracing.export_from_env()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,57 @@
+import queue
+import threading
+
+# Pipeline stages in order, with the share of the progress bar each one ends at.
+# Importing fills the rest of the bar as providers report events.
+STAGES = {
+    'Signing in': 0.25,
+    'Parsing': 0.35,
+    'Writing ICS': 0.45,
+    'Importing': 1.0,
+}
+
+class Cancelled(Exception):
+    """Raised inside a worker when the user cancels the run."""
+
+class ProgressChannel:
+    """One-way channel from worker threads to the Tk main loop.
+
+    Workers only put messages on the queue and poll the cancel flag; the GUI
+    thread drains the queue with after(), so Tk widgets are never touched off
+    the main thread.
+    """
+
+    def __init__(self):
+        self.messages = queue.SimpleQueue()
+        self.cancel_event = threading.Event()
+
+    # Worker side
+    def stage(self, name: str, detail: str = ''):
+        self.messages.put(('stage', name, detail))
+
+    def provider(self, name: str, done: int, total: int):
+        self.messages.put(('provider', name, done, total))
+
+    def finish(self, message: str):
+        self.messages.put(('done', message))
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def check(self):
+        """Raise Cancelled between stages once the user has pressed Cancel."""
+        if self.cancel_event.is_set():
+            raise Cancelled("Cancelled")
+
+    # GUI side
+    def cancel(self):
+        self.cancel_event.set()
+
+    def drain(self):
+        """Yield every message queued so far without blocking."""
+        while True:
+            try:
+                yield self.messages.get_nowait()
+            except queue.Empty:
+                return
@@ -0,0 +1,72 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+import tracing
+
+def _skipped(events, account, calendar_id) -> dict:
+    """Result of a sync that was skipped because the calendar already holds these events."""
+    return {'inserted': 0, 'patched': 0, 'deleted': 0, 'unchanged': len(events), 'failed': [], 'requests': 0,
+            'skipped': True, 'account': account, 'calendar_id': calendar_id}
+
+# Provider modules pull in googleapiclient and msal, only import the ones a run uses
+def google_job(events, max_in_flight=None, cancel=None, unchanged=None):
+    """Return a job that signs in to Google and syncs events into the schedule calendar.
+
+    unchanged(account, calendar_id) returning True skips the sync once the account and calendar are known.
+    """
+    def run(progress):
+        import google_calendar
+        with tracing.span('google.auth'):
+            service = google_calendar.authenticate_google()
+            calendar_id = google_calendar.get_or_create_calendar(service)
+            account = google_calendar._account_key(service)
+        if unchanged is not None and unchanged(account, calendar_id):
+            return _skipped(events, account, calendar_id)
+        with tracing.span('google.sync', events=len(events)):
+            result = google_calendar.sync_events_to_calendar(
+                service, calendar_id, events, max_in_flight=max_in_flight or google_calendar.MAX_IN_FLIGHT,
+                progress=progress, cancel=cancel)
+        return dict(result, account=account, calendar_id=calendar_id)
+    return run
+
+def outlook_job(events, max_in_flight=None, cancel=None, unchanged=None):
+    """Return a job that signs in to Microsoft and syncs events into the schedule calendar.
+
+    unchanged(account, calendar_id) returning True skips the sync once the account and calendar are known.
+    """
+    def run(progress):
+        import outlook_calendar
+        with tracing.span('outlook.auth'):
+            token = outlook_calendar.authenticate_outlook(cancel)
+            calendar_id = outlook_calendar.get_or_create_outlook_calendar(token)
+            account = outlook_calendar._account_key()
+        if unchanged is not None and unchanged(account, calendar_id):
+            return _skipped(events, account, calendar_id)
+        with tracing.span('outlook.sync', events=len(events)):
+            result = outlook_calendar.sync_events_to_outlook(
+                token, calendar_id, events, max_in_flight=max_in_flight or outlook_calendar.MAX_IN_FLIGHT,
+                progress=progress, cancel=cancel)
+        return dict(result, account=account, calendar_id=calendar_id)
+    return run
+
+def run_providers(jobs, progress=None):
+    """Run provider jobs side by side so the total time tends to the slowest one, not the sum.
+
+    jobs maps a provider name to a callable taking progress(done, total).
+    progress(name, done, total) is called from the worker threads as events
+    land. A provider that raises is reported in its own entry and never
+    cancels the others. Returns {name: {'ok', 'result', 'error', 'seconds'}}.
+    """
+    def run(name, job):
+        start = time.perf_counter()
+        report = (lambda done, total: progress(name, done, total)) if progress else None
+        try:
+            result = job(report)
+            return {'ok': True, 'result': result, 'error': None, 'seconds': time.perf_counter() - start}
+        except Exception as e:
+            return {'ok': False, 'result': None, 'error': str(e), 'seconds': time.perf_counter() - start}
+
+    if not jobs:
+        return {}
+    with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+        futures = {name: pool.submit(run, name, job) for name, job in jobs.items()}
+        return {name: future.result() for name, future in futures.items()}
@@ -0,0 +1,213 @@
+"""Content-addressed cache of generated calendars and provider imports.
+
+A run is keyed by a hash of its normalized meetings (per term, in order) and
+GENERATOR_VERSION, so an unchanged schedule maps to the same key. Each entry
+keeps the ICS bytes and, per provider and signed-in account, the calendar ID
+and fingerprint of the last clean import, letting a repeat run skip both
+generate_ics and the sync into the same calendar.
+
+Usage:
+    python result_cache.py list
+    python result_cache.py invalidate [TERM ...]   # every entry when no term is given
+"""
+import argparse
+import hashlib
+import io
+import json
+import os
+import time
+from typing import Optional
+from ics_writer import write_ics
+from session_cache import file_lock
+import tracing
+
+CACHE_DIR = '../res/cache'
+
+# Bump whenever events or ICS output change for the same input, so old entries stop matching
+GENERATOR_VERSION = 2
+
+# Least recently used entries are evicted past either bound
+MAX_ENTRIES = 64
+MAX_CACHE_BYTES = 32 * 1024 * 1024
+
+def _meeting_row(m) -> list:
+    sec = m.section
+    return [sec.course_name, sec.number, sec.credits, sec.instructors, m.method, m.start_time, m.end_time,
+            m.days, m.location, m.start_date, m.end_date]
+
+def term_key(term: str, meetings: list) -> str:
+    """Hash of one term's normalized meetings (sorted_courses output)."""
+    digest = hashlib.sha256(f"{GENERATOR_VERSION}\0{term}\0".encode('utf-8'))
+    digest.update(json.dumps([_meeting_row(m) for m in meetings], separators=(',', ':')).encode('utf-8'))
+    return digest.hexdigest()
+
+def content_key(meetings_by_term: dict) -> str:
+    """Key for a whole run; term order matters since it decides event order in the combined file."""
+    keys = [term_key(term, meetings) for term, meetings in meetings_by_term.items()]
+    return hashlib.sha256('\0'.join(keys).encode('utf-8')).hexdigest()
+
+class ResultCache:
+    """ICS blobs in CACHE_DIR/<key>.ics plus an index.json of terms, sizes, last use and provider imports."""
+
+    def __init__(self, directory: str = CACHE_DIR, max_entries: int = MAX_ENTRIES, max_bytes: int = MAX_CACHE_BYTES):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(directory, 'index.json')
+
+    # === INDEX ===
+    def _load(self) -> dict:
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self, index: dict):
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    def _update(self, fn):
+        """Apply fn(index) under the cache lock and write the index back."""
+        os.makedirs(self.directory, exist_ok=True)
+        with file_lock(self.index_path):
+            index = self._load()
+            result = fn(index)
+            self._evict(index)
+            self._save(index)
+        return result
+
+    def _blob(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.ics")
+
+    def _evict(self, index: dict):
+        by_age = sorted(index, key=lambda k: index[k].get('used', 0))
+        total = sum(entry.get('size', 0) for entry in index.values())
+        while by_age and (len(index) > self.max_entries or total > self.max_bytes):
+            key = by_age.pop(0)
+            total -= index.pop(key).get('size', 0)
+            try:
+                os.remove(self._blob(key))
+            except OSError:
+                pass
+
+    # === LOOKUPS ===
+    def entry(self, key: str) -> Optional[dict]:
+        """Return the entry for key and mark it recently used, or None."""
+        if not os.path.exists(self.index_path):
+            return None
+
+        def touch(index):
+            entry = index.get(key)
+            if entry is not None:
+                entry['used'] = time.time()
+            return entry
+        return self._update(touch)
+
+    def ics(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._blob(key), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def imported(self, key: str, provider: str, account: str, calendar_id: str) -> bool:
+        """True when the account's last clean import to provider was of exactly this content, into calendar_id."""
+        entry = self.entry(key)
+        record = (entry or {}).get('providers', {}).get(provider, {}).get(account, {})
+        return record.get('fingerprint') == key and record.get('calendar_id') == calendar_id
+
+    # === UPDATES ===
+    def put_ics(self, key: str, terms: list[str], data: bytes):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = self._blob(key) + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, self._blob(key))
+
+        def add(index):
+            entry = index.setdefault(key, {'providers': {}})
+            entry.update(terms=list(terms), size=len(data), used=time.time())
+        self._update(add)
+
+    def record_import(self, key: str, terms: list[str], provider: str, account: str, calendar_id: str):
+        def add(index):
+            entry = index.setdefault(key, {'providers': {}, 'size': 0})
+            entry.update(terms=list(terms), used=time.time())
+            # An import of this content supersedes the account's older imports to the same provider
+            for other in index.values():
+                other.get('providers', {}).get(provider, {}).pop(account, None)
+            entry['providers'].setdefault(provider, {})[account] = {
+                'calendar_id': calendar_id, 'fingerprint': key, 'at': time.time()}
+        self._update(add)
+
+    def invalidate(self, terms: Optional[list[str]] = None) -> int:
+        """Drop every entry (or those covering any of terms). Returns the number removed."""
+        if not os.path.exists(self.index_path):
+            return 0
+        wanted = {t.upper() for t in terms} if terms else None
+
+        def drop(index):
+            keys = [k for k, e in index.items() if wanted is None or wanted & set(e.get('terms', []))]
+            for key in keys:
+                del index[key]
+                try:
+                    os.remove(self._blob(key))
+                except OSError:
+                    pass
+            return len(keys)
+        return self._update(drop)
+
+    def entries(self) -> dict:
+        return self._load()
+
+def export_ics(cache: ResultCache, key: str, terms: list[str], events: list, output_path: str) -> bool:
+    """Write output_path, generating the calendar only when key isn't cached. Returns True on a cache hit."""
+    data = cache.ics(key)
+    hit = data is not None
+    if not hit:
+        with tracing.span('ics.write', events=len(events)):
+            buf = io.BytesIO()
+            write_ics(events, buf)
+            data = buf.getvalue()
+        cache.put_ics(key, terms, data)
+    else:
+        cache.entry(key)
+        # Nothing to do if the file on disk is already this calendar
+        try:
+            if os.path.getsize(output_path) == len(data):
+                with open(output_path, 'rb') as f:
+                    if f.read() == data:
+                        return True
+        except OSError:
+            pass
+
+    with open(output_path, 'wb') as f:
+        f.write(data)
+    return hit
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or clear the schedule result cache")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="show cached entries, most recent first")
+    invalidate = sub.add_parser("invalidate", help="drop cached entries so the next run regenerates and re-imports")
+    invalidate.add_argument("terms", nargs="*", help="only entries covering these terms")
+    args = parser.parse_args()
+
+    cache = ResultCache()
+    if args.command == "invalidate":
+        removed = cache.invalidate(args.terms)
+        print(f"✅ Removed {removed} cached result(s)")
+        return
+
+    entries = cache.entries()
+    for key, entry in sorted(entries.items(), key=lambda kv: kv[1].get('used', 0), reverse=True):
+        providers = ', '.join(name for name, accounts in entry.get('providers', {}).items() if accounts) or 'none'
+        print(f"{key[:12]}  {','.join(entry.get('terms', [])):<12} {entry.get('size', 0):>8} bytes  imported: {providers}")
+    if not entries:
+        print("Cache is empty")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+import heapq
+import itertools
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Optional
+from progress import Cancelled
+import tracing
+
+# Retry delays grow as BACKOFF_BASE * 2**attempt (with full jitter), capped at BACKOFF_CAP seconds
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 60.0
+# Throttled items keep being retried until this long after the run started
+MAX_THROTTLE_WAIT = 600.0
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None,
+                  base: float = BACKOFF_BASE, cap: float = BACKOFF_CAP) -> float:
+    """Seconds to wait before retry number attempt: full jitter, but never less than Retry-After."""
+    delay = random.uniform(0, min(cap, base * 2 ** attempt))
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+class TokenBucket:
+    """Allow `rate` units per second on average, with bursts of up to `capacity`. rate=None disables it."""
+
+    def __init__(self, rate: Optional[float], capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or rate or 0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, units: float = 1, cancel=None) -> bool:
+        """Block until units can be spent, returning False if cancel is set first.
+
+        Requests larger than the bucket wait for a full bucket.
+        """
+        if self.rate is None:
+            return True
+        units = min(units, self.capacity)
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= units:
+                    self.tokens -= units
+                    return True
+                shortfall = (units - self.tokens) / self.rate
+            if cancel is None:
+                time.sleep(shortfall)
+            elif cancel.wait(shortfall):
+                return False
+
+    def drain(self):
+        """Drop any saved-up burst, used when the provider starts throttling."""
+        if self.rate is None:
+            return
+        with self._lock:
+            self._refill()
+            self.tokens = 0
+
+class AdaptiveLimit:
+    """AIMD concurrency limit: halve on throttling (at most once per cooldown), creep back up on success."""
+
+    def __init__(self, limit: int, cooldown: float = 1.0):
+        self.max = max(1, limit)
+        self.value = float(self.max)
+        self.cooldown = cooldown
+        self._last_decrease = 0.0
+
+    def __int__(self):
+        return max(1, int(self.value))
+
+    def record(self, throttled: bool):
+        if throttled:
+            now = time.monotonic()
+            # One burst of 429s is one congestion signal, not one per response
+            if now - self._last_decrease >= self.cooldown:
+                self.value = max(1.0, self.value / 2)
+                self._last_decrease = now
+        else:
+            self.value = min(float(self.max), self.value + 1 / self.value)
+
+class RequestScheduler:
+    """Shared dispatcher for provider batch requests.
+
+    Work is a list of chunks (lists of call indices, one chunk per batch
+    request). send(chunk, attempt) performs the request and returns
+    (retry, retry_after, throttled): the indices worth sending again, the
+    provider's Retry-After in seconds (or None), and whether it was
+    throttling. Retried indices are re-queued after a jittered backoff
+    without holding up the other chunks. Server and transport errors get
+    max_attempts tries; throttled items are retried until max_throttle_wait
+    so large imports don't lose events to rate limiting.
+
+    Setting cancel (a threading.Event) stops new requests, backoff and rate-limit waits;
+    requests already in flight finish, then Cancelled is raised.
+    """
+
+    def __init__(self, name: str, max_in_flight: int, rate: Optional[float] = None, burst: Optional[float] = None,
+                 max_attempts: int = 3, max_throttle_wait: float = MAX_THROTTLE_WAIT,
+                 backoff_base: Optional[float] = None):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.limit = AdaptiveLimit(max_in_flight)
+        self.max_attempts = max_attempts
+        self.max_throttle_wait = max_throttle_wait
+        # Read at run time so callers (and benchmarks) can tune the module default
+        self.backoff_base = BACKOFF_BASE if backoff_base is None else backoff_base
+        self.stats = {'requests': 0, 'retries': 0, 'throttled': 0, 'gave_up': 0}
+
+    def run(self, chunks, send, cancel=None):
+        """Send every chunk, retrying as described above. Returns the stats dict."""
+        started = time.monotonic()
+        seq = itertools.count()
+        # (ready_at, seq, chunk, attempt)
+        queue = [(started, next(seq), chunk, 0) for chunk in chunks if chunk]
+        heapq.heapify(queue)
+        in_flight = {}
+
+        with ThreadPoolExecutor(max_workers=self.limit.max) as pool:
+            while queue or in_flight:
+                if cancel is not None and cancel.is_set():
+                    if not in_flight:
+                        break
+                    # Let the requests already sent land, but send nothing new
+                    wait(in_flight)
+                    for future in list(in_flight):
+                        in_flight.pop(future)
+                        future.result()
+                    break
+
+                now = time.monotonic()
+                while queue and queue[0][0] <= now and len(in_flight) < int(self.limit):
+                    ready_at, order, chunk, attempt = heapq.heappop(queue)
+                    # Rate limits count sub-requests, not envelopes
+                    if not self.bucket.acquire(len(chunk), cancel):
+                        heapq.heappush(queue, (ready_at, order, chunk, attempt))
+                        break
+                    in_flight[pool.submit(send, chunk, attempt)] = (chunk, attempt)
+                    self.stats['requests'] += 1
+
+                if not in_flight:
+                    delay = max(0.0, queue[0][0] - time.monotonic())
+                    if cancel is not None:
+                        cancel.wait(delay)
+                    else:
+                        time.sleep(delay)
+                    continue
+
+                timeout = max(0.0, queue[0][0] - time.monotonic()) if queue and len(in_flight) < int(self.limit) else None
+                done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    chunk, attempt = in_flight.pop(future)
+                    retry, retry_after, throttled = future.result()
+                    self.limit.record(throttled)
+                    if throttled:
+                        self.stats['throttled'] += 1
+                        self.bucket.drain()
+                    if not retry:
+                        continue
+
+                    elapsed = time.monotonic() - started
+                    if (throttled and elapsed < self.max_throttle_wait) or attempt + 1 < self.max_attempts:
+                        delay = backoff_delay(attempt, retry_after, base=self.backoff_base)
+                        heapq.heappush(queue, (time.monotonic() + delay, next(seq), retry, attempt + 1))
+                        self.stats['retries'] += len(retry)
+                    else:
+                        self.stats['gave_up'] += len(retry)
+
+        for key, value in self.stats.items():
+            tracing.count(f"{self.name}.{key}", value)
+        if queue:
+            unsent = sum(len(item[2]) for item in queue)
+            raise Cancelled(f"Cancelled with {unsent} call(s) not sent")
+        return self.stats
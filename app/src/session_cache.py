@@ -0,0 +1,146 @@
+import os
+import json
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+# Encrypted cookies from the last successful login, plus the resolved chromedriver path
+COOKIE_PATH = '../res/session_cookies.bin'
+DRIVER_PATH_FILE = '../res/chromedriver_path.txt'
+KEY_PATH = os.path.join(os.path.expanduser('~'), '.uofg_schedule_key')
+
+# WebAdvisor sessions don't outlive a working day, don't bother replaying older cookies
+MAX_COOKIE_AGE = 12 * 60 * 60
+
+def _fernet():
+    """Return a Fernet for the per-user key, or None if cryptography isn't installed."""
+    try:
+        from cryptography.fernet import Fernet
+    except ImportError:
+        return None
+
+    if not os.path.exists(KEY_PATH):
+        # Only the current user may read the key
+        fd = os.open(KEY_PATH, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(Fernet.generate_key())
+    with open(KEY_PATH, 'rb') as f:
+        return Fernet(f.read())
+
+# === COOKIES ===
+def load_cookies() -> Optional[list[dict]]:
+    """Return cached session cookies, or None when missing, expired or unreadable."""
+    fernet = _fernet()
+    if fernet is None or not os.path.exists(COOKIE_PATH):
+        return None
+
+    from cryptography.fernet import InvalidToken
+    with open(COOKIE_PATH, 'rb') as f:
+        token = f.read()
+    try:
+        return json.loads(fernet.decrypt(token, ttl=MAX_COOKIE_AGE))
+    except (InvalidToken, ValueError):
+        return None
+
+def save_cookies(cookies: list[dict]):
+    """Encrypt and store the cookies from a successful login (skipped without cryptography)."""
+    fernet = _fernet()
+    if fernet is None:
+        return
+    keep = [{k: ck[k] for k in ('name', 'value', 'domain', 'path') if k in ck} for ck in cookies]
+    with open(COOKIE_PATH, 'wb') as f:
+        f.write(fernet.encrypt(json.dumps(keep).encode('utf-8')))
+
+def clear_cookies():
+    if os.path.exists(COOKIE_PATH):
+        os.remove(COOKIE_PATH)
+
+# === FILE LOCK ===
+@contextmanager
+def file_lock(path: str, timeout: float = 10.0, stale: float = 60.0):
+    """Hold path + '.lock' so concurrent runs don't read a half-written cache file."""
+    lock_path = path + '.lock'
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            fd = os.open(lock_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            break
+        except FileExistsError:
+            try:
+                # A run that crashed while holding the lock leaves it behind
+                if time.time() - os.path.getmtime(lock_path) > stale:
+                    os.remove(lock_path)
+                    continue
+            except OSError:
+                continue
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Timed out waiting for {lock_path}")
+            time.sleep(0.05)
+    os.close(fd)
+    try:
+        yield
+    finally:
+        try:
+            os.remove(lock_path)
+        except OSError:
+            pass
+
+# === MSAL TOKEN CACHE ===
+def load_token_cache(path: str):
+    """Return an msal.SerializableTokenCache filled from path (empty if missing or unreadable)."""
+    import msal
+
+    cache = msal.SerializableTokenCache()
+    if not os.path.exists(path):
+        return cache
+
+    with file_lock(path):
+        with open(path, 'rb') as f:
+            data = f.read()
+    fernet = _fernet()
+    if fernet is not None:
+        from cryptography.fernet import InvalidToken
+        try:
+            data = fernet.decrypt(data)
+        except InvalidToken:
+            # Written before cryptography was installed, read it as plain JSON
+            pass
+    try:
+        cache.deserialize(data.decode('utf-8'))
+    except ValueError:
+        # Corrupt cache, fall back to an interactive sign-in
+        pass
+    return cache
+
+def save_token_cache(cache, path: str):
+    """Write the cache back only if MSAL changed it (new or refreshed tokens)."""
+    if not cache.has_state_changed:
+        return
+    data = cache.serialize().encode('utf-8')
+    fernet = _fernet()
+    if fernet is not None:
+        data = fernet.encrypt(data)
+
+    with file_lock(path):
+        # Replace atomically so a crash never leaves a truncated cache
+        tmp_path = path + '.tmp'
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    cache.has_state_changed = False
+
+# === CHROMEDRIVER ===
+def chromedriver_path(refresh: bool = False) -> str:
+    """Return the chromedriver path, resolving it with webdriver_manager only when not cached."""
+    if not refresh and os.path.exists(DRIVER_PATH_FILE):
+        with open(DRIVER_PATH_FILE, 'r', encoding='utf-8') as f:
+            path = f.read().strip()
+        if path and os.path.exists(path):
+            return path
+
+    from webdriver_manager.chrome import ChromeDriverManager
+    path = ChromeDriverManager().install()
+    with open(DRIVER_PATH_FILE, 'w', encoding='utf-8') as f:
+        f.write(path)
+    return path
@@ -0,0 +1,114 @@
+"""University of Guelph term calendar: study breaks and the exam window.
+
+A term's table is computed once from its first and last class day and kept
+(lru_cache) for every meeting that follows. Excluded dates are stored per
+weekday, so an event's EXDATEs are a lookup by BYDAY instead of walking each
+break day by day.
+
+- Fall Study Break: Saturday before Thanksgiving (2nd Monday of October) through Tuesday
+- Winter Reading Week: Monday to Friday of the Family Day week (3rd Monday of February)
+- Exam period: the last 14 days of the term, excluded for regular classes only
+
+Usage: python term_calendar.py 9/4/2025 12/12/2025 [--term F25]
+"""
+import argparse
+import json
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Optional
+from meetings import parse_date
+
+EXAM_DAYS = 14
+WEEKDAY_CODES = {'MO': 0, 'TU': 1, 'WE': 2, 'TH': 3, 'FR': 4, 'SA': 5, 'SU': 6}
+
+def nth_weekday(year: int, month: int, weekday: int, n: int) -> date:
+    """Return the nth weekday (Monday = 0) of a month."""
+    first = date(year, month, 1)
+    return first + timedelta(days=(weekday - first.weekday()) % 7 + (n - 1) * 7)
+
+def _days(start: date, end: date, name: str) -> dict[date, str]:
+    return {start + timedelta(days=i): name for i in range((end - start).days + 1)}
+
+@lru_cache(maxsize=None)
+def academic_breaks(fall_year: int) -> dict[date, str]:
+    """Fall study break and winter reading week days of the academic year starting in fall_year."""
+    thanksgiving = nth_weekday(fall_year, 10, 0, 2)
+    family_day = nth_weekday(fall_year + 1, 2, 0, 3)
+    return {
+        **_days(thanksgiving - timedelta(days=2), thanksgiving + timedelta(days=1), 'Fall Study Break'),
+        **_days(family_day, family_day + timedelta(days=4), 'Winter Reading Week'),
+    }
+
+def _fall_year(day: date) -> int:
+    # August onward belongs to the academic year starting that fall
+    return day.year if day.month >= 8 else day.year - 1
+
+def _by_weekday(days) -> tuple[tuple[date, ...], ...]:
+    table = [[] for _ in range(7)]
+    for day in sorted(days):
+        table[day.weekday()].append(day)
+    return tuple(tuple(column) for column in table)
+
+@dataclass(frozen=True)
+class TermCalendar:
+    """Breaks and exam window of one term, indexed by weekday."""
+    term: Optional[str]
+    start: date
+    end: date
+    breaks: dict[date, str]
+    exam_start: date
+    _classes: tuple = field(init=False, repr=False, compare=False)
+    _exams: tuple = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        exam_days = _days(self.exam_start, self.end, 'Exam Period')
+        object.__setattr__(self, '_classes', _by_weekday({**exam_days, **self.breaks}))
+        object.__setattr__(self, '_exams', _by_weekday(self.breaks))
+
+    def exdates(self, first: date, last: date, byday: list[str], exam: bool = False) -> list[date]:
+        """Excluded days between first and last (inclusive) that fall on one of the BYDAY codes."""
+        table = self._exams if exam else self._classes
+        days = []
+        for code in byday:
+            column = table[WEEKDAY_CODES[code]]
+            days += column[bisect_left(column, first):bisect_right(column, last)]
+        return sorted(days)
+
+    def to_dict(self) -> dict:
+        return {
+            'term': self.term,
+            'start': self.start.isoformat(),
+            'end': self.end.isoformat(),
+            'breaks': {day.isoformat(): name for day, name in sorted(self.breaks.items())},
+            'exam_start': self.exam_start.isoformat(),
+        }
+
+@lru_cache(maxsize=256)
+def term_calendar(start: date, end: date, term: str = None) -> TermCalendar:
+    """Return the (cached) calendar of a term running from start to end, exams included."""
+    breaks = {}
+    for fall_year in range(_fall_year(start), _fall_year(end) + 1):
+        breaks.update({day: name for day, name in academic_breaks(fall_year).items() if start <= day <= end})
+    return TermCalendar(term, start, end, breaks, end - timedelta(days=EXAM_DAYS - 1))
+
+def calendar_for_meetings(meetings: list, term: str = None) -> Optional[TermCalendar]:
+    """Calendar spanning a term's meetings; the term ends with its last regular class day."""
+    if not meetings:
+        return None
+    classes = [m for m in meetings if m.method != 'EXAM'] or meetings
+    start = min(parse_date(m.start_date) for m in meetings)
+    return term_calendar(start, max(m.last_day for m in classes), term)
+
+def main():
+    parser = argparse.ArgumentParser(description="Print a term's breaks and exam window as JSON")
+    parser.add_argument("start", help="first day of the term, e.g. 9/4/2025")
+    parser.add_argument("end", help="last day of the term, e.g. 12/12/2025")
+    parser.add_argument("--term", help="term code, e.g. F25")
+    args = parser.parse_args()
+    calendar = term_calendar(parse_date(args.start), parse_date(args.end), args.term)
+    print(json.dumps(calendar.to_dict(), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+
+# Set SCHEDULE_TRACE to a path to record a JSON trace of a run, and
+# SCHEDULE_CHROME_TRACE for a file chrome://tracing / Perfetto can open.
+TRACE_ENV = 'SCHEDULE_TRACE'
+CHROME_TRACE_ENV = 'SCHEDULE_CHROME_TRACE'
+
+# Latency histogram bucket upper bounds, in milliseconds
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000, 60000)
+
+# Only the most recent spans are kept, so a long-running process (daemon.py) stays bounded
+MAX_SPANS = 50000
+
+_enabled = False
+_lock = threading.Lock()
+_origin = time.perf_counter()
+_spans = deque(maxlen=MAX_SPANS)
+_spans_recorded = 0
+_counters = {}
+_histograms = {}
+
+class _NoopSpan:
+    """Returned by span() while tracing is off, so disabled tracing costs one global check."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+_NOOP = _NoopSpan()
+
+class _Span:
+    __slots__ = ('name', 'attrs', 'start')
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        global _spans_recorded
+        duration = time.perf_counter() - self.start
+        if exc_type is not None:
+            self.attrs['error'] = exc_type.__name__
+        with _lock:
+            _spans_recorded += 1
+            _spans.append((self.name, self.start - _origin, duration, threading.get_ident(), self.attrs))
+        return False
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+def enable():
+    global _enabled
+    _enabled = True
+
+def disable():
+    global _enabled
+    _enabled = False
+
+def enabled() -> bool:
+    return _enabled
+
+def reset():
+    global _origin, _spans_recorded
+    with _lock:
+        _origin = time.perf_counter()
+        _spans_recorded = 0
+        _spans.clear()
+        _counters.clear()
+        _histograms.clear()
+
+def span(name: str, **attrs):
+    """Context manager timing a pipeline stage, e.g. `with span('ics.write', events=n):`."""
+    if not _enabled:
+        return _NOOP
+    return _Span(name, attrs)
+
+def count(name: str, value: int = 1):
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+def observe(name: str, seconds: float):
+    """Record one latency sample (e.g. a single provider request) in a histogram."""
+    if not _enabled:
+        return
+    ms = seconds * 1000
+    with _lock:
+        hist = _histograms.get(name)
+        if hist is None:
+            hist = _histograms[name] = {'count': 0, 'sum_ms': 0.0, 'min_ms': ms, 'max_ms': ms,
+                                        'buckets': [0] * (len(BUCKETS_MS) + 1)}
+        hist['count'] += 1
+        hist['sum_ms'] += ms
+        hist['min_ms'] = min(hist['min_ms'], ms)
+        hist['max_ms'] = max(hist['max_ms'], ms)
+        hist['buckets'][bisect_left(BUCKETS_MS, ms)] += 1
+
+def _percentile(hist, q):
+    """Upper bucket bound containing the q-th quantile (approximate, like Prometheus)."""
+    target = q * hist['count']
+    seen = 0
+    for bound, n in zip(BUCKETS_MS + (hist['max_ms'],), hist['buckets']):
+        seen += n
+        if seen >= target:
+            return min(bound, hist['max_ms'])
+    return hist['max_ms']
+
+def snapshot() -> dict:
+    with _lock:
+        spans = list(_spans)
+        dropped = _spans_recorded - len(spans)
+        counters = dict(_counters)
+        histograms = {k: dict(v, buckets=list(v['buckets'])) for k, v in _histograms.items()}
+
+    for hist in histograms.values():
+        hist['mean_ms'] = hist['sum_ms'] / hist['count']
+        for q in (0.5, 0.9, 0.99):
+            hist[f"p{int(q * 100)}_ms"] = _percentile(hist, q)
+        hist['bucket_bounds_ms'] = list(BUCKETS_MS) + ['inf']
+
+    return {
+        'spans': [
+            {'name': name, 'start_s': round(start, 6), 'duration_s': round(duration, 6), 'thread': tid, **({'attrs': attrs} if attrs else {})}
+            for name, start, duration, tid, attrs in sorted(spans, key=lambda s: s[1])
+        ],
+        'spans_dropped': dropped,
+        'counters': counters,
+        'histograms': histograms,
+    }
+
+def export_json(path: str):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(snapshot(), f, indent=2)
+
+def export_chrome_trace(path: str):
+    """Write spans as complete ("X") events and counters as "C" events in Chrome trace format."""
+    data = snapshot()
+    pid = os.getpid()
+    events = [
+        {'name': s['name'], 'ph': 'X', 'pid': pid, 'tid': s['thread'],
+         'ts': s['start_s'] * 1e6, 'dur': s['duration_s'] * 1e6, 'args': s.get('attrs', {})}
+        for s in data['spans']
+    ]
+    end = max((e['ts'] + e['dur'] for e in events), default=0)
+    events += [
+        {'name': name, 'ph': 'C', 'pid': pid, 'tid': 0, 'ts': end, 'args': {name: value}}
+        for name, value in data['counters'].items()
+    ]
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+def configure_from_env() -> bool:
+    """Turn tracing on when SCHEDULE_TRACE or SCHEDULE_CHROME_TRACE is set. Returns whether it is on."""
+    if os.environ.get(TRACE_ENV) or os.environ.get(CHROME_TRACE_ENV):
+        reset()
+        enable()
+    return _enabled
+
+def export_from_env():
+    if os.environ.get(TRACE_ENV):
+        export_json(os.environ[TRACE_ENV])
+    if os.environ.get(CHROME_TRACE_ENV):
+        export_chrome_trace(os.environ[CHROME_TRACE_ENV])
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Tests import the app modules and bench fakes the same way the bench scripts do
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'src'))
+sys.path.insert(0, os.path.join(HERE, '..', 'bench'))
@@ -0,0 +1,98 @@
+import http.client
+import json
+import socket
+import threading
+
+import pytest
+
+from daemon import MAX_BODY_BYTES, ConversionService, RequestError, make_server
+from result_cache import ResultCache
+from synthetic import make_result
+
+
+@pytest.fixture
+def service(tmp_path):
+    svc = ConversionService(workers=1, result_cache=ResultCache(str(tmp_path)))
+    yield svc
+    svc.close()
+
+
+def test_convert_runs_in_a_worker_and_caches_by_content(service):
+    body = json.dumps(make_result(4)).encode('utf-8')
+
+    key, data, hit = service.convert(body)
+    assert data.startswith(b'BEGIN:VCALENDAR') and not hit
+    assert service.convert(body) == (key, data, True)
+    # Same meetings in a different layout map to the same calendar
+    assert service.convert(json.dumps(make_result(4), indent=1).encode('utf-8')) == (key, data, True)
+
+
+def test_worker_errors_keep_their_status(service):
+    with pytest.raises(RequestError) as bad:
+        service.convert(b'not a schedule')
+    assert bad.value.status == 400
+
+    with pytest.raises(RequestError) as missing:
+        service.convert(json.dumps(make_result(2)).encode('utf-8'), ['W26'])
+    assert missing.value.status == 422
+
+
+@pytest.fixture
+def server(service):
+    srv = make_server(service, port=0)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def request(server, method, path, body=b'', **headers):
+    conn = http.client.HTTPConnection('127.0.0.1', server.server_address[1])
+    conn.request(method, path, body=body, headers=headers)
+    resp = conn.getresponse()
+    resp.read()
+    conn.close()
+    return resp.status
+
+
+def test_browser_requests_are_refused(server):
+    assert request(server, 'GET', '/health') == 200
+    assert request(server, 'GET', '/health', Origin='https://example.com') == 403
+    assert request(server, 'GET', '/health', Host='evil.example:8765') == 403
+
+
+def test_sync_and_cancel_need_the_token_and_json(server, service):
+    auth = {'Authorization': f"Bearer {service.token}"}
+    body = json.dumps(make_result(2)).encode('utf-8')
+
+    assert request(server, 'POST', '/sync?providers=google', body, **{'Content-Type': 'application/json'}) == 401
+    assert request(server, 'POST', '/sync?providers=google', body, **{'Content-Type': 'text/plain'}, **auth) == 415
+    # Past the checks, an unknown provider is rejected before anything is synced
+    assert request(server, 'POST', '/sync?providers=nope', body, **{'Content-Type': 'application/json'}, **auth) == 400
+    assert request(server, 'DELETE', '/jobs/abc') == 401
+    assert request(server, 'DELETE', '/jobs/abc', **auth) == 404
+
+
+def raw_request(server, head: bytes) -> bytes:
+    """Send raw request bytes on one connection and read until the server hangs up."""
+    with socket.create_connection(server.server_address, timeout=5) as sock:
+        sock.sendall(head)
+        data = b''
+        while chunk := sock.recv(65536):
+            data += chunk
+    return data
+
+
+def test_rejected_body_closes_the_connection(server):
+    # The unread body must not be parsed as a second request on the keep-alive connection
+    smuggled = b'GET /health HTTP/1.1\r\nHost: 127.0.0.1\r\n\r\n'
+    head = (f"POST /convert HTTP/1.1\r\nHost: 127.0.0.1\r\nContent-Length: {MAX_BODY_BYTES + 1}\r\n\r\n"
+            .encode() + smuggled)
+    data = raw_request(server, head)
+    assert data.startswith(b'HTTP/1.1 413') and b'Connection: close' in data
+    assert data.count(b'HTTP/1.1') == 1
+
+
+def test_bad_content_length_is_a_client_error(server):
+    data = raw_request(server, b'POST /convert HTTP/1.1\r\nHost: 127.0.0.1\r\nContent-Length: ten\r\n\r\n')
+    assert data.startswith(b'HTTP/1.1 400')
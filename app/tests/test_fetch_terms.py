@@ -0,0 +1,25 @@
+import pytest
+
+import parse_schedule
+
+
+def test_no_terms_is_rejected_before_signing_in(monkeypatch):
+    def open_session(*args, **kwargs):
+        raise AssertionError("should not sign in without a term")
+
+    monkeypatch.setattr(parse_schedule, 'open_session', open_session)
+
+    with pytest.raises(ValueError, match="at least one term"):
+        parse_schedule.fetch_terms([])
+
+
+def test_cached_login_never_reads_the_screen(monkeypatch):
+    def screen():
+        raise AssertionError("should not create a Tk root when the cached cookies work")
+
+    monkeypatch.setattr(parse_schedule, 'load_cookies', lambda: [{'name': 'session', 'value': 'cached', 'domain': 'example.com'}])
+    monkeypatch.setattr(parse_schedule, '_fetch_with_session', lambda sess, url: 'page')
+    monkeypatch.setattr(parse_schedule, '_browser_login', lambda url, cancel=None, screen=None: screen())
+
+    _, html = parse_schedule.open_session('F25', screen=screen)
+    assert html == 'page'
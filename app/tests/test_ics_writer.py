@@ -0,0 +1,65 @@
+import pytest
+
+from ics_writer import CRLF, MAX_OCTETS, escape_text, fold
+
+
+def physical_lines(folded: str) -> list[bytes]:
+    assert folded.endswith(CRLF)
+    return [line.encode('utf-8') for line in folded[:-len(CRLF)].split(CRLF)]
+
+
+def unfold(folded: str) -> str:
+    return folded[:-len(CRLF)].replace(CRLF + ' ', '')
+
+
+@pytest.mark.parametrize('length', [0, 1, MAX_OCTETS - 1, MAX_OCTETS])
+def test_short_lines_are_not_folded(length):
+    line = 'D' * length
+    assert fold(line) == line + CRLF
+
+
+def test_long_line_is_cut_at_75_octets():
+    line = 'DESCRIPTION:' + 'x' * 300
+    lines = physical_lines(fold(line))
+
+    assert len(lines[0]) == MAX_OCTETS
+    # Continuation lines spend one of their 75 octets on the leading space
+    assert all(l.startswith(b' ') and len(l) <= MAX_OCTETS for l in lines[1:])
+    assert all(len(l) == MAX_OCTETS for l in lines[1:-1])
+    assert unfold(fold(line)) == line
+
+
+@pytest.mark.parametrize('char', ['é', '中', '😀'])
+@pytest.mark.parametrize('offset', [0, 1, 2, 3])
+def test_multi_byte_characters_are_never_split(char, offset):
+    line = 'SUMMARY:' + 'a' * (MAX_OCTETS - len('SUMMARY:') - offset) + char * 60
+    folded = fold(line)
+    lines = physical_lines(folded)
+
+    # Every physical line decodes on its own and stays within the limit
+    assert all(len(l) <= MAX_OCTETS for l in lines)
+    assert all(l.decode('utf-8') for l in lines)
+    assert unfold(folded) == line
+
+
+def test_non_ascii_line_under_75_characters_is_folded_by_octets():
+    # 40 characters but 80 octets
+    line = 'é' * 40
+    lines = physical_lines(fold(line))
+
+    assert len(lines) == 2
+    assert len(lines[0]) == 74 and lines[1] == b' ' + 'é'.encode('utf-8') * 3
+
+
+@pytest.mark.parametrize('raw, escaped', [
+    ('plain text', 'plain text'),
+    ('a\\b', r'a\\b'),
+    ('a;b', r'a\;b'),
+    ('a,b', r'a\,b'),
+    ('a\nb', r'a\nb'),
+    ('a\r\nb', r'a\nb'),
+    ('\\;,\n', r'\\\;\,\n'),
+    (123, '123'),
+])
+def test_escape_text(raw, escaped):
+    assert escape_text(raw) == escaped
@@ -0,0 +1,119 @@
+import time
+import zlib
+from datetime import timezone
+
+import pytest
+import requests
+
+import outlook_calendar
+import scheduler
+from bench_outlook import synthetic_events
+from events import build_events, localize
+from fake_graph import FakeGraph
+from parse_schedule import sorted_courses
+from synthetic import make_result
+
+TOKEN = 'fake-token'
+
+
+@pytest.fixture
+def graph(monkeypatch):
+    # Retries wait for Retry-After (or a few milliseconds), not the production backoff
+    monkeypatch.setattr(scheduler, 'BACKOFF_BASE', 0.01)
+    with FakeGraph() as fake:
+        monkeypatch.setattr(outlook_calendar, 'GRAPH_BASE', fake.url)
+        yield fake
+
+
+@pytest.fixture
+def session():
+    with requests.Session() as sess:
+        yield sess
+
+
+def insert(graph, session, count):
+    calendar_id = outlook_calendar.get_or_create_outlook_calendar(TOKEN, session=session)
+    bodies = [outlook_calendar.event_to_outlook(ev) for ev in synthetic_events(count)]
+    graph.reset_counters()
+    return calendar_id, bodies, outlook_calendar.insert_events_batched(TOKEN, calendar_id, bodies, session=session)
+
+
+def test_partial_batch_failure_retries_only_failed_items(graph, session):
+    graph.throttle_every = 3
+    calendar_id, bodies, result = insert(graph, session, 60)
+
+    throttled = sum(zlib.crc32(body['subject'].encode()) % 3 == 0 for body in bodies)
+    assert 0 < throttled < len(bodies)
+    assert result['created'] == len(bodies) and not result['failed']
+    # Every event once, and each throttled item sent exactly one more time
+    subjects = [event['subject'] for event in graph.events[calendar_id]]
+    assert sorted(subjects) == sorted(body['subject'] for body in bodies)
+    assert graph.batch_items == len(bodies) + throttled
+
+
+def test_retry_after_is_honoured(graph, session):
+    # A single envelope of 20: half fit the quota, the rest are told to come back in a second
+    graph.quota = 10
+    start = time.monotonic()
+    calendar_id, bodies, result = insert(graph, session, 20)
+    elapsed = time.monotonic() - start
+
+    assert graph.rejected == 10
+    assert result['created'] == 20 and not result['failed']
+    assert len(graph.events[calendar_id]) == 20
+    assert elapsed >= 1.0
+
+
+def test_unchanged_resync_costs_one_request(graph, session):
+    events = synthetic_events(45)
+    calendar_id = outlook_calendar.get_or_create_outlook_calendar(TOKEN, session=session)
+    first = outlook_calendar.sync_events_to_outlook(TOKEN, calendar_id, events, session=session)
+    assert first['inserted'] == len(events)
+
+    graph.reset_counters()
+    again = outlook_calendar.sync_events_to_outlook(TOKEN, calendar_id, events, session=session)
+
+    assert again['unchanged'] == len(events)
+    assert again['inserted'] == again['patched'] == again['deleted'] == 0
+    assert again['requests'] == graph.http_requests == 1
+
+
+def test_sync_deletes_occurrences_on_excluded_dates(graph, session):
+    term = make_result(6)['Terms'][0]
+    events = build_events(sorted_courses(term['PlannedCourses']), term=term['Code'])
+    # Excluded days inside each series, the trailing exam window is already cut by its end date
+    excluded = [localize(day).astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S')
+                for ev in events for day in outlook_calendar._excluded_starts(ev)]
+    assert excluded
+
+    calendar_id = outlook_calendar.get_or_create_outlook_calendar(TOKEN, session=session)
+    result = outlook_calendar.sync_events_to_outlook(TOKEN, calendar_id, events, session=session)
+
+    assert result['excluded'] == len(excluded) and not result['failed']
+    assert sorted(start for _, start in graph.cancelled) == sorted(excluded)
+
+    graph.reset_counters()
+    again = outlook_calendar.sync_events_to_outlook(TOKEN, calendar_id, events, session=session)
+    assert again['excluded'] == 0 and graph.http_requests == 1
+
+
+def test_failed_exclusions_are_retried_on_resync(graph, session):
+    term = make_result(6)['Terms'][0]
+    events = build_events(sorted_courses(term['PlannedCourses']), term=term['Code'])
+    excluded = [day for ev in events for day in outlook_calendar._excluded_starts(ev)]
+    series = sum(bool(outlook_calendar._excluded_starts(ev)) for ev in events)
+
+    calendar_id = outlook_calendar.get_or_create_outlook_calendar(TOKEN, session=session)
+    graph.fail_deletes = 3
+    first = outlook_calendar.sync_events_to_outlook(TOKEN, calendar_id, events, session=session)
+    assert len(first['failed']) == 3 and first['excluded'] == len(excluded) - 3
+
+    # The series left with occurrences still hold the placeholder hash, so they are patched again
+    again = outlook_calendar.sync_events_to_outlook(TOKEN, calendar_id, events, session=session)
+    assert 0 < again['patched'] <= 3 < series
+    assert again['excluded'] == 3 and not again['failed']
+    assert len(graph.cancelled) == len(excluded)
+
+    graph.reset_counters()
+    last = outlook_calendar.sync_events_to_outlook(TOKEN, calendar_id, events, session=session)
+    assert last['unchanged'] == len(events) and graph.http_requests == 1
@@ -0,0 +1,24 @@
+from result_cache import ResultCache
+
+
+def test_import_is_per_account_and_calendar(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    cache.record_import('k1', ['F25'], 'Google', 'alice', 'cal-a')
+
+    assert cache.imported('k1', 'Google', 'alice', 'cal-a')
+    # Another account, a recreated calendar or another provider still syncs
+    assert not cache.imported('k1', 'Google', 'bob', 'cal-a')
+    assert not cache.imported('k1', 'Google', 'alice', 'cal-b')
+    assert not cache.imported('k1', 'Outlook', 'alice', 'cal-a')
+    assert not cache.imported('k2', 'Google', 'alice', 'cal-a')
+
+
+def test_new_import_only_supersedes_the_same_account(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    cache.record_import('k1', ['F25'], 'Google', 'alice', 'cal-a')
+    cache.record_import('k1', ['F25'], 'Google', 'bob', 'cal-b')
+    cache.record_import('k2', ['F25'], 'Google', 'alice', 'cal-a')
+
+    assert not cache.imported('k1', 'Google', 'alice', 'cal-a')
+    assert cache.imported('k2', 'Google', 'alice', 'cal-a')
+    assert cache.imported('k1', 'Google', 'bob', 'cal-b')
@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+from parse_schedule import ResultScanner, extract_result
+from synthetic import make_page, make_result
+
+
+def scan(page: bytes, chunk: int) -> ResultScanner:
+    scanner = ResultScanner()
+    for start in range(0, len(page), chunk):
+        if scanner.feed(page[start:start + chunk]):
+            break
+    else:
+        scanner.close()
+    return scanner
+
+
+@pytest.mark.parametrize('chunk', [1, 7, 4096, 1 << 20])
+def test_non_ascii_payload_is_complete(chunk):
+    result = make_result(20, non_ascii=True)
+    page = make_page(result, padding_kb=4, trailing_kb=4, ensure_ascii=False).encode('utf-8')
+
+    scanner = scan(page, chunk)
+
+    assert json.loads(scanner.payload) == result
+    assert extract_result(scanner.payload) == result
+
+
+@pytest.mark.parametrize('end', [';', ' ;', '\n;', '\n\n;', '\n</script>', ''])
+def test_object_end_variants(end):
+    result = make_result(5, tricky=True)
+    page = make_page(result, padding_kb=1, end=end).encode('utf-8')
+
+    for chunk in (1, 3, len(page)):
+        assert json.loads(scan(page, chunk).payload) == result
+
+
+def test_stops_reading_after_the_object():
+    result = make_result(5)
+    page = make_page(result, padding_kb=1, trailing_kb=64).encode('utf-8')
+
+    scanner = scan(page, 1024)
+
+    assert scanner.payload is not None
+    assert scanner.bytes_seen < len(page) // 2
+
+
+def test_unclosed_object_raises():
+    page = b'<script>var result = {"Terms": [{"Code": "F25"'
+
+    with pytest.raises(RuntimeError, match="never closed"):
+        scan(page, 8)
+
+
+def test_other_result_objects_are_skipped():
+    result = make_result(2)
+    page = ('<script>var result = null;</script><script>var result = {"Other": 1};</script>'
+            + make_page(result, padding_kb=1)).encode('utf-8')
+
+    assert json.loads(scan(page, 5).payload) == result
+
+
+def test_object_at_the_end_of_the_page():
+    page = b'<script>var result = {"Terms": []}  '
+
+    assert json.loads(scan(page, 4).payload) == {"Terms": []}
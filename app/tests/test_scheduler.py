@@ -0,0 +1,26 @@
+import threading
+import time
+
+import pytest
+
+from progress import Cancelled
+from scheduler import RequestScheduler
+
+
+def test_cancel_interrupts_a_rate_limit_wait():
+    # One call per ten seconds: the second chunk has to wait for the bucket
+    sched = RequestScheduler('test', max_in_flight=1, rate=0.1, burst=1)
+    cancel = threading.Event()
+    sent = []
+
+    def send(chunk, attempt):
+        sent.append(chunk)
+        return [], None, False
+
+    threading.Timer(0.2, cancel.set).start()
+    start = time.monotonic()
+    with pytest.raises(Cancelled):
+        sched.run([[0], [1]], send, cancel=cancel)
+
+    assert sent == [[0]]
+    assert time.monotonic() - start < 2
@@ -0,0 +1,58 @@
+from datetime import date, timedelta
+
+import pytest
+
+from term_calendar import EXAM_DAYS, academic_breaks, term_calendar
+
+
+def days(start: date, end: date) -> list[date]:
+    return [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+
+def test_breaks_of_2025_26():
+    breaks = academic_breaks(2025)
+
+    # Thanksgiving is Monday October 13th, Family Day Monday February 16th 2026
+    fall = [day for day, name in breaks.items() if name == 'Fall Study Break']
+    winter = [day for day, name in breaks.items() if name == 'Winter Reading Week']
+    assert sorted(fall) == days(date(2025, 10, 11), date(2025, 10, 14))
+    assert sorted(winter) == days(date(2026, 2, 16), date(2026, 2, 20))
+    assert [day.strftime('%a') for day in sorted(fall)] == ['Sat', 'Sun', 'Mon', 'Tue']
+    assert [day.strftime('%a') for day in sorted(winter)] == ['Mon', 'Tue', 'Wed', 'Thu', 'Fri']
+
+
+def test_winter_term_uses_the_previous_fall():
+    # W26 starts in January, which belongs to the academic year that began in fall 2025
+    calendar = term_calendar(date(2026, 1, 5), date(2026, 4, 17), 'W26')
+
+    assert sorted(calendar.breaks) == days(date(2026, 2, 16), date(2026, 2, 20))
+    assert calendar.exam_start == date(2026, 4, 17) - timedelta(days=EXAM_DAYS - 1)
+
+
+def test_term_crossing_academic_years_gets_both_breaks():
+    calendar = term_calendar(date(2025, 7, 1), date(2026, 3, 1))
+
+    assert sorted(calendar.breaks) == days(date(2025, 10, 11), date(2025, 10, 14)) + \
+        days(date(2026, 2, 16), date(2026, 2, 20))
+    # Family Day 2025 belongs to the previous academic year and falls before the term
+    assert date(2025, 2, 17) not in calendar.breaks
+
+
+@pytest.mark.parametrize('exam, expected', [
+    (False, [date(2025, 10, 13), date(2025, 12, 1), date(2025, 12, 8)]),
+    (True, [date(2025, 10, 13)]),
+])
+def test_exams_keep_breaks_but_not_the_exam_window(exam, expected):
+    calendar = term_calendar(date(2025, 9, 4), date(2025, 12, 12), 'F25')
+
+    assert calendar.exam_start == date(2025, 11, 29)
+    assert calendar.exdates(date(2025, 9, 8), date(2025, 12, 12), ['MO'], exam=exam) == expected
+
+
+def test_break_inside_the_exam_window_is_kept_for_exams():
+    calendar = term_calendar(date(2025, 9, 4), date(2025, 10, 20))
+
+    assert calendar.exdates(date(2025, 9, 4), date(2025, 10, 20), ['MO', 'TU']) == \
+        [date(2025, 10, 7), date(2025, 10, 13), date(2025, 10, 14), date(2025, 10, 20)]
+    assert calendar.exdates(date(2025, 9, 4), date(2025, 10, 20), ['MO', 'TU'], exam=True) == \
+        [date(2025, 10, 13), date(2025, 10, 14)]